@@ -4,6 +4,7 @@ CURR_DIR = os.path.dirname(__file__)
 ROOT_DIR = CURR_DIR[0 : (len(CURR_DIR) - 9)]
 CSV_PATH = ROOT_DIR + "/csv_files"
 ENGINE_PATH = ROOT_DIR + "/engine"
+PLAN_CACHE_PATH = ROOT_DIR + "/plan_cache"
 
 ENGINEERING_QUAD = [
     (42.444227, -76.484059),
@@ -16,3 +16,19 @@ def write_state_to_csv(predicted_state):
 def write_phase_to_csv(phase):
     with open(CSV_PATH + "/phases.csv", "a") as fd:
         fd.write(str(phase) + "\n")
+
+
+def read_gps_polygon_from_csv(path=CSV_PATH + "/longandlats.csv"):
+    """
+    Returns the (latitude, longitude) vertices stored in the csv file at [path],
+    which has a "longitude,latitude" header and one vertex per line. Extra
+    columns are ignored.
+    """
+    vertices = []
+    with open(path, "r") as fd:
+        next(fd)
+        for line in fd:
+            values = line.strip().split(",")
+            if len(values) >= 2 and values[0] and values[1]:
+                vertices.append((float(values[1]), float(values[0])))
+    return vertices
@@ -1,5 +1,5 @@
 import math
-from engine.kinematics import get_vincenty_x, get_vincenty_y
+from engine.geodesy import get_projection
 
 
 class BaseStation:
@@ -27,9 +27,9 @@ class BaseStation:
             plastic_load: TODO
         """
         self.coord = coord
-        x = get_vincenty_x((grid.lat_min, grid.long_min), coord)
-        y = get_vincenty_y((grid.lat_min, grid.long_min), coord)
-        self.position = (x, y)
+        self.position = get_projection((grid.lat_min, grid.long_min)).gps_to_meters(
+            coord[0], coord[1]
+        )
         self.heading = heading
         self.battery = battery  # Replace w/ battery reading
         self.plastic_load = plastic_load  # Replace w/ base station bucket reading (depends on electrical)
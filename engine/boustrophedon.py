@@ -0,0 +1,308 @@
+import heapq
+
+import numpy as np
+
+"""
+Boustrophedon cell decomposition coverage planning over a boolean mask of active
+nodes.
+
+The active region is swept column by column. Every column is cut into runs of
+consecutive active rows, and runs of neighboring columns that overlap extend the
+same cell, until the region splits or merges (a run overlaps more than one run of
+the next column, or none). Every cell is then a stack of column runs without holes,
+which is covered back and forth ("boustrophedon") without ever leaving it.
+
+Each cell is covered with strokes along whichever axis needs fewer of them, so
+fewer turns, and the cells are chained greedily, entering the next cell at the
+corner nearest to where the last one was left. The transitions between cells are
+shortest paths through the active region, so the robot never sweeps inactive
+nodes, except when moving on to a part of the region that is not connected to
+the rest. Unlike the guided lawnmower traversal, concave regions and regions with
+holes are covered completely.
+
+Positions are (row, col) grid indices, and plans are returned as flat node indices
+row * num_cols + col, like the other traversals of engine.grid.
+"""
+
+
+class Cell:
+    """
+    A cell of a boustrophedon decomposition: consecutive columns starting at
+    [first_col], where column first_col + i holds the active rows
+    [starts[i], stops[i]). Cells with the same [component] are in the same
+    8-connected part of the region.
+    """
+
+    __slots__ = ("first_col", "starts", "stops", "component")
+
+    def __init__(self, first_col, starts, stops, component=None):
+        self.first_col = first_col
+        self.starts = starts
+        self.stops = stops
+        self.component = component
+
+    def get_num_cols(self):
+        return len(self.starts)
+
+    def get_row_range(self):
+        return min(self.starts), max(self.stops)
+
+    def get_mask(self):
+        """
+        Returns the boolean mask of the cell over its bounding box, of dimensions
+        [rows x cols] starting at (row_min, first_col).
+        """
+        row_min, row_max = self.get_row_range()
+        rows = np.arange(row_min, row_max)[:, np.newaxis]
+        return (np.array(self.starts) <= rows) & (rows < np.array(self.stops))
+
+    def get_strokes(self):
+        """
+        Returns the strokes covering the cell with the fewest turns, as a list of
+        (rows, cols) index arrays, all oriented in increasing row or col order.
+
+        The cell is covered with one vertical stroke per column, or with one
+        horizontal stroke per row when there are fewer rows than columns and every
+        row of the cell is a single run of columns.
+        """
+        row_min, row_max = self.get_row_range()
+        if row_max - row_min < self.get_num_cols():
+            mask = self.get_mask()
+            runs = np.count_nonzero(np.diff(mask.astype(np.int8), axis=1) == 1, axis=1)
+            runs += mask[:, 0]
+            if np.all(runs == 1):
+                first = np.argmax(mask, axis=1)
+                last = mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+                return [
+                    (
+                        np.full(stop - start + 1, row_min + row),
+                        np.arange(start, stop + 1) + self.first_col,
+                    )
+                    for row, (start, stop) in enumerate(
+                        zip(first.tolist(), last.tolist())
+                    )
+                ]
+        return [
+            (np.arange(start, stop), np.full(stop - start, self.first_col + i))
+            for i, (start, stop) in enumerate(zip(self.starts, self.stops))
+        ]
+
+
+def column_runs(mask):
+    """
+    Returns, for every column of the boolean [mask], the list of (start, stop)
+    row ranges of its runs of consecutive True values.
+    """
+    padded = np.zeros((mask.shape[0] + 2, mask.shape[1]), dtype=np.int8)
+    padded[1:-1] = mask
+    edges = np.diff(padded, axis=0)
+    # transposed, so the runs come out sorted by col, then by row
+    cols, starts = np.nonzero(edges.T == 1)
+    _, stops = np.nonzero(edges.T == -1)
+    runs = [[] for _ in range(mask.shape[1])]
+    for col, start, stop in zip(cols.tolist(), starts.tolist(), stops.tolist()):
+        runs[col].append((start, stop))
+    return runs
+
+
+def decompose(mask):
+    """
+    Returns the boustrophedon decomposition of the True region of the boolean
+    [mask] into a list of Cells, in order of their first column.
+    """
+    cells = []
+    open_cells = []  # the cell of every run of the previous column
+    previous_runs = []
+    # union-find forest over the cells, joining cells whose runs touch
+    parents = []
+
+    def find(cell):
+        while parents[cell] != cell:
+            parents[cell] = parents[parents[cell]]
+            cell = parents[cell]
+        return cell
+
+    for col, runs in enumerate(column_runs(np.asarray(mask, dtype=bool))):
+        # overlaps[i] lists the runs of this column overlapping previous run i
+        overlaps = [
+            [
+                j
+                for j, (start, stop) in enumerate(runs)
+                if start < p_stop and p_start < stop
+            ]
+            for p_start, p_stop in previous_runs
+        ]
+        overlap_counts = [0] * len(runs)
+        for linked in overlaps:
+            for j in linked:
+                overlap_counts[j] += 1
+
+        next_cells = [None] * len(runs)
+        for i, linked in enumerate(overlaps):
+            # a run continues a cell only if the two runs overlap one another only
+            if len(linked) == 1 and overlap_counts[linked[0]] == 1:
+                cell = open_cells[i]
+                start, stop = runs[linked[0]]
+                cells[cell].starts.append(start)
+                cells[cell].stops.append(stop)
+                next_cells[linked[0]] = cell
+        for j, (start, stop) in enumerate(runs):
+            if next_cells[j] is None:
+                next_cells[j] = len(cells)
+                cells.append(Cell(col, [start], [stop]))
+                parents.append(len(parents))
+        # runs that touch, diagonally included, are connected
+        for i, (p_start, p_stop) in enumerate(previous_runs):
+            for j, (start, stop) in enumerate(runs):
+                if start <= p_stop and p_start <= stop:
+                    parents[find(open_cells[i])] = find(next_cells[j])
+        open_cells = next_cells
+        previous_runs = runs
+
+    for k, cell in enumerate(cells):
+        cell.component = find(k)
+    return cells
+
+
+def _orient(strokes, reverse, flip):
+    """
+    Returns [strokes] oriented in travel order: taken last to first if [reverse],
+    with the first stroke taken backward if [flip], and alternating directions.
+    """
+    ordered = strokes[::-1] if reverse else strokes
+    return [
+        (rows[::-1], cols[::-1]) if (i % 2 == 1) != flip else (rows, cols)
+        for i, (rows, cols) in enumerate(ordered)
+    ]
+
+
+def _variant_ends(strokes):
+    """
+    Yields the four ways of covering a cell with its [strokes], see _orient, as
+    (entry, exit, reverse, flip) tuples, without orienting the strokes.
+    """
+    last_flipped = (len(strokes) - 1) % 2 == 1
+    for reverse in (False, True):
+        first_rows, first_cols = strokes[-1] if reverse else strokes[0]
+        last_rows, last_cols = strokes[0] if reverse else strokes[-1]
+        for flip in (False, True):
+            end = -1 if flip else 0
+            entry = (int(first_rows[end]), int(first_cols[end]))
+            end = 0 if last_flipped != flip else -1
+            exit = (int(last_rows[end]), int(last_cols[end]))
+            yield entry, exit, reverse, flip
+
+
+def shortest_path(mask, start, goal):
+    """
+    Returns the positions strictly between [start] and [goal] on a shortest
+    8-connected path through the True nodes of the boolean [mask], or an empty
+    list if [goal] cannot be reached.
+    """
+    return find_path(mask.ravel().tolist(), mask.shape, start, goal)
+
+
+def find_path(is_free, shape, start, goal):
+    """
+    shortest_path over a grid of dimensions [shape], where is_free[i] tells
+    whether the node at flat index i can be crossed. [is_free] may be any
+    sequence, e.g. a list or a view computing the answer on demand.
+
+    Uses A* with the Chebyshev distance to [goal] as heuristic, which is exact
+    when nothing is in the way, so paths between nearby nodes only explore the
+    nodes along the way.
+    """
+    num_rows, num_cols = shape
+    goal_row, goal_col = goal
+    start_index = start[0] * num_cols + start[1]
+    goal_index = goal_row * num_cols + goal_col
+    if start_index == goal_index:
+        return []
+    costs = {start_index: 0}
+    parents = {start_index: None}
+    # ties are broken towards the deepest node, which is on a shortest path when
+    # nothing is in the way
+    frontier = [(0, 0, start_index)]
+    while frontier:
+        _, cost, index = heapq.heappop(frontier)
+        cost = -cost
+        if index == goal_index:
+            break
+        if cost > costs[index]:
+            continue
+        row, col = divmod(index, num_cols)
+        for n_row in range(max(row - 1, 0), min(row + 2, num_rows)):
+            for n_col in range(max(col - 1, 0), min(col + 2, num_cols)):
+                neighbor = n_row * num_cols + n_col
+                if is_free[neighbor] and cost + 1 < costs.get(neighbor, cost + 2):
+                    costs[neighbor] = cost + 1
+                    parents[neighbor] = index
+                    estimate = max(abs(goal_row - n_row), abs(goal_col - n_col))
+                    heapq.heappush(frontier, (cost + 1 + estimate, -cost - 1, neighbor))
+    if goal_index not in parents:
+        return []
+    path = []
+    index = parents[goal_index]
+    while index != start_index:
+        path.append(divmod(index, num_cols))
+        index = parents[index]
+    return path[::-1]
+
+
+def boustrophedon_indices(mask):
+    """
+    Returns the flat node indices of a boustrophedon coverage of the True region
+    of the boolean [mask], starting at the bottom of its leftmost column.
+    [int Numpy array]
+    """
+    mask = np.asarray(mask, dtype=bool)
+    num_cols = mask.shape[1]
+    cells = decompose(mask)
+    if not cells:
+        return np.zeros(0, dtype=int)
+    cell_strokes = [cell.get_strokes() for cell in cells]
+    is_free = mask.ravel().tolist()
+
+    # start at the bottom left of the first cell, then always move on to the
+    # nearest corner of a cell that is not yet covered, finishing every connected
+    # part of the region before moving on to the next
+    _, position, _, _ = next(_variant_ends(cell_strokes[0]))
+    component = cells[0].component
+    pieces = _orient(cell_strokes[0], False, False)
+    ends = [list(_variant_ends(strokes)) for strokes in cell_strokes]
+    remaining = list(range(1, len(cells)))
+    while remaining:
+        best = None
+        for k, cell in enumerate(remaining):
+            other_part = cells[cell].component != component
+            for entry, exit, reverse, flip in ends[cell]:
+                dist = (entry[0] - position[0]) ** 2 + (entry[1] - position[1]) ** 2
+                if best is None or (other_part, dist) < best[0]:
+                    best = ((other_part, dist), k, entry, exit, reverse, flip)
+        (other_part, _), k, entry, exit, reverse, flip = best
+        cell = remaining.pop(k)
+        if not other_part:
+            transition = find_path(is_free, mask.shape, position, entry)
+            if transition:
+                rows, cols = zip(*transition)
+                pieces.append((np.array(rows), np.array(cols)))
+        pieces += _orient(cell_strokes[cell], reverse, flip)
+        component = cells[cell].component
+        position = exit
+
+    rows = np.concatenate([rows for rows, _ in pieces])
+    cols = np.concatenate([cols for _, cols in pieces])
+    return rows * num_cols + cols
+
+
+def count_turns(indices, num_cols):
+    """
+    Returns the number of changes of direction along a path of flat node
+    [indices] on a grid with [num_cols] columns.
+    """
+    rows, cols = np.divmod(np.asarray(indices), num_cols)
+    steps = np.stack([np.diff(rows), np.diff(cols)], axis=1)
+    steps = steps[np.any(steps != 0, axis=1)]
+    if len(steps) < 2:
+        return 0
+    return int(np.count_nonzero(np.any(steps[1:] != steps[:-1], axis=1)))
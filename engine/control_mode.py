@@ -12,3 +12,5 @@ class ControlMode(Enum):
     SPIRAL = 4
     ROOMBA = 5
     STRAIGHT = 6
+    LAWNMOWER_GUIDED = 7
+    BOUSTROPHEDON = 8
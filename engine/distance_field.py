@@ -0,0 +1,283 @@
+import heapq
+import math
+from array import array
+
+import numpy as np
+
+from engine.node import NodeStore
+
+"""
+Distance to the base station from every node of a Grid, for return planning.
+
+A DistanceField is computed once with Dijkstra's algorithm from the base
+station's node, over 8-connected nodes that are not obstacles (and, optionally,
+are active). It keeps the distance of every node to the base in meters, and the
+next node on a shortest path home, in flat arrays indexed by flat node index
+row * num_cols + col. The cost of returning from anywhere is then a lookup, and
+the path home is found by following the next nodes, in time proportional to its
+length.
+
+When nodes become obstacles, only the nodes whose path home went through them
+are searched again, from the nodes around them whose paths are unaffected. When
+obstacles are cleared, the shorter paths they open are propagated from them.
+"""
+
+SQRT2 = math.sqrt(2)
+
+
+class DistanceField:
+    """
+    INSTANCE ATTRIBUTES:
+        # grid: the Grid the field covers
+        # source: flat index of the base station's node [int]
+        # active_only: whether inactive nodes, except the source, are impassable [bool]
+        # dist: distance in meters from every node to the source along the grid,
+            infinite for nodes that cannot reach it [float array]
+        # parent: flat index of the next node on a shortest path to the source
+            from every node, -1 for the source and for nodes that cannot reach it
+            [int array]
+    """
+
+    def __init__(self, grid, source, active_only=False):
+        """
+        Arguments:
+            grid: the Grid to cover
+            source: (row, col) of the base station's node
+            active_only: whether paths must stay within the active nodes of the
+                grid, as of now [bool]
+        """
+        self.grid = grid
+        self.num_rows, self.num_cols = grid.get_shape()
+        self.source = source[0] * self.num_cols + source[1]
+        self.active_only = active_only
+
+        size = self.num_rows * self.num_cols
+        self.dist = array("d", [math.inf]) * size
+        self.parent = array("l", [-1]) * size
+        self._passable = bytearray(self._is_passable_mask().tobytes())
+        self._passable[self.source] = 1
+        self._rebuild()
+
+    def _rebuild(self):
+        """
+        Computes the whole field from scratch.
+        """
+        size = len(self.dist)
+        self.dist[:] = array("d", [math.inf]) * size
+        self.parent[:] = array("l", [-1]) * size
+        self.dist[self.source] = 0.0
+        self._propagate([(0.0, self.source)])
+
+    def _is_passable_mask(self, indices=None):
+        """
+        Returns the flat boolean array telling whether every node, or the nodes at
+        the flat [indices], can be crossed.
+        """
+        state = self.grid.store.state
+        if indices is not None:
+            state = state[indices]
+        passable = (state >> NodeStore.STATUS_SHIFT) != NodeStore.OBSTACLE
+        if self.active_only:
+            passable &= (state & NodeStore.ACTIVE).astype(bool)
+        return passable
+
+    def _neighbors(self, index):
+        """
+        Yields (neighbor, length in meters) for every passable neighbor of node
+        [index].
+        """
+        row, col = divmod(index, self.num_cols)
+        step = self.grid.step_size
+        passable = self._passable
+        for n_row in range(max(row - 1, 0), min(row + 2, self.num_rows)):
+            for n_col in range(max(col - 1, 0), min(col + 2, self.num_cols)):
+                neighbor = n_row * self.num_cols + n_col
+                if neighbor != index and passable[neighbor]:
+                    if n_row == row or n_col == col:
+                        yield neighbor, step
+                    else:
+                        yield neighbor, step * SQRT2
+
+    def _propagate(self, frontier):
+        """
+        Runs Dijkstra's algorithm from the (distance, index) pairs of [frontier],
+        whose dist and parent are already set, lowering the distance of every node
+        it reaches through them.
+        """
+        dist, parent, passable = self.dist, self.parent, self._passable
+        num_rows, num_cols = self.num_rows, self.num_cols
+        straight = self.grid.step_size
+        diagonal = straight * SQRT2
+        heappush, heappop = heapq.heappush, heapq.heappop
+        heapq.heapify(frontier)
+        # the neighbor loop of _neighbors, inlined as this is the hot loop
+        while frontier:
+            d, index = heappop(frontier)
+            if d > dist[index]:
+                continue
+            row, col = divmod(index, num_cols)
+            for n_row in range(max(row - 1, 0), min(row + 2, num_rows)):
+                length = straight if n_row == row else diagonal
+                first = n_row * num_cols
+                for n_col in range(max(col - 1, 0), min(col + 2, num_cols)):
+                    neighbor = first + n_col
+                    if not passable[neighbor]:
+                        continue
+                    new = d + (straight if n_col == col else length)
+                    if new < dist[neighbor]:
+                        dist[neighbor] = new
+                        parent[neighbor] = index
+                        heappush(frontier, (new, neighbor))
+
+    # --------------------- UPDATES -------------- #
+
+    def update_nodes(self, positions):
+        """
+        Takes into account that the nodes at the (row, col) [positions] became, or
+        stopped being, obstacles.
+        """
+        rows, cols = np.asarray(positions, dtype=int).reshape(-1, 2).T
+        indices = rows * self.num_cols + cols
+        passable = self._is_passable_mask(indices)
+        passable[indices == self.source] = True
+        blocked = []
+        cleared = []
+        for index, is_passable in zip(indices.tolist(), passable.tolist()):
+            if is_passable and not self._passable[index]:
+                cleared.append(index)
+            elif not is_passable and self._passable[index]:
+                blocked.append(index)
+            self._passable[index] = is_passable
+        if blocked:
+            self._remove(blocked)
+        if cleared:
+            self._reconnect(cleared)
+
+    def add_obstacles(self, positions):
+        """
+        Marks the nodes at the (row, col) [positions] as obstacles on the grid,
+        and updates the field for them.
+        """
+        self.grid.mark_obstacles(positions)
+        self.update_nodes(positions)
+
+    def _remove(self, blocked):
+        """
+        Updates the field after the nodes at the flat indices [blocked] became
+        impassable: every node whose path home went through one of them is reset
+        and searched again from its unaffected neighbors, or the whole field is
+        computed again if that is most of the grid.
+        """
+        dist, parent = self.dist, self.parent
+        num_cols = self.num_cols
+        # the blocked nodes and their descendants in the tree of paths home
+        affected = set(blocked)
+        stack = list(blocked)
+        while stack:
+            index = stack.pop()
+            row, col = divmod(index, num_cols)
+            for n_row in range(max(row - 1, 0), min(row + 2, self.num_rows)):
+                for n_col in range(max(col - 1, 0), min(col + 2, num_cols)):
+                    neighbor = n_row * num_cols + n_col
+                    if parent[neighbor] == index and neighbor not in affected:
+                        affected.add(neighbor)
+                        stack.append(neighbor)
+        # searching most of the grid again from the edge of the affected nodes
+        # costs more than searching it from the source
+        if 2 * len(affected) > len(dist):
+            self._rebuild()
+            return
+        for index in affected:
+            dist[index] = math.inf
+            parent[index] = -1
+
+        frontier = []
+        for index in affected:
+            if not self._passable[index]:
+                continue
+            for neighbor, length in self._neighbors(index):
+                if dist[neighbor] + length < dist[index]:
+                    dist[index] = dist[neighbor] + length
+                    parent[index] = neighbor
+            if dist[index] < math.inf:
+                frontier.append((dist[index], index))
+        self._propagate(frontier)
+
+    def _reconnect(self, cleared):
+        """
+        Updates the field after the nodes at the flat indices [cleared] became
+        passable, propagating the shorter paths through them.
+        """
+        dist, parent = self.dist, self.parent
+        frontier = []
+        for index in cleared:
+            if index == self.source:
+                dist[index], parent[index] = 0.0, -1
+            for neighbor, length in self._neighbors(index):
+                if dist[neighbor] + length < dist[index]:
+                    dist[index] = dist[neighbor] + length
+                    parent[index] = neighbor
+            if dist[index] < math.inf:
+                frontier.append((dist[index], index))
+        self._propagate(frontier)
+
+    # --------------------- QUERIES -------------- #
+
+    def get_distances(self):
+        """
+        Returns the distance of every node to the source as a Numpy array of
+        dimensions [num_rows x num_cols].
+        """
+        return np.frombuffer(self.dist, dtype=float).reshape(self.num_rows, -1)
+
+    def get_cost(self, position):
+        """
+        Returns the length in meters of the shortest path home from the node at
+        (row, col) [position], infinite if there is none. [float]
+        """
+        return self.dist[position[0] * self.num_cols + position[1]]
+
+    def get_path(self, position):
+        """
+        Returns the (row, col) positions of a shortest path from the node at
+        [position] to the source, both included, or an empty list if there is
+        none.
+        """
+        index = position[0] * self.num_cols + position[1]
+        if self.dist[index] == math.inf:
+            return []
+        path = [divmod(index, self.num_cols)]
+        while index != self.source:
+            index = self.parent[index]
+            path.append(divmod(index, self.num_cols))
+        return path
+
+    def get_return_cost(self, x, y):
+        """
+        Returns the length in meters of the way home from the point [x], [y]
+        meters from the grid's origin: to its nearest node, then along the
+        shortest path from there. [float]
+        """
+        row, col = self.grid.m_coords_to_index(x, y)
+        node_x, node_y = self.grid.node_xs[row, col], self.grid.node_ys[row, col]
+        return self.get_cost((row, col)) + math.hypot(node_x - x, node_y - y)
+
+    def get_return_waypoints(self, x, y):
+        """
+        Returns the (x, y) meter coordinates of the nodes where the shortest path
+        home from the point [x], [y] changes direction, ending with the source, or
+        an empty list if there is no way home.
+        """
+        path = self.get_path(self.grid.m_coords_to_index(x, y))
+        corners = [
+            position
+            for previous, position, following in zip(path, path[1:], path[2:])
+            if (position[0] - previous[0], position[1] - previous[1])
+            != (following[0] - position[0], following[1] - position[1])
+        ]
+        if path:
+            corners.append(path[-1])
+        return [
+            (float(self.grid.node_xs[row, col]), float(self.grid.node_ys[row, col]))
+            for row, col in corners
+        ]
@@ -0,0 +1,250 @@
+import heapq
+import math
+from array import array
+
+from engine.node import NodeStore
+
+"""
+Incremental shortest paths over the nodes of a Grid with D* Lite (Koenig and
+Likhachev, 2002).
+
+Nodes are 8-connected, and nodes with the obstacle status cannot be crossed.
+Moving to a side neighbor costs STRAIGHT_COST and to a diagonal neighbor
+DIAGONAL_COST, integers whose ratio is within 0.0051% of sqrt(2): with integer
+costs, the keys of nodes on equally short paths tie exactly, which the search
+relies on to stop as soon as the start's distance is known. The search runs
+backwards from the goal, so the robot can move and obstacles can appear or
+disappear between searches: after move_start and update_nodes,
+compute_shortest_path only expands the nodes whose distance to the goal changed
+and that matter for the robot's new position, instead of searching the whole
+grid again.
+
+The g and rhs estimates are flat arrays indexed by flat node index
+row * num_cols + col, and the open set is a binary heap (heapq) with lazy
+deletion: entries whose key is not the node's latest one are skipped when
+popped.
+"""
+
+INFINITY = math.inf
+STRAIGHT_COST = 70
+DIAGONAL_COST = 99
+
+
+class DStarLite:
+    """
+    INSTANCE ATTRIBUTES:
+        # grid: the Grid searched
+        # start, goal: flat indices of the robot's node and of the goal node [int]
+        # g: distance to the goal of every node as of its last expansion, in
+            STRAIGHT_COST per step [float array]
+        # rhs: one step lookahead distance to the goal of every node, in
+            STRAIGHT_COST per step [float array]
+        # num_expanded: number of node expansions so far, over every search [int]
+    """
+
+    def __init__(self, grid, start, goal):
+        """
+        Arguments:
+            grid: the Grid to search
+            start: (row, col) of the robot's node
+            goal: (row, col) of the goal node
+        """
+        self.grid = grid
+        self.num_rows, self.num_cols = grid.get_shape()
+        self.state = grid.store.state
+        self.start = self._index(start)
+        self.goal = self._index(goal)
+        self.num_expanded = 0
+
+        size = self.num_rows * self.num_cols
+        self.g = array("d", [INFINITY]) * size
+        self.rhs = array("d", [INFINITY]) * size
+        self.rhs[self.goal] = 0.0
+        self._km = 0.0
+        self._last = self.start
+        self._open = []
+        # latest key of every node in the open set
+        self._keys = {}
+        self._push(self.goal)
+
+    def _index(self, position):
+        row, col = position
+        return row * self.num_cols + col
+
+    # --------------------- GRAPH -------------- #
+
+    def _is_blocked(self, index):
+        return (self.state.item(index) >> NodeStore.STATUS_SHIFT) == NodeStore.OBSTACLE
+
+    def _neighbors(self, index):
+        """
+        Yields (neighbor, cost) for every neighbor of node [index], with an
+        infinite cost if either of them is an obstacle.
+        """
+        row, col = divmod(index, self.num_cols)
+        blocked = self._is_blocked(index)
+        for n_row in range(max(row - 1, 0), min(row + 2, self.num_rows)):
+            for n_col in range(max(col - 1, 0), min(col + 2, self.num_cols)):
+                neighbor = n_row * self.num_cols + n_col
+                if neighbor == index:
+                    continue
+                if blocked or self._is_blocked(neighbor):
+                    yield neighbor, INFINITY
+                elif n_row == row or n_col == col:
+                    yield neighbor, STRAIGHT_COST
+                else:
+                    yield neighbor, DIAGONAL_COST
+
+    def _heuristic(self, a, b):
+        """
+        Returns the octile distance between nodes [a] and [b], the length of the
+        shortest path between them when nothing is in the way.
+        """
+        a_row, a_col = divmod(a, self.num_cols)
+        b_row, b_col = divmod(b, self.num_cols)
+        d_row, d_col = abs(a_row - b_row), abs(a_col - b_col)
+        return STRAIGHT_COST * max(d_row, d_col) + (
+            DIAGONAL_COST - STRAIGHT_COST
+        ) * min(d_row, d_col)
+
+    # --------------------- SEARCH -------------- #
+
+    def _key(self, index):
+        best = min(self.g[index], self.rhs[index])
+        return (best + self._heuristic(self.start, index) + self._km, best)
+
+    def _push(self, index):
+        key = self._key(index)
+        self._keys[index] = key
+        heapq.heappush(self._open, (key, index))
+
+    def _top_key(self):
+        """
+        Returns the smallest key in the open set, dropping stale heap entries.
+        """
+        while self._open:
+            key, index = self._open[0]
+            if self._keys.get(index) == key:
+                return key
+            heapq.heappop(self._open)
+        return (INFINITY, INFINITY)
+
+    def _update_node(self, index):
+        """
+        Recomputes the rhs of node [index] from its neighbors, and puts it in the
+        open set if it is inconsistent or takes it out if not.
+        """
+        if index != self.goal:
+            best = INFINITY
+            g = self.g
+            for neighbor, cost in self._neighbors(index):
+                if cost + g[neighbor] < best:
+                    best = cost + g[neighbor]
+            self.rhs[index] = best
+        if self.g[index] != self.rhs[index]:
+            self._push(index)
+        else:
+            self._keys.pop(index, None)
+
+    def compute_shortest_path(self):
+        """
+        Expands nodes until the distance from the start to the goal is known.
+        Returns the number of nodes expanded.
+        """
+        expanded = 0
+        start = self.start
+        while True:
+            top = self._top_key()
+            if not (top < self._key(start) or self.rhs[start] != self.g[start]):
+                break
+            _, index = heapq.heappop(self._open)
+            key = self._key(index)
+            if top < key:
+                # the key is out of date since the start moved
+                self._push(index)
+                continue
+            del self._keys[index]
+            expanded += 1
+            if self.g[index] > self.rhs[index]:
+                self.g[index] = self.rhs[index]
+                for neighbor, _ in self._neighbors(index):
+                    self._update_node(neighbor)
+            else:
+                self.g[index] = INFINITY
+                self._update_node(index)
+                for neighbor, _ in self._neighbors(index):
+                    self._update_node(neighbor)
+        self.num_expanded += expanded
+        return expanded
+
+    # --------------------- CHANGES -------------- #
+
+    def move_start(self, start):
+        """
+        Moves the robot to the node at (row, col) [start], before the next
+        compute_shortest_path.
+        """
+        self._move_start(self._index(start))
+
+    def _move_start(self, start):
+        self._km += self._heuristic(self._last, start)
+        self._last = start
+        self.start = start
+
+    def update_nodes(self, positions):
+        """
+        Takes into account that the nodes at the (row, col) [positions] became, or
+        stopped being, obstacles, before the next compute_shortest_path.
+        """
+        changed = set()
+        for position in positions:
+            index = self._index(position)
+            changed.add(index)
+            changed.update(neighbor for neighbor, _ in self._neighbors(index))
+        for index in changed:
+            self._update_node(index)
+
+    def add_obstacles(self, positions):
+        """
+        Marks the nodes at the (row, col) [positions] as obstacles on the grid,
+        and updates the search for them.
+        """
+        self.grid.mark_obstacles(positions)
+        self.update_nodes(positions)
+
+    # --------------------- RESULTS -------------- #
+
+    def get_cost(self):
+        """
+        Returns the length in meters of the shortest path from the start to the
+        goal, infinite if the goal cannot be reached. [float]
+        """
+        self.compute_shortest_path()
+        return self.g[self.start] / STRAIGHT_COST * self.grid.step_size
+
+    def get_path(self):
+        """
+        Returns the (row, col) positions of a shortest path from the start to the
+        goal, both included, or an empty list if the goal cannot be reached.
+
+        Only the first step from a node is known to be on a shortest path once
+        its own distance is known, so the path is traced by moving the start
+        along it, searching again at every step, and moving it back at the end.
+        Every step only expands the nodes whose distance is not known yet.
+        """
+        start = self.start
+        self.compute_shortest_path()
+        if self.g[start] == INFINITY:
+            return []
+        path = [divmod(start, self.num_cols)]
+        index = start
+        while index != self.goal:
+            if index != start:
+                self._move_start(index)
+                self.compute_shortest_path()
+            index = min(
+                self._neighbors(index), key=lambda item: item[1] + self.g[item[0]]
+            )[0]
+            path.append(divmod(index, self.num_cols))
+        self._move_start(start)
+        return path
@@ -1,5 +1,4 @@
 import numpy as np
-from numpy.linalg import inv
 from engine.kinematics import integrate_odom
 import math
 import matplotlib.pyplot as plt
@@ -27,11 +26,26 @@ class LocalizationEKF:
 
     def __init__(self, init_mu, init_sigma, robot_width):
         self.robot_width = robot_width
-        self.mu = init_mu
-        self.sigma = init_sigma
+        self.mu = np.array(init_mu, dtype=float).reshape(3, 1)
+        self.sigma = np.array(init_sigma, dtype=float).reshape(3, 3)
         # process noise matrix
-        self.Q = np.array([[10, 0, 0], [0, 10, 0], [0, 0, 10]])
-        self.R = np.array([[5, 0, 0], [0, 5, 0], [0, 0, 5]])  # measurement noise matrix
+        self.Q = np.array([[10.0, 0, 0], [0, 10, 0], [0, 0, 10]])
+        self.R = np.array(
+            [[5.0, 0, 0], [0, 5, 0], [0, 0, 5]]
+        )  # measurement noise matrix
+
+        # Work buffers, allocated once and reused by every step: the filter runs
+        # every time_step, and allocating the intermediate matrices of each step
+        # costs more than the arithmetic on them.
+        self._mu_bar = np.empty((3, 1))
+        self._sigma_bar = np.empty((3, 3))
+        self._jac_G = np.eye(3)
+        self._jac_G_T = self._jac_G.T
+        self._jac_H = np.eye(3)
+        self._jac_H_T = self._jac_H.T
+        self._identity = np.eye(3)
+        self._product = np.empty((3, 3))
+        self._update_buffers = {}
 
     @staticmethod
     def get_predicted_state(pose, control):
@@ -161,37 +175,188 @@ class LocalizationEKF:
         Let arc_lengths be a tuple such that it represents
         (left-side-length-traveled, right-side-length-traveled)
 
-        [mu_bar, sigma_bar]
+        [mu_bar, sigma_bar], which are work buffers of the filter: they are
+        overwritten by the next predict_step.
         """
-        controls = self.get_controls(arc_lengths)  # [d, phi]
+        d, phi = self.get_controls(arc_lengths)
+        self._predict(d, phi)
+        return self._mu_bar, self._sigma_bar
 
-        jac_G = self.get_g_jac(self.mu, controls)
-
-        mu_bar = self.get_predicted_state(self.mu, controls)
-        sigma_bar = jac_G * self.sigma * np.transpose(jac_G) + self.Q
-
-        return mu_bar, sigma_bar
+    def _predict(self, d, phi):
+        """
+        Writes the predicted state and covariance after moving [d] and turning
+        [phi] from mu into the mu_bar and sigma_bar buffers, without allocating:
+        the in-place equivalent of get_predicted_state and get_g_jac.
+        """
+        x, y, theta = self.mu.item(0), self.mu.item(1), self.mu.item(2)
+        mu_bar, jac_G = self._mu_bar, self._jac_G
+        if phi == 0:
+            mu_bar[0, 0] = x + d * math.cos(theta)
+            mu_bar[1, 0] = y + d * math.sin(theta)
+            mu_bar[2, 0] = theta
+            jac_G[0, 2] = -d * math.sin(theta)
+            jac_G[1, 2] = d * math.cos(theta)
+        else:
+            sin_0, cos_0 = math.sin(theta), math.cos(theta)
+            sin_1, cos_1 = math.sin(theta + phi), math.cos(theta + phi)
+            mu_bar[0, 0] = x + (d / phi) * (sin_1 - sin_0)
+            mu_bar[1, 0] = y + (d / phi) * (cos_0 - cos_1)
+            mu_bar[2, 0] = (theta + phi + math.pi) % (2 * math.pi) - math.pi
+            jac_G[0, 2] = (d / phi) * (cos_1 - cos_0)
+            jac_G[1, 2] = (d / phi) * (sin_1 - sin_0)
+
+        # sigma_bar = G sigma G^T + Q
+        np.matmul(jac_G, self.sigma, out=self._product)
+        np.matmul(self._product, self._jac_G_T, out=self._sigma_bar)
+        np.add(self._sigma_bar, self.Q, out=self._sigma_bar)
 
     def update_step(self, mu_bar, sigma_bar, measurement):
         """
-        Returns the distribution of the robot's state after the update step of the EKF, based
-        on the robot's sensor measurements.
-        [mu, sigma]
-        TODO: Fix this specification. update_step is a procedure and does not return anything.
+        Updates mu and sigma, the distribution of the robot's state, with the
+        update step of the EKF from the predicted distribution [mu_bar],
+        [sigma_bar] and the robot's sensor [measurement]. [3x1]
+        """
+        buffers = self._get_update_buffers(3)
+        # the expected measurement is mu_bar itself, see get_expected_measurement
+        np.subtract(measurement, mu_bar, out=buffers["innovation"])
+        self._correct(
+            mu_bar,
+            sigma_bar,
+            buffers["innovation"],
+            self._jac_H,
+            self._jac_H_T,
+            self.R,
+        )
+
+    def predict_odometry(self, d, phi):
         """
+        Moves mu and sigma forward by the prediction step of the EKF for the
+        robot moving [d] meters and turning [phi] radians, as measured by wheel
+        odometry.
 
-        jac_H = self.get_h_jac(mu_bar)
+        Returns the Jacobian G of the step, a work buffer of the filter that is
+        overwritten by the next prediction. [3x3 np array]
+        """
+        self._predict(d, phi)
+        np.copyto(self.mu, self._mu_bar)
+        np.copyto(self.sigma, self._sigma_bar)
+        return self._jac_G
 
-        kalman_gain = (
-            sigma_bar
-            * np.transpose(jac_H)
-            * inv(jac_H * sigma_bar * np.transpose(jac_H) + self.R)
+    def update_model(self, model, measurement):
+        """
+        Updates mu and sigma with the [measurement] ([k x 1], or a float if
+        k = 1) of a sensor with the MeasurementModel [model], which measures
+        only part of the state.
+        """
+        np.matmul(model.jac_H, self.mu, out=model.expected)
+        innovation = model.innovation
+        np.subtract(measurement, model.expected, out=innovation)
+        for row in model.angles:
+            angle = innovation.item(row, 0) + math.pi
+            innovation[row, 0] = angle % (2 * math.pi) - math.pi
+        self._correct(
+            self.mu, self.sigma, innovation, model.jac_H, model.jac_H_T, model.R
         )
 
-        # JULIE NOTE: I think expected_measurement == mu_bar, since mu_bar represents
-        # our prediction of the robot's state based on the controls.
-        expected_measurement = self.get_expected_measurement(mu_bar)
+    def _get_update_buffers(self, k):
+        """
+        Returns the work buffers of the update step for measurements of [k]
+        dimensions, allocated on the first update with [k] dimensions.
+        """
+        buffers = self._update_buffers.get(k)
+        if buffers is None:
+            buffers = {
+                "innovation": np.empty((k, 1)),
+                "PH_T": np.empty((3, k)),
+                "S": np.empty((k, k)),
+                "K_T": np.empty((k, 3)),
+                "KR": np.empty((3, k)),
+                "correction": np.empty((3, 1)),
+                "I_KH": np.empty((3, 3)),
+            }
+            buffers["PH_T_T"] = buffers["PH_T"].T
+            buffers["K"] = buffers["K_T"].T
+            buffers["I_KH_T"] = buffers["I_KH"].T
+            self._update_buffers[k] = buffers
+        return buffers
+
+    def _correct(self, mu_bar, sigma_bar, innovation, jac_H, jac_H_T, R):
+        """
+        Writes into mu and sigma the distribution corrected by the measurement
+        [innovation] ([k x 1], measurement minus expected measurement) of a
+        sensor with Jacobian [jac_H] ([k x 3], transposed [jac_H_T]) and noise
+        covariance [R] ([k x k]), in the buffers of the update.
+
+        The Kalman gain K = sigma_bar H^T S^-1 is found by solving with the
+        innovation covariance S = H sigma_bar H^T + R rather than inverting it,
+        and sigma is updated in the Joseph form
+        (I - K H) sigma_bar (I - K H)^T + K R K^T, which stays symmetric and
+        positive definite under rounding.
+        """
+        buffers = self._get_update_buffers(len(R))
+        PH_T, S, K_T, K = buffers["PH_T"], buffers["S"], buffers["K_T"], buffers["K"]
+        I_KH, product = buffers["I_KH"], self._product
+
+        np.matmul(sigma_bar, jac_H_T, out=PH_T)
+        np.matmul(jac_H, PH_T, out=S)
+        np.add(S, R, out=S)
+        # S K^T = H sigma_bar^T = (sigma_bar H^T)^T, as S and sigma_bar are symmetric
+        np.copyto(K_T, np.linalg.solve(S, buffers["PH_T_T"]))
+
+        np.matmul(K, innovation, out=buffers["correction"])
+        np.add(mu_bar, buffers["correction"], out=self.mu)
+
+        np.matmul(K, jac_H, out=I_KH)
+        np.subtract(self._identity, I_KH, out=I_KH)
+        np.matmul(I_KH, sigma_bar, out=product)
+        np.matmul(product, buffers["I_KH_T"], out=self.sigma)
+        np.matmul(K, R, out=buffers["KR"])
+        np.matmul(buffers["KR"], K_T, out=product)
+        np.add(self.sigma, product, out=self.sigma)
+
+
+class MeasurementModel:
+    """
+    A sensor that measures part of the robot's state linearly, with its own
+    Jacobian and noise, for LocalizationEKF.update_model.
+
+    INSTANCE ATTRIBUTES:
+        # jac_H: the Jacobian of the measurement, which selects the measured
+            parts of the state [k x 3 np array]
+        # jac_H_T: jac_H transposed [3 x k np array]
+        # R: measurement noise covariance matrix [k x k np array]
+        # angles: rows of the measurement that are angles in radians, whose
+            innovations are wrapped to [-pi, pi) [int tuple]
+        # expected, innovation: work buffers of the update [k x 1 np array]
+    """
+
+    def __init__(self, jac_H, R, angles=()):
+        """
+        Arguments:
+            jac_H: the [k x 3] Jacobian of the measurement
+            R: the [k x k] measurement noise covariance matrix
+            angles: rows of the measurement that are angles in radians
+        """
+        self.jac_H = np.array(jac_H, dtype=float).reshape(-1, 3)
+        self.jac_H_T = self.jac_H.T
+        k = len(self.jac_H)
+        self.R = np.array(R, dtype=float).reshape(k, k)
+        self.angles = tuple(angles)
+        self.expected = np.empty((k, 1))
+        self.innovation = np.empty((k, 1))
+
+    @classmethod
+    def position(cls, R):
+        """
+        Returns the model of a sensor of the x and y position, such as the GPS,
+        with the [2 x 2] noise covariance [R].
+        """
+        return cls([[1, 0, 0], [0, 1, 0]], R)
 
-        self.mu = mu_bar + (kalman_gain @ (measurement - expected_measurement))
-        kh = kalman_gain * jac_H
-        self.sigma = (np.eye(np.size(kh, 0)) - kh) @ sigma_bar
+    @classmethod
+    def heading(cls, R):
+        """
+        Returns the model of a sensor of the heading in radians, such as the
+        IMU's magnetometer, with the [1 x 1] noise covariance [R].
+        """
+        return cls([[0, 0, 1]], R, angles=(0,))
@@ -0,0 +1,280 @@
+import ast
+import math
+
+import numpy as np
+
+from engine.ekf import MeasurementModel
+from engine.geodesy import get_projection
+
+"""
+Headless replay of recorded sensor logs through a LocalizationEKF, followed by a
+Rauch-Tung-Striebel (RTS) smoother.
+
+A log is one python dictionary literal per line, as written by the GPS and IMU
+scripts (csv_files/GPS_*.txt, csv_files/imu_360_sample1.csv). load_log reads one
+and log_measurements turns a GPS and an IMU log into one [n x 3] array of
+(x, y, heading) frames, with nan where a sensor has no reading for the frame.
+
+EKFReplay runs the filter over every frame in a loop that does nothing but the
+filter steps, recording the predicted and filtered distributions, then smooths
+the whole track at once with rts_smooth: the smoothed state of every frame
+also uses the measurements after it.
+"""
+
+TWO_PI = 2 * math.pi
+
+
+def load_log(path):
+    """
+    Returns the list of dictionaries logged, one per line, in the file at
+    [path].
+    """
+    with open(path) as file:
+        return [ast.literal_eval(line) for line in file if line.strip()]
+
+
+def log_measurements(gps_readings, imu_readings, origin=None):
+    """
+    Returns the frames of a GPS log and an IMU log, paired by index, as an
+    [n x 3] array of x and y (meters from [origin] in the grid frame) and
+    heading (radians), and the origin.
+
+    Arguments:
+        gps_readings: list of {"lon": ..., "lat": ...} dictionaries
+        imu_readings: list of {"mag": {"x": ..., "y": ...}, ...} dictionaries
+        origin: (latitude, longitude) of the origin of the frame, by default
+            the first GPS reading
+    The shorter log is padded with nan, frames where that sensor has no reading.
+    """
+    n = max(len(gps_readings), len(imu_readings))
+    measurements = np.full((n, 3), np.nan)
+    if gps_readings:
+        lats = np.array([reading["lat"] for reading in gps_readings])
+        longs = np.array([reading["lon"] for reading in gps_readings])
+        if origin is None:
+            origin = (lats[0], longs[0])
+        xs, ys = get_projection(tuple(origin)).gps_to_meters(lats, longs)
+        measurements[: len(xs), 0] = xs
+        measurements[: len(ys), 1] = ys
+    if imu_readings:
+        mag = np.array([(r["mag"]["x"], r["mag"]["y"]) for r in imu_readings])
+        # the heading of update_state
+        measurements[: len(mag), 2] = np.arctan2(mag[:, 1], mag[:, 0])
+    return measurements, origin
+
+
+def wrap_angles(angles):
+    """
+    Returns [angles] (radians, array) wrapped to [-pi, pi).
+    """
+    return (angles + math.pi) % TWO_PI - math.pi
+
+
+def rts_smooth(mus, sigmas, mu_bars, sigma_bars, jac_Gs):
+    """
+    Returns the smoothed means [n x 3] and covariances [n x 3 x 3] of the
+    Rauch-Tung-Striebel smoother, from the filtered means [mus] and covariances
+    [sigmas] of n frames, the predicted means [mu_bars] and covariances
+    [sigma_bars] of each frame before its update, and the Jacobians [jac_Gs] of
+    the prediction into each frame.
+
+    The smoother gains C_k = sigma_k G_k+1^T sigma_bar_k+1^-1 of all frames are
+    found with one batched solve. The backward recursion
+        mu_s_k = C_k mu_s_k+1 + (mu_k - C_k mu_bar_k+1)
+        sigma_s_k = C_k sigma_s_k+1 C_k^T + (sigma_k - C_k sigma_bar_k+1 C_k^T)
+    is a chain of affine maps, which is composed by recursive doubling: every
+    round composes each frame's map with the map 2^r frames after it, so that
+    log2(n) rounds of batched products replace the n steps of a loop.
+    """
+    mus = np.array(mus, dtype=float)
+    n = len(mus)
+    mu_bars = np.array(mu_bars, dtype=float)
+    # unwrap the headings so the recursion is linear across the +-pi seam
+    mus[:, 2] = np.unwrap(mus[:, 2])
+    mu_bars[:, 2] = mus[:, 2] + wrap_angles(mu_bars[:, 2] - mus[:, 2])
+
+    gains = np.zeros((n, 3, 3))
+    # C_k^T = sigma_bar_k+1^-1 G_k+1 sigma_k, as the covariances are symmetric
+    gains[:-1] = np.linalg.solve(sigma_bars[1:], jac_Gs[1:] @ sigmas[:-1])
+    gains[:-1] = gains[:-1].transpose(0, 2, 1)
+    gains_T = gains.transpose(0, 2, 1)
+
+    offsets = np.array(mus)
+    offsets[:-1] -= (gains[:-1] @ mu_bars[1:, :, None])[:, :, 0]
+    covariances = np.array(sigmas, dtype=float)
+    covariances[:-1] -= gains[:-1] @ sigma_bars[1:] @ gains_T[:-1]
+
+    step = 1
+    while step < n:
+        head, tail = gains[:-step], gains[step:]
+        offsets[:-step] += (head @ offsets[step:, :, None])[:, :, 0]
+        covariances[:-step] += head @ covariances[step:] @ gains_T[:-step]
+        gains[:-step] = head @ tail
+        step *= 2
+
+    offsets[:, 2] = wrap_angles(offsets[:, 2])
+    return offsets, covariances
+
+
+class EKFReplay:
+    """
+    INSTANCE ATTRIBUTES:
+        # ekf: the LocalizationEKF the log is replayed through
+        # gps_model, heading_model: the MeasurementModel of the x and y columns
+            and of the heading column of the measurements
+        # measurements: the replayed (x, y, heading) frames [n x 3 np array]
+        # mus, sigmas: filtered mean [n x 3] and covariance [n x 3 x 3] of
+            every frame
+        # mu_bars, sigma_bars: predicted mean and covariance of every frame,
+            before its measurements
+        # heading_bars: mean and variance of the heading of every frame just
+            before its heading update [n x 2 np array]
+        # jac_Gs: Jacobian of the prediction into every frame [n x 3 x 3]
+        # smoothed_mus, smoothed_sigmas: smoothed mean and covariance of every
+            frame, None until smooth is called
+    """
+
+    def __init__(self, ekf, gps_model=None, heading_model=None):
+        """
+        Arguments:
+            ekf: the LocalizationEKF, at the state before the first frame
+            gps_model: MeasurementModel of the x and y measurements, by default
+                with the noise of ekf.R
+            heading_model: MeasurementModel of the heading measurements, by
+                default with the noise of ekf.R
+        """
+        self.ekf = ekf
+        if gps_model is None:
+            gps_model = MeasurementModel.position(ekf.R[:2, :2])
+        if heading_model is None:
+            heading_model = MeasurementModel.heading(ekf.R[2:, 2:])
+        self.gps_model = gps_model
+        self.heading_model = heading_model
+        self.measurements = None
+        self.mus = self.sigmas = None
+        self.mu_bars = self.sigma_bars = self.jac_Gs = None
+        self.heading_bars = None
+        self.smoothed_mus = self.smoothed_sigmas = None
+
+    def run(self, measurements, controls=None):
+        """
+        Runs the filter over every frame of [measurements] ([n x 3], nan where a
+        sensor has no reading): the prediction step with the frame's
+        [controls] ([n x 2] of (d, phi), no motion by default), then an update
+        with the GPS x and y and an update with the heading, when there are
+        readings. Returns the filtered means [n x 3 np array].
+        """
+        measurements = np.asarray(measurements, dtype=float)
+        n = len(measurements)
+        if controls is None:
+            controls = np.zeros((n, 2))
+        self.measurements = measurements
+        self.mus, self.mu_bars = np.empty((n, 3)), np.empty((n, 3))
+        self.sigmas, self.sigma_bars = np.empty((n, 3, 3)), np.empty((n, 3, 3))
+        self.jac_Gs = np.empty((n, 3, 3))
+        self.heading_bars = np.full((n, 2), np.nan)
+        self.smoothed_mus = self.smoothed_sigmas = None
+
+        ekf, gps_model, heading_model = self.ekf, self.gps_model, self.heading_model
+        mu, sigma = ekf.mu, ekf.sigma
+        has_gps = ~np.isnan(measurements[:, :2]).any(axis=1)
+        has_heading = ~np.isnan(measurements[:, 2])
+        positions = measurements[:, :2, None]
+        headings = measurements[:, 2].tolist()
+        for i, (d, phi) in enumerate(controls.tolist()):
+            self.jac_Gs[i] = ekf.predict_odometry(d, phi)
+            self.mu_bars[i] = mu[:, 0]
+            self.sigma_bars[i] = sigma
+            if has_gps[i]:
+                ekf.update_model(gps_model, positions[i])
+            if has_heading[i]:
+                self.heading_bars[i] = mu.item(2), sigma.item(2, 2)
+                ekf.update_model(heading_model, headings[i])
+            self.mus[i] = mu[:, 0]
+            self.sigmas[i] = sigma
+        return self.mus
+
+    def smooth(self):
+        """
+        Smooths the replayed track with rts_smooth. Returns the smoothed means
+        [n x 3 np array].
+        """
+        self.smoothed_mus, self.smoothed_sigmas = rts_smooth(
+            self.mus, self.sigmas, self.mu_bars, self.sigma_bars, self.jac_Gs
+        )
+        return self.smoothed_mus
+
+    def statistics(self):
+        """
+        Returns a dictionary of the error statistics of the replay:
+            frames, gps_frames, heading_frames: numbers of frames and readings
+            filtered_position_rmse, smoothed_position_rmse: root mean square
+                distance (meters) between the GPS readings and the track
+            filtered_heading_rmse, smoothed_heading_rmse: root mean square
+                heading residual (radians)
+            mean_gps_nis, mean_heading_nis: mean normalized innovation
+                squared of the GPS and heading updates, which is the number of
+                dimensions measured (2 and 1) for a filter whose noise matches
+                the data
+            mean_position_std: mean standard deviation (meters) of the x and y
+                of the smoothed track
+        The smoothed values are nan until smooth is called.
+        """
+        measurements = self.measurements
+        has_gps = ~np.isnan(measurements[:, :2]).any(axis=1)
+        has_heading = ~np.isnan(measurements[:, 2])
+        stats = {
+            "frames": len(measurements),
+            "gps_frames": int(has_gps.sum()),
+            "heading_frames": int(has_heading.sum()),
+        }
+        for name, mus in [("filtered", self.mus), ("smoothed", self.smoothed_mus)]:
+            if mus is None:
+                stats[name + "_position_rmse"] = math.nan
+                stats[name + "_heading_rmse"] = math.nan
+                continue
+            residuals = measurements[has_gps, :2] - mus[has_gps, :2]
+            stats[name + "_position_rmse"] = _rms(np.hypot(*residuals.T))
+            residuals = wrap_angles(measurements[has_heading, 2] - mus[has_heading, 2])
+            stats[name + "_heading_rmse"] = _rms(residuals)
+
+        # the GPS update is the first of its frame, from the predicted state
+        innovations = measurements[has_gps, :2, None] - self.mu_bars[has_gps, :2, None]
+        S = self.sigma_bars[has_gps, :2, :2] + self.gps_model.R
+        nis = (innovations * np.linalg.solve(S, innovations)).sum(axis=(1, 2))
+        stats["mean_gps_nis"] = float(nis.mean()) if len(nis) else math.nan
+        means, variances = self.heading_bars[has_heading].T
+        innovations = wrap_angles(measurements[has_heading, 2] - means)
+        nis = innovations**2 / (variances + self.heading_model.R.item(0))
+        stats["mean_heading_nis"] = float(nis.mean()) if len(nis) else math.nan
+        if self.smoothed_sigmas is None:
+            stats["mean_position_std"] = math.nan
+        else:
+            variances = self.smoothed_sigmas[:, [0, 1], [0, 1]]
+            stats["mean_position_std"] = float(np.sqrt(variances).mean())
+        return stats
+
+    def write(self, path):
+        """
+        Writes the replay to the csv file at [path]: the statistics as "#"
+        comment lines, then one row per frame of the measurement, the filtered
+        state, the smoothed state and the standard deviations of the smoothed
+        state.
+        """
+        stats = self.statistics()
+        if self.smoothed_mus is None:
+            smoothed = np.full((len(self.mus), 6), np.nan)
+        else:
+            stds = np.sqrt(self.smoothed_sigmas[:, [0, 1, 2], [0, 1, 2]])
+            smoothed = np.hstack([self.smoothed_mus, stds])
+        frames = np.hstack([self.measurements, self.mus, smoothed])
+        header = [name + ": " + str(value) for name, value in stats.items()]
+        header.append(
+            "gps_x,gps_y,imu_heading,filtered_x,filtered_y,filtered_heading,"
+            "smoothed_x,smoothed_y,smoothed_heading,std_x,std_y,std_heading"
+        )
+        np.savetxt(path, frames, delimiter=",", header="\n".join(header))
+
+
+def _rms(values):
+    return float(np.sqrt(np.mean(np.square(values)))) if len(values) else math.nan
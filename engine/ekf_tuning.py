@@ -0,0 +1,181 @@
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine.ekf import LocalizationEKF
+from engine.ekf_replay import EKFReplay
+
+"""
+Tuning of the noise of the LocalizationEKF by replaying recorded logs.
+
+A configuration is a dictionary of the diagonal noise parameters in PARAMETERS:
+the process noise of x and y (q_xy) and of the heading (q_heading), and the
+measurement noise of the GPS x and y (r_gps) and of the heading (r_heading).
+grid_configurations and random_configurations make the configurations to try,
+and sweep replays a log (see engine.ekf_replay) through a filter with each one,
+on a pool of worker processes, and ranks them by:
+    "nis": consistency of the innovations, for which the mean normalized
+        innovation squared (NIS) of each sensor is the number of dimensions it
+        measures: the score is the sum over the GPS and the heading of
+        |log(mean NIS / dimensions)|, 0 for a filter whose noise matches the log
+    "rmse": root mean square distance (meters) between the filtered track and
+        a reference track, e.g. a surveyed path or a better receiver
+    "smoothed_rmse": the same, for the track smoothed by the RTS smoother
+Lower scores rank first.
+"""
+
+PARAMETERS = ("q_xy", "q_heading", "r_gps", "r_heading")
+RANKINGS = ("nis", "rmse", "smoothed_rmse")
+
+# the log replayed by the worker processes, sent once per worker
+_worker_log = None
+
+
+def grid_configurations(q_xy, q_heading, r_gps, r_heading):
+    """
+    Returns the configurations of every combination of the values in the lists
+    [q_xy], [q_heading], [r_gps] and [r_heading].
+    """
+    return [
+        dict(zip(PARAMETERS, values))
+        for values in itertools.product(q_xy, q_heading, r_gps, r_heading)
+    ]
+
+
+def random_configurations(num_configurations, bounds, seed=None):
+    """
+    Returns [num_configurations] configurations with every parameter drawn
+    log-uniformly between its (low, high) in the dictionary [bounds], as noise
+    parameters are usually unknown to an order of magnitude.
+    """
+    rng = np.random.default_rng(seed)
+    samples = {
+        name: np.exp(rng.uniform(*np.log(bounds[name]), num_configurations)).tolist()
+        for name in PARAMETERS
+    }
+    return [
+        {name: samples[name][i] for name in PARAMETERS}
+        for i in range(num_configurations)
+    ]
+
+
+def make_log(
+    measurements,
+    controls=None,
+    reference=None,
+    init_mu=None,
+    init_sigma=None,
+    robot_width=0.4,
+):
+    """
+    Returns the log replayed by evaluate and sweep: a dictionary of its frames
+    and of the filter's initial state.
+
+    Arguments:
+        measurements: [n x 3] frames of x, y and heading, nan where a sensor
+            has no reading (see engine.ekf_replay.log_measurements)
+        controls: [n x 2] odometry (d, phi) of the frames, no motion by default
+        reference: [n x 2] reference x and y of the frames, nan where unknown,
+            for the "rmse" and "smoothed_rmse" rankings
+        init_mu: initial state of the filter, by default the origin
+        init_sigma: initial covariance of the filter, by default 10 I
+        robot_width: width of the robot in meters
+    """
+    return {
+        "measurements": np.asarray(measurements, dtype=float),
+        "controls": None if controls is None else np.asarray(controls, dtype=float),
+        "reference": None if reference is None else np.asarray(reference, dtype=float),
+        "init_mu": np.zeros((3, 1)) if init_mu is None else init_mu,
+        "init_sigma": 10 * np.eye(3) if init_sigma is None else init_sigma,
+        "robot_width": robot_width,
+    }
+
+
+def evaluate(configuration, log, rank_by="nis"):
+    """
+    Replays the [log] (see make_log) through a filter with the noise of the
+    [configuration] and returns its statistics (see EKFReplay.statistics), the
+    configuration and its "score" for the ranking [rank_by]. [dict]
+    """
+    ekf = LocalizationEKF(log["init_mu"], log["init_sigma"], log["robot_width"])
+    ekf.Q = np.diag(
+        [configuration["q_xy"], configuration["q_xy"], configuration["q_heading"]]
+    )
+    ekf.R = np.diag(
+        [configuration["r_gps"], configuration["r_gps"], configuration["r_heading"]]
+    )
+    replay = EKFReplay(ekf)
+    replay.run(log["measurements"], log["controls"])
+    if rank_by == "smoothed_rmse":
+        replay.smooth()
+    result = dict(configuration)
+    result.update(replay.statistics())
+
+    if rank_by == "nis":
+        # a sensor without readings in the log has a nan NIS, and no score
+        terms = [
+            abs(math.log(nis / dimensions))
+            for nis, dimensions in [
+                (result["mean_gps_nis"], 2),
+                (result["mean_heading_nis"], 1),
+            ]
+            if not math.isnan(nis)
+        ]
+        score = sum(terms) if terms else math.nan
+    else:
+        mus = replay.mus if rank_by == "rmse" else replay.smoothed_mus
+        errors = np.hypot(*(mus[:, :2] - log["reference"]).T)
+        score = float(np.sqrt(np.nanmean(errors**2)))
+    result["score"] = score
+    return result
+
+
+def sweep(configurations, log, rank_by="nis", max_workers=None, chunksize=None):
+    """
+    Evaluates every configuration of [configurations] on the [log] (see
+    make_log) on a pool of [max_workers] processes (all the cores by default,
+    none if 1), and returns their results (see evaluate) sorted by score, the
+    best first.
+
+    Every worker receives the log once, when it starts, and the configurations
+    in chunks of [chunksize], by default enough for about four chunks per
+    worker.
+    """
+    if rank_by not in RANKINGS:
+        raise ValueError("unknown ranking " + str(rank_by))
+    if rank_by != "nis" and log["reference"] is None:
+        raise ValueError("the " + rank_by + " ranking needs a reference track")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1:
+        results = [evaluate(config, log, rank_by) for config in configurations]
+    else:
+        with ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(log,)
+        ) as executor:
+            if chunksize is None:
+                chunksize = max(1, len(configurations) // (4 * max_workers))
+            results = list(
+                executor.map(
+                    _evaluate_in_worker,
+                    configurations,
+                    itertools.repeat(rank_by),
+                    chunksize=chunksize,
+                )
+            )
+    # nan scores, from logs without readings to score, rank last
+    return sorted(
+        results, key=lambda result: (math.isnan(result["score"]), result["score"])
+    )
+
+
+def _init_worker(log):
+    global _worker_log
+    _worker_log = log
+
+
+def _evaluate_in_worker(configuration, rank_by):
+    return evaluate(configuration, _worker_log, rank_by)
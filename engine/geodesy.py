@@ -0,0 +1,108 @@
+import functools
+import math
+
+import numpy as np
+
+from engine.kinematics import (
+    WGS84_A,
+    WGS84_E2,
+    get_meridian_arc,
+    get_meridian_latitude,
+)
+
+"""
+Conversions between GPS coordinates and meters in the local frame of a mission.
+
+The local frame is the frame of the Grid: x is the distance in meters east of
+the origin along the parallel of the point, y is the distance in meters north
+of the origin along a meridian, on the WGS-84 ellipsoid. These are the distances
+get_vincenty_x/get_vincenty_y measure with the iterative Vincenty formula, but
+signed, and in closed form:
+
+    x = N(lat) * cos(lat) * (long - long_0)
+    y = M(lat) - M(lat_0)
+
+with N the prime vertical radius of curvature and M the meridian arc from the
+equator (Helmert's series, kinematics.get_meridian_arc). A LocalProjection
+computes everything that depends on the origin (lat_0, long_0) once, and then
+converts single points, or whole Numpy arrays of points in one pass, both ways:
+the inverse inverts Helmert's series for the latitude
+(kinematics.get_meridian_latitude) and then divides x by the radius of the
+parallel, and comes back to within 10 nm of the point it came from over a 5 km
+field.
+
+Accuracy: over a 5 km x 5 km field, the conversions stay within 1 mm of
+get_vincenty_x/get_vincenty_y: the vincenty package rounds to 0.5 mm, and the
+geodesic it measures along x is shorter than the parallel by about 0.1 mm at
+5 km (see tests/functionality_tests/geodesy_benchmark.py). A strict
+east-north-up tangent plane at the origin would instead bend away from these
+distances by about x^2 * tan(lat_0) / (2 * R) north of them (about 1.8 m at 5 km
+east of an origin at 42 degrees latitude), and from the grid's node coordinates
+with them, which is why the local frame follows the parallels and meridians.
+"""
+
+
+class LocalProjection:
+    """
+    INSTANCE ATTRIBUTES:
+        # origin: (latitude, longitude) of the origin of the local frame [float tuple]
+    """
+
+    def __init__(self, origin):
+        """
+        Arguments:
+            origin: (latitude, longitude) of the point at x = 0, y = 0 [float tuple]
+        """
+        self.origin = (float(origin[0]), float(origin[1]))
+        self._origin_long = math.radians(self.origin[1])
+        self._origin_arc = get_meridian_arc(self.origin[0])
+
+    def gps_to_meters(self, lat, long):
+        """
+        Returns the (x, y) coordinates in meters of the point at latitude [lat]
+        and longitude [long] in the local frame.
+
+        [lat] and [long] may be floats, which returns floats, or Numpy arrays (or
+        sequences) of the same shape, which returns two arrays of that shape.
+        """
+        lat = np.asarray(lat, dtype=float)
+        phi = np.radians(lat)
+        prime_vertical_radius = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(phi) ** 2)
+        x = (
+            prime_vertical_radius
+            * np.cos(phi)
+            * (np.radians(np.asarray(long, dtype=float)) - self._origin_long)
+        )
+        y = get_meridian_arc(lat) - self._origin_arc
+        if x.ndim == 0:
+            return x.item(), y.item()
+        return x, y
+
+    def meters_to_gps(self, x, y):
+        """
+        Returns the (latitude, longitude) of the point at [x], [y] meters in the
+        local frame: the inverse of gps_to_meters.
+
+        [x] and [y] may be floats, which returns floats, or Numpy arrays (or
+        sequences) of the same shape, such as a whole trajectory, which returns
+        two arrays of that shape.
+        """
+        lat = get_meridian_latitude(np.asarray(y, dtype=float) + self._origin_arc)
+        phi = np.radians(lat)
+        prime_vertical_radius = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(phi) ** 2)
+        long = self._origin_long + np.asarray(x, dtype=float) / (
+            prime_vertical_radius * np.cos(phi)
+        )
+        long = np.degrees(long)
+        if lat.ndim == 0:
+            return lat.item(), long.item()
+        return lat, long
+
+
+@functools.lru_cache(maxsize=16)
+def get_projection(origin):
+    """
+    Returns the LocalProjection with the (latitude, longitude) [origin], built
+    once per origin and shared by every caller.
+    """
+    return LocalProjection(origin)
@@ -1,15 +1,27 @@
 import math
+from itertools import compress
 
 import numpy
 
-from engine.node import Node
+from engine.node import Node, NodeStore
 from engine.control_mode import ControlMode
+from engine.boustrophedon import boustrophedon_indices
+from engine.waypoint_stream import WaypointStream
+from engine.shape_mask import (
+    rectangle_mask,
+    circle_mask,
+    triangle_mask,
+    hexagon_mask,
+    polygon_mask,
+)
 import numpy as np
 from engine.kinematics import (
     meters_to_lat,
     meters_to_long,
     get_vincenty_x,
     get_vincenty_y,
+    get_ellipsoid_x,
+    get_ellipsoid_y,
 )
 from enum import Enum
 
@@ -34,12 +46,20 @@ class Grid:
 
     INSTANCE ATTRIBUTES:
         # lat_min, lat_max, long_min, long_max: minimum/maximum latitude/longitude boundary coordinates of the grid [float]
+        # step_size: distance between neighboring nodes, in meters [float]
+        # lat_step, long_step: latitude/longitude difference between neighboring rows/cols of nodes [float]
 
         # num_rows: Number of rows of Nodes in the grid [int]
         # num_cols: Number of columns of Nodes in the grid [int]
 
-        # nodes: 2D Numpy array of Nodes representing all the nodes in the grid.
-            Has dimensions [self.num_rows x self.num_cols]
+        # store: NodeStore holding the coordinates and state of every node, indexed by
+            flat index row * num_cols + col
+        # node_lats, node_longs: 2D views of the GPS coordinates of every node in store [float]
+        # node_xs, node_ys: 2D views of the meters coordinates of every node in store [float]
+            All have dimensions [self.num_rows x self.num_cols]
+
+        # nodes: 2D Numpy array of Node views over store representing all the nodes in the grid.
+            Has dimensions [self.num_rows x self.num_cols]. Only built on first access.
 
 
         #num_rows: Number of rows of Nodes in the grid [int]
@@ -56,88 +76,55 @@ class Grid:
 
     """
 
-    def __init__(self, lat_min, lat_max, long_min, long_max):
-        STEP_SIZE_METERS = 1
-
-        # ----------- HELPER FUNCTIONS FOR GRID INITIALIZATION ------------#
-        def calc_step(lat_min, lat_max, long_min, long_max, step_size_m):
-            """
-            Returns the number of rows and columns needed for a grid, given
-            latitude and longitude boundaries and a desired step size between
-            nodes in meters.
-
-            Parameters:
-            -----------
-            # lat_min, lat_max, long_min, long_max: desired latitude and longitude boundaries of the grid [float]
-            # step_size_m: step size in between nodes of the grid [float]
-            """
-            y_range = get_vincenty_y((lat_min, long_min), (lat_max, long_max))
-            x_range = get_vincenty_x((lat_min, long_min), (lat_max, long_max))
-
-            num_y_steps = int(y_range // step_size_m)
-            num_x_steps = int(x_range // step_size_m)
-
-            num_rows = num_y_steps + 1  # to account for starting node
-            num_cols = num_x_steps + 1
-            if num_y_steps < 2 or num_x_steps < 2:
-                raise Exception("STEP_SIZE_METERS is too big")
-
-            return num_rows, num_cols
-
-        def generate_nodes(start_lat, start_long, rows, cols, step_size_m):
-            """
-            Returns a 2D Numpy array of Node objects that make up the entire grid. Has dimensions [rows x cols]
-
-            Parameters:
-            -----------
-            # start_lat: latitude coordinate of the robot's starting position [float]
-            # start_long: longitude coordinate of the robot's starting position [float]
-            # rows: # of rows in the grid [int]
-            # cols: # of cols in the grid [int]
-            # step_size_m: step size in between nodes of the grid (in meters) [float]
-            """
-            node_list = np.empty([rows, cols], dtype=object)
-
-            gps_origin = (start_lat, start_long)
-
-            lat_step = meters_to_lat(step_size_m)
-            long_step = meters_to_long(step_size_m, start_lat)
-
-            # Develop the gps grid and gps traversal path in order of lawnmower
-            # traversal.
-            for i in range(cols):
-                for j in range(rows):
-                    if i % 2 == 0:
-                        lat = gps_origin[0] + j * lat_step
-                        long = gps_origin[1] + i * long_step
-                        x = get_vincenty_x(gps_origin, (lat, long))
-                        y = get_vincenty_y(gps_origin, (lat, long))
-                        node = Node(lat, long, x, y)
-                        node_list[j, i] = node
-                    elif i % 2 == 1:
-                        lat = gps_origin[0] + ((rows - 1) * lat_step) - j * lat_step
-                        long = gps_origin[1] + i * long_step
-                        x = get_vincenty_x(gps_origin, (lat, long))
-                        y = get_vincenty_y(gps_origin, (lat, long))
-                        node = Node(lat, long, x, y)
-                        row_index = rows - (j + 1)
-                        node_list[row_index, i] = node
-
-            return node_list
+    # default distance between neighboring nodes, in meters
+    STEP_SIZE_METERS = 1
+
+    def __init__(
+        self, lat_min, lat_max, long_min, long_max, store=None, step_size=None
+    ):
+        """
+        Arguments:
+            lat_min, lat_max, long_min, long_max: latitude/longitude boundaries of the grid [float]
+            store: NodeStore of precomputed nodes for these bounds, e.g. loaded by
+                engine.plan_cache. The nodes are generated when None.
+            step_size: distance between neighboring nodes in meters, STEP_SIZE_METERS
+                when None [float]
+        """
+        if step_size is None:
+            step_size = self.STEP_SIZE_METERS
+        STEP_SIZE_METERS = step_size
 
         # ----------------- GRID INITIALIZATION BEGINS ------------------- #
         self.lat_min = lat_min
         self.lat_max = lat_max
         self.long_min = long_min
         self.long_max = long_max
+        self.step_size = step_size
 
-        self.num_rows, self.num_cols = calc_step(
+        self.num_rows, self.num_cols = self.calc_step(
             lat_min, lat_max, long_min, long_max, STEP_SIZE_METERS
         )
-
-        self.nodes = generate_nodes(
-            lat_min, long_min, self.num_rows, self.num_cols, STEP_SIZE_METERS
-        )
+        self.lat_step = meters_to_lat(STEP_SIZE_METERS)
+        self.long_step = meters_to_long(STEP_SIZE_METERS, lat_min)
+
+        grid_shape = (self.num_rows, self.num_cols)
+        if store is None:
+            store = NodeStore.from_arrays(
+                *self.generate_node_coords(
+                    lat_min, long_min, self.num_rows, self.num_cols, STEP_SIZE_METERS
+                )
+            )
+        elif len(store) != self.num_rows * self.num_cols:
+            raise ValueError("store does not match the dimensions of the grid")
+        store.shape = grid_shape
+        self.store = store
+        self.node_lats = self.store.lat.reshape(grid_shape)
+        self.node_longs = self.store.long.reshape(grid_shape)
+        self.node_xs = self.store.x.reshape(grid_shape)
+        self.node_ys = self.store.y.reshape(grid_shape)
+        self._nodes = None
+        self._extents = None
+        self._extents_version = None
         self.border_nodes = None
         self.leftmost_node = None
         self.leftmost_node_pos = None
@@ -150,10 +137,124 @@ class Grid:
         self.curr_pos = None
         self.direction = self.Direction.RIGHT
         self.waypoints = []
+        # TurnPlanner for the turns between rows, plot_circle when None
+        self.turn_planner = None
         # RFWP
         self.vertical_waypoint_list = []
         self.horizontal_waypoint_list = [[] for _ in range(self.num_cols)]
 
+    # ----------- HELPER FUNCTIONS FOR GRID INITIALIZATION ------------#
+    @staticmethod
+    def calc_step(lat_min, lat_max, long_min, long_max, step_size_m):
+        """
+        Returns the number of rows and columns needed for a grid, given
+        latitude and longitude boundaries and a desired step size between
+        nodes in meters.
+
+        Parameters:
+        -----------
+        # lat_min, lat_max, long_min, long_max: desired latitude and longitude boundaries of the grid [float]
+        # step_size_m: step size in between nodes of the grid [float]
+        """
+        y_range = get_vincenty_y((lat_min, long_min), (lat_max, long_max))
+        x_range = get_vincenty_x((lat_min, long_min), (lat_max, long_max))
+
+        num_y_steps = int(y_range // step_size_m)
+        num_x_steps = int(x_range // step_size_m)
+
+        num_rows = num_y_steps + 1  # to account for starting node
+        num_cols = num_x_steps + 1
+        if num_y_steps < 2 or num_x_steps < 2:
+            raise Exception("STEP_SIZE_METERS is too big")
+
+        return num_rows, num_cols
+
+    @staticmethod
+    def generate_node_coords(
+        start_lat, start_long, rows, cols, step_size_m, first_row=0, first_col=0
+    ):
+        """
+        Returns the latitude, longitude, x and y coordinates of every node of
+        the grid as four 2D Numpy arrays of dimensions [rows x cols].
+
+        All coordinates are computed as whole arrays in one pass. The x/y
+        values come from the closed-form get_ellipsoid_x/get_ellipsoid_y,
+        which stay within 0.5 mm of the per-node Vincenty distances.
+
+        Parameters:
+        -----------
+        # start_lat: latitude coordinate of the robot's starting position [float]
+        # start_long: longitude coordinate of the robot's starting position [float]
+        # rows: # of rows in the grid [int]
+        # cols: # of cols in the grid [int]
+        # step_size_m: step size in between nodes of the grid (in meters) [float]
+        # first_row, first_col: index of the first row/col to generate, to generate
+            only a block of the grid [int]
+        """
+        gps_origin = (start_lat, start_long)
+
+        lat_step = meters_to_lat(step_size_m)
+        long_step = meters_to_long(step_size_m, start_lat)
+
+        row_lats = start_lat + np.arange(first_row, first_row + rows) * lat_step
+        col_longs = start_long + np.arange(first_col, first_col + cols) * long_step
+        lats = np.repeat(row_lats[:, np.newaxis], cols, axis=1)
+        longs = np.repeat(col_longs[np.newaxis, :], rows, axis=0)
+        xs = get_ellipsoid_x(gps_origin, (lats, longs))
+        ys = get_ellipsoid_y(gps_origin, (lats, longs))
+
+        return lats, longs, xs, ys
+
+    @classmethod
+    def from_gps_polygon(cls, vertices, step_size=None):
+        """
+        Returns a Grid covering the bounding box of the polygon with the given GPS
+        [vertices], a sequence of (latitude, longitude) pairs, with every node
+        inside the polygon activated. See activate_gps_polygon.
+        """
+        lats, longs = np.asarray(vertices, dtype=float).T
+        grid = cls(
+            lats.min(), lats.max(), longs.min(), longs.max(), step_size=step_size
+        )
+        grid.activate_gps_polygon(vertices)
+        return grid
+
+    @property
+    def nodes(self):
+        """
+        2D Numpy array of Node views over self.store, built the first time it is
+        accessed.
+        """
+        if self._nodes is None:
+            # fromiter avoids Numpy probing every Node as a possible sequence
+            node_list = np.fromiter(
+                self.store.nodes(range(len(self.store))),
+                dtype=object,
+                count=len(self.store),
+            )
+            self._nodes = node_list.reshape(self.get_shape())
+        return self._nodes
+
+    def get_node(self, row, col):
+        """
+        Returns a Node view of the node at [row], [col].
+        """
+        return self.store.node(row * self.num_cols + col)
+
+    def get_active_mask(self):
+        """
+        Returns a boolean array of dimensions [num_rows x num_cols] that is True
+        for every active node.
+        """
+        return self.store.get_flag(NodeStore.ACTIVE)
+
+    def get_border_mask(self):
+        """
+        Returns a boolean array of dimensions [num_rows x num_cols] that is True
+        for every border node.
+        """
+        return self.store.get_flag(NodeStore.BORDER)
+
     def get_active_waypoints_list(self):
         return self.active_waypoints_list
 
@@ -166,6 +267,34 @@ class Grid:
     def get_num_cols(self):
         return self.num_cols
 
+    def get_shape(self):
+        return (self.num_rows, self.num_cols)
+
+    def gps_to_index(self, lat, long):
+        """
+        Returns the fractional (row, col) grid position of the given GPS
+        coordinates, which may be Numpy arrays. Nodes are evenly spaced in
+        latitude and longitude, so this is exact for the grid's own nodes.
+        """
+        row = (np.asarray(lat) - self.lat_min) / self.lat_step
+        col = (np.asarray(long) - self.long_min) / self.long_step
+        return row, col
+
+    def m_coords_to_index(self, x, y):
+        """
+        Returns the (row, col) of the node nearest to the point [x], [y] meters
+        from the grid's origin, clamped to the grid.
+        """
+        row = min(max(int(round(y / self.step_size)), 0), self.num_rows - 1)
+        col = min(max(int(round(x / self.step_size)), 0), self.num_cols - 1)
+        # nodes are evenly spaced in latitude and longitude, not exactly in
+        # meters, so the neighbors of the estimate may be nearer
+        rows = slice(max(row - 1, 0), row + 2)
+        cols = slice(max(col - 1, 0), col + 2)
+        dist = np.hypot(self.node_xs[rows, cols] - x, self.node_ys[rows, cols] - y)
+        d_row, d_col = np.unravel_index(np.argmin(dist), dist.shape)
+        return rows.start + int(d_row), cols.start + int(d_col)
+
     # --------------------- METHODS TO ACTIVATE NODES ON THE GRID -------------- #
 
     def activate_node(self, coordinate):
@@ -181,9 +310,73 @@ class Grid:
         """
         Activates all the nodes in the given range.
         """
-        for y in range(row, row_limit):
-            for x in range(col, col_limit):
-                self.activate_node((y, x))
+        self.activate_mask(
+            rectangle_mask(self.get_shape(), row, col, row_limit, col_limit)
+        )
+
+    def activate_mask(self, mask):
+        """
+        Activates every node where the boolean array [mask] of dimensions
+        [num_rows x num_cols] is True, in a single array operation. Masks are
+        built with the functions in engine.shape_mask and combined with |, & and ~.
+
+        Unlike the activate_<shape> methods, this does not fill
+        vertical_waypoint_list or horizontal_waypoint_list.
+        """
+        self.store.set_flag(NodeStore.ACTIVE, mask)
+
+    def deactivate_mask(self, mask):
+        """
+        Deactivates every node where the boolean array [mask] is True, in a single
+        array operation.
+        """
+        self.store.clear_flag(NodeStore.ACTIVE, mask)
+
+    def set_active_mask(self, mask):
+        """
+        Replaces the active region of the grid with the boolean array [mask].
+        """
+        self.store.clear_flag(NodeStore.ACTIVE)
+        self.store.set_flag(NodeStore.ACTIVE, mask)
+
+    def mark_obstacles(self, positions):
+        """
+        Gives the nodes at the (row, col) [positions], a list or (n, 2) array, the
+        obstacle status. Returns their flat indices. [int Numpy array]
+        """
+        rows, cols = np.asarray(positions, dtype=int).reshape(-1, 2).T
+        indices = rows * self.num_cols + cols
+        self.store.set_status(NodeStore.OBSTACLE, indices)
+        return indices
+
+    def add_to_waypoint_lists(self, mask, keep_empty_rows=False):
+        """
+        Appends the nodes selected by [mask] to vertical_waypoint_list (one list
+        per row, in col order) and horizontal_waypoint_list (extending the list of
+        each col, in row order).
+
+        keep_empty_rows: whether rows without any selected node still append an
+            empty list to vertical_waypoint_list
+        """
+        rows, cols = np.nonzero(mask)
+        nodes = self.store.nodes(rows * self.num_cols + cols)
+
+        row_starts = np.searchsorted(rows, np.arange(self.num_rows + 1)).tolist()
+        for row in range(self.num_rows):
+            row_nodes = nodes[row_starts[row] : row_starts[row + 1]]
+            if row_nodes or keep_empty_rows:
+                self.vertical_waypoint_list.append(row_nodes)
+
+        by_col = np.argsort(cols, kind="stable")
+        col_nodes = [nodes[i] for i in by_col.tolist()]
+        col_starts = np.searchsorted(
+            cols[by_col], np.arange(self.num_cols + 1)
+        ).tolist()
+        for col in range(self.num_cols):
+            if col_starts[col] < col_starts[col + 1]:
+                self.horizontal_waypoint_list[col] += col_nodes[
+                    col_starts[col] : col_starts[col + 1]
+                ]
 
     def determine_active_waypoints(self, node):
         """
@@ -195,6 +388,15 @@ class Grid:
         else:
             self.inactive_waypoints_list.append(node)
 
+    def determine_active_waypoints_in_bulk(self, indices, waypoints):
+        """
+        Bulk version of determine_active_waypoints, for the Node views [waypoints]
+        of the nodes at flat indices [indices], using a single array lookup.
+        """
+        is_active = (self.store.state[indices] & NodeStore.ACTIVE).astype(bool)
+        self.active_waypoints_list += compress(waypoints, is_active.tolist())
+        self.inactive_waypoints_list += compress(waypoints, (~is_active).tolist())
+
     # --------------------- ADJUSTABLE TRAVERSAL ALGORITHMS -------------- #
 
     def get_active_neighbor_node(self, coordinate, row_max, col_max):
@@ -222,34 +424,26 @@ class Grid:
         Activates all the nodes in a rectangle based on row start/end, col
         start/end.
         """
-        self.horizontal_waypoint_list = [[] for _ in range(col_limit - col)]
-        for x in range(row, row_limit):
-            # RFWP
-            col_list = []
-            for y in range(col, col_limit):
-                self.nodes[x, y].is_active = True
-                col_list.append(self.nodes[x, y])
-                self.horizontal_waypoint_list[y - col].append(self.nodes[x, y])
-            self.vertical_waypoint_list.append(col_list)
+        self.activate_mask(
+            rectangle_mask(self.get_shape(), row, col, row_limit, col_limit)
+        )
+        # RFWP
+        block = np.arange(len(self.store)).reshape(self.get_shape())[
+            row:row_limit, col:col_limit
+        ]
+        self.vertical_waypoint_list += [self.store.nodes(r) for r in block]
+        self.horizontal_waypoint_list = [self.store.nodes(c) for c in block.T]
         return self.nodes
 
     def activate_circle(self, circle_center_row, circle_center_col, circle_radius):
         """
         Activates all the nodes in a circle based on center and radius.
         """
-        for x in range(self.num_rows):
-            col_list = []
-            for y in range(self.num_cols):
-                if (
-                    (x - circle_center_row) ** 2
-                    + (y - circle_center_col) ** 2
-                    - circle_radius**2
-                ) < 0:
-                    self.nodes[x, y].is_active = True
-                    col_list.append(self.nodes[x, y])
-                    self.horizontal_waypoint_list[y].append(self.nodes[x, y])
-            if col_list:
-                self.vertical_waypoint_list.append(col_list)
+        mask = circle_mask(
+            self.get_shape(), (circle_center_row, circle_center_col), circle_radius
+        )
+        self.activate_mask(mask)
+        self.add_to_waypoint_lists(mask)
 
     def is_inside_triangle(self, p1, p2, p3, p4):
         """A function to check whether point p4 lies inside the triangle formed by
@@ -305,20 +499,37 @@ class Grid:
         """
         Activates all the nodes in a triangle based on three vertices p1, p2, p3. The vertices should all be on the positive x-y quadrant
         """
-        for x in range(self.num_rows):
-            col = []
-            for y in range(self.num_cols):
-                if self.is_inside_triangle(p1, p2, p3, (x, y)):
-                    self.nodes[x, y].is_active = True
-                    self.horizontal_waypoint_list[y].append(self.nodes[x, y])
-                    col.append(self.nodes[x, y])
-            self.vertical_waypoint_list.append(col)
+        mask = triangle_mask(self.get_shape(), p1, p2, p3)
+        self.activate_mask(mask)
+        self.add_to_waypoint_lists(mask, keep_empty_rows=True)
+
+    def activate_polygon(self, vertices):
+        """
+        Activates all the nodes inside the (convex or concave) polygon with the
+        given (row, col) vertices. See shape_mask.polygon_mask.
+        """
+        self.activate_mask(polygon_mask(self.get_shape(), vertices))
+
+    def activate_gps_polygon(self, vertices):
+        """
+        Activates all the nodes inside the polygon with the given GPS [vertices],
+        a sequence of (latitude, longitude) pairs such as a surveyed shoreline.
+
+        The vertices are projected into grid index space once, and the interior
+        is found with the scanline fill of shape_mask.polygon_mask, so polygons
+        with thousands of vertices stay fast on grids with millions of nodes.
+        As for activate_polygon, the waypoint lists are left to the traversal
+        algorithms, which fill them as they generate their waypoints.
+        """
+        lat, long = np.asarray(vertices, dtype=float).T
+        row, col = self.gps_to_index(lat, long)
+        self.activate_mask(polygon_mask(self.get_shape(), np.column_stack((row, col))))
 
     def activate_parallelogram(self, row, col, row_limit):
         # Horizontal traversal does not currently work for this shape
-        for x in range(row, row_limit):
-            for y in range(0, col):
-                self.nodes[x, x + y].is_active = True
+        x = np.arange(self.num_rows)[:, np.newaxis]
+        y = np.arange(self.num_cols)[np.newaxis, :]
+        self.activate_mask((x >= row) & (x < row_limit) & (y - x >= 0) & (y - x < col))
         return self.nodes
 
     def activate_snake(self, start, end, spacing):
@@ -327,46 +538,20 @@ class Grid:
         (row, col) = start
         (row_limit, col_limit) = end
 
-        for x in range(row, row_limit):
-            if (x - row) % spacing == 0:
-                for y in range(col, col_limit + 1):
-                    self.nodes[x][y].is_active = True
-            else:
-                if (x - row) % (2 * spacing) < spacing:
-                    self.nodes[x][col_limit].is_active = True
-                else:
-                    self.nodes[x][col].is_active = True
+        rows = np.arange(row, row_limit)
+        offset = rows - row
+        is_full_row = offset % spacing == 0
+        is_right_end = ~is_full_row & (offset % (2 * spacing) < spacing)
+        is_left_end = ~is_full_row & ~is_right_end
 
+        mask = np.zeros(self.get_shape(), dtype=bool)
+        mask[rows[is_full_row], col : col_limit + 1] = True
+        mask[rows[is_right_end], col_limit] = True
+        mask[rows[is_left_end], col] = True
+        self.activate_mask(mask)
 
     def activate_hexagon(self, center, radius):
-        (row, col) = center
-
-        degrees_0 = (row + radius, col)
-        degrees_60 = (row + radius / 2, col + radius * math.sqrt(3) / 2)
-        degrees_120 = (row - radius / 2, col + radius * math.sqrt(3) / 2)
-        degrees_180 = (row - radius, col)
-        degrees_240 = (row - radius / 2, col - radius * math.sqrt(3) / 2)
-        degrees_300 = (row + radius / 2, col - radius * math.sqrt(3) / 2)
-        
-        # A circle circumscribes a hexagon
-        for x in range(row - radius, row + radius + 1):
-            for y in range(col - radius, col + radius + 1):
-                sector1 = self.is_inside_triangle(
-                    center, degrees_0, degrees_60, (x, y))
-                sector2 = self.is_inside_triangle(
-                    center, degrees_60, degrees_120, (x, y))
-                sector3 = self.is_inside_triangle(
-                    center, degrees_120, degrees_180, (x, y))
-                sector4 = self.is_inside_triangle(
-                    center, degrees_180, degrees_240, (x, y))
-                sector5 = self.is_inside_triangle(
-                    center, degrees_240, degrees_300, (x, y))
-                sector6 = self.is_inside_triangle(
-                    center, degrees_300, degrees_0, (x, y))
-
-                if (sector1 or sector2 or sector3 or 
-                    sector4 or sector5 or sector6):
-                    self.nodes[x, y].is_active = True
+        self.activate_mask(hexagon_mask(self.get_shape(), center, radius))
 
     def is_on_border(self, coordinate, row_limit, col_limit):
         """
@@ -396,14 +581,34 @@ class Grid:
                     return True
         return False
 
+    def get_active_border_mask(self):
+        """
+        Returns a boolean array of dimensions [num_rows x num_cols] that is True
+        for every active node that is on the edge of the grid or has an inactive
+        neighbor, i.e. every active node for which is_on_border is True.
+
+        The border is the active mask minus its morphological erosion: a node is
+        interior when it and all 8 of its neighbors are active, which is the AND
+        of 9 shifted copies of the mask padded with inactive nodes.
+        """
+        active = self.get_active_mask()
+        padded = np.pad(active, 1)
+        interior = np.ones_like(active)
+        for d_row in range(3):
+            for d_col in range(3):
+                interior &= padded[
+                    d_row : d_row + self.num_rows, d_col : d_col + self.num_cols
+                ]
+        return active & ~interior
+
     def find_border_nodes(self):
         """
         Find all activated border nodes on the grid.
         Based on these activated notes, finds the border nodes.
 
-        This function loops through all the nodes, checks if a particular node has
-        been activated, and if so checks to see if that node is a border node. At the
-        end of the function call, fields 'leftmost_node', 'leftmost_node_pos', and
+        The border nodes are found for the whole grid at once with
+        get_active_border_mask and flagged as border nodes. At the end of the
+        function call, fields 'leftmost_node', 'leftmost_node_pos', and
         'border_nodes' will be initialized.
         """
         is_vertical = True
@@ -412,32 +617,57 @@ class Grid:
             or self.direction == self.Direction.RIGHT
         ):
             is_vertical = False
-        border_list = []
-        leftmost_node = None
-        leftmost_node_pos = None
 
-        for row in range(self.num_rows):
-            for col in range(self.num_cols):
-                node = self.nodes[row][col]
-                if node.is_active and self.is_on_border(
-                    (row, col), self.num_rows, self.num_cols
-                ):
-                    # check if this is an active node and on the border
-                    self.nodes[row][col].is_border = True
-                    border_list.append((node, row, col))
-                    if (
-                        leftmost_node_pos is None
-                        or (not is_vertical and col < leftmost_node_pos[1])
-                        or (is_vertical and row < leftmost_node_pos[0])
-                    ):
-                        leftmost_node = node
-                        leftmost_node_pos = (row, col)
-
-        self.border_nodes = border_list
-        self.leftmost_node = leftmost_node
-        self.leftmost_node_pos = leftmost_node_pos
+        border = self.get_active_border_mask()
+        self.store.set_flag(NodeStore.BORDER, border)
+
+        rows, cols = np.nonzero(border)
+        nodes = self.store.nodes(rows * self.num_cols + cols)
+        self.border_nodes = list(zip(nodes, rows.tolist(), cols.tolist()))
+
+        if nodes:
+            # first node in row-major order with the smallest col (or row)
+            first = int(np.argmin(rows if is_vertical else cols))
+            self.leftmost_node = nodes[first]
+            self.leftmost_node_pos = (int(rows[first]), int(cols[first]))
+        else:
+            self.leftmost_node = None
+            self.leftmost_node_pos = None
 
     # --------------------- HELPER FUNCTIONS FOR TRAVERSAL CREATION -------------- #
+    def get_active_extents(self):
+        """
+        Returns the extent index of the active nodes as four lists
+        (row_min_col, row_max_col, col_min_row, col_max_row): for every row, the
+        smallest and largest col of an active node in that row, and for every col,
+        the smallest and largest row of an active node in that col. Entries are -1
+        for rows/cols without active nodes.
+
+        The outermost active node of a row or col always has an inactive neighbor,
+        so these are also the extents of the border set found by
+        find_border_nodes.
+
+        The index is cached and rebuilt only when the state of the grid's nodes
+        has changed since it was built (see NodeStore.version).
+        """
+        if self._extents is None or self._extents_version != self.store.version:
+            active = self.get_active_mask()
+
+            def extents(mask, axis):
+                size = mask.shape[axis]
+                has_active = mask.any(axis=axis)
+                first = np.where(has_active, np.argmax(mask, axis=axis), -1)
+                last = np.where(
+                    has_active,
+                    size - 1 - np.argmax(np.flip(mask, axis=axis), axis=axis),
+                    -1,
+                )
+                return first.tolist(), last.tolist()
+
+            self._extents = extents(active, 1) + extents(active, 0)
+            self._extents_version = self.store.version
+        return self._extents
+
     def edge_column_of_next_row(self, pos):
         """
         If the direction we are heading is Left, returns the column of the innermost
@@ -466,93 +696,57 @@ class Grid:
 
         If there are no more nodes in the next row, return None.
 
+        The edges are O(1) lookups in the extent index of get_active_extents.
+
         pos: the current position (col,row)
         """
-        # Obtain all border nodes in the next and current rows
+        row_min_col, row_max_col, col_min_row, col_max_row = self.get_active_extents()
         if (
             self.direction == self.Direction.RIGHT
             or self.direction == self.Direction.LEFT
         ):
-            # Note: node_info: (node, row, col)
-
-            # Obtain all border_nodes on the next col
-            candidate_nodes_next = [
-                node_info
-                for node_info in self.border_nodes
-                if node_info[2] == pos[1] + 1
-            ]
-            # Obtain all border_nodes on the current col
-            candidate_nodes_curr = [
-                node_info for node_info in self.border_nodes if node_info[2] == pos[1]
-            ]
+            # extents of the current and next col, as rows
+            line = pos[1]
+            if self.direction == self.Direction.RIGHT:
+                extent = col_max_row
+            else:
+                extent = col_min_row
         else:  # the direction is UP or DOWN
-            # Obtain all border_nodes on the next row
-            candidate_nodes_next = [
-                node_info
-                for node_info in self.border_nodes
-                if node_info[1] == pos[0] + 1
-            ]
-            # all border_nodes on current row
-            candidate_nodes_curr = [
-                node_info for node_info in self.border_nodes if node_info[1] == pos[0]
-            ]
+            # extents of the current and next row, as cols
+            line = pos[0]
+            if self.direction == self.Direction.UP:
+                extent = row_max_col
+            else:
+                extent = row_min_col
 
-        if candidate_nodes_next == [] and candidate_nodes_curr == []:
-            # There are no border nodes in the current row or next row
+        def lookup(i):
+            if 0 <= i < len(extent) and extent[i] >= 0:
+                return extent[i]
             return None
 
-        # node_info_curr is the last node we would traverse on the current row
-        if self.direction == self.Direction.RIGHT:
-            node_info_curr = max(
-                candidate_nodes_curr, key=lambda node_info: node_info[1]
-            )
-        elif self.direction == self.Direction.LEFT:
-            node_info_curr = min(
-                candidate_nodes_curr, key=lambda node_info: node_info[1]
-            )
-        elif self.direction == self.Direction.UP:
-            node_info_curr = max(
-                candidate_nodes_curr, key=lambda node_info: node_info[2]
-            )
-        elif self.direction == self.Direction.DOWN:
-            node_info_curr = min(
-                candidate_nodes_curr, key=lambda node_info: node_info[2]
-            )
+        # edge_next/edge_curr: the last position we would traverse on the next
+        # and current row
+        edge_next = lookup(line + 1)
+        edge_curr = lookup(line)
 
-        if candidate_nodes_next == []:
+        if edge_next is None and edge_curr is None:
+            # There are no border nodes in the current row or next row
+            return None
+        if edge_curr is None:
+            raise ValueError("there are no active nodes in the current row")
+
+        if edge_next is None:
             # Since there we have reached the last row that we can traverse,
             # let's traverse this last row
-            if (
-                self.direction == self.Direction.RIGHT
-                or self.direction == self.Direction.LEFT
-            ):
-                # return the x-axis of the last node we will traverse in the grid
-                return node_info_curr[1]
-            else:
-                return node_info_curr[2]
+            return edge_curr
+        elif (
+            self.direction == self.Direction.RIGHT
+            or self.direction == self.Direction.UP
+        ):
+            # compare it with the last node in the next row so we don't go overbounds during turning
+            return min(edge_next, edge_curr)
         else:
-            if self.direction == self.Direction.RIGHT:
-                # compare it with the last node in the next row so we don't go overbounds during turning
-                node_info_next = max(
-                    candidate_nodes_next, key=lambda node_info: node_info[1]
-                )
-                return min(node_info_next[1], node_info_curr[1])
-            elif self.direction == self.Direction.LEFT:
-                node_info_next = min(
-                    candidate_nodes_next, key=lambda node_info: node_info[1]
-                )
-                return max(node_info_next[1], node_info_curr[1])
-            elif self.direction == self.Direction.UP:
-                node_info_next = max(
-                    candidate_nodes_next, key=lambda node_info: node_info[2]
-                )
-                return min(node_info_next[2], node_info_curr[2])
-
-            elif self.direction == self.Direction.DOWN:
-                node_info_next = min(
-                    candidate_nodes_next, key=lambda node_info: node_info[2]
-                )
-                return max(node_info_next[2], node_info_curr[2])
+            return max(edge_next, edge_curr)
 
     def plot_circle(
         self, start_coordinate, center, orientation, theta_step=math.pi / 12
@@ -595,6 +789,28 @@ class Grid:
             raise Exception("invalid orientation")
         return circle_plt
 
+    def plot_turn(self, start_coordinate, orientation):
+        """
+        Returns the turn from the [start_pos] to the [end_pos] of
+        [start_coordinate] like plot_circle, but as the shortest turn the
+        turning radius of self.turn_planner allows, see engine.turn_planner.
+        The robot leaves [start_pos] and reaches [end_pos] perpendicular to the
+        line between them, turning [orientation] in the plane of the coordinates.
+        """
+        start_pos, end_pos = start_coordinate
+        heading = math.atan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0])
+        if orientation == self.Orientation.CCW:
+            heading -= math.pi / 2
+        elif orientation == self.Orientation.CW:
+            heading += math.pi / 2
+        else:
+            raise Exception("invalid orientation")
+        return self.turn_planner.get_turn(
+            (start_pos[0], start_pos[1], heading),
+            (end_pos[0], end_pos[1], heading + math.pi),
+            scale=1 / self.step_size,
+        )
+
     def get_turning_column(self, edge_column):
         """
         Returns the column where the robot should begin turning in a guided traversal.
@@ -632,6 +848,26 @@ class Grid:
         elif self.direction == self.Direction.DOWN:
             return self.curr_pos[1] <= (turning_column)
 
+    def get_turning_pos(self, turning_column):
+        """
+        Returns the position reached by stepping along the row with
+        get_next_traversal_pos until is_before_turning_column holds, computed
+        directly instead of one node at a time.
+
+        Arguments:
+            turning_column: int representing the column of where it should turn.
+        """
+        (pos_0, pos_1) = self.curr_pos
+        if self.direction == self.Direction.LEFT:
+            pos_0 -= max(0, math.ceil(pos_0 - turning_column))
+        elif self.direction == self.Direction.RIGHT:
+            pos_0 += max(0, math.ceil(turning_column - pos_0))
+        elif self.direction == self.Direction.UP:
+            pos_1 += max(0, math.ceil(turning_column - pos_1))
+        elif self.direction == self.Direction.DOWN:
+            pos_1 -= max(0, math.ceil(pos_1 - turning_column))
+        return (pos_0, pos_1)
+
     def switch_directions(self):
         """
         Switch the current waypoint creation direction.
@@ -688,10 +924,6 @@ class Grid:
                     ^
              0 -> 1 -> 2
         """
-        # The robot is traversing in the left direction, from right to left
-        # The next position in the left direction
-        new_pos = self.get_next_traversal_pos()
-
         # The next leftmost position in row above
         edge_column = self.edge_column_of_next_row(self.curr_pos)
 
@@ -707,11 +939,7 @@ class Grid:
             next_row = self.curr_pos[1] + 1
 
         # Traverse the row until it is time to turn
-
-        while not self.is_before_turning_column(turning_column):
-            # self.waypoints.append(new_pos)
-            self.curr_pos = new_pos
-            new_pos = self.get_next_traversal_pos()
+        self.curr_pos = self.get_turning_pos(turning_column)
 
         # Check whether turning to the next row is valid
         # Next row is out of bounds of the grid OR the node in the row/column above,
@@ -733,17 +961,23 @@ class Grid:
             # Create waypoints needed for a smooth turning trajectory to
             # "guide" our robot to the next original waypoint
             if is_vertical:
-                circle_plt = self.plot_circle(
-                    ((self.curr_pos[0], turning_column), (next_row, turning_column)),
-                    (self.curr_pos[0] + 0.5, turning_column),
-                    self.get_turn_orientation(),
+                turn_ends = (
+                    (self.curr_pos[0], turning_column),
+                    (next_row, turning_column),
                 )
+                center = (self.curr_pos[0] + 0.5, turning_column)
             else:
+                turn_ends = (
+                    (turning_column, self.curr_pos[1]),
+                    (turning_column, next_row),
+                )
+                center = (turning_column, self.curr_pos[1] + 0.5)
+            if self.turn_planner is None:
                 circle_plt = self.plot_circle(
-                    ((turning_column, self.curr_pos[1]), (turning_column, next_row)),
-                    (turning_column, self.curr_pos[1] + 0.5),
-                    self.get_turn_orientation(),
+                    turn_ends, center, self.get_turn_orientation()
                 )
+            else:
+                circle_plt = self.plot_turn(turn_ends, self.get_turn_orientation())
             self.waypoints += circle_plt
             # Update traversal details
             self.switch_directions()
@@ -865,68 +1099,103 @@ class Grid:
 
     # --------------------- STANDARD TRAVERSAL ALGORITHMS -------------- #
 
+    def get_spiral_ring_indices(self, k):
+        """
+        Returns the flat node indices of ring [k] of the clockwise spiral over the
+        whole grid, counting rings from the outside. [int Numpy array]
+        """
+        rows, cols = self.num_rows, self.num_cols
+        first_row, last_row = k, rows - 1 - k
+        first_col, last_col = k, cols - 1 - k
+        # along the first row, then along the last column
+        ring_rows = [
+            np.full(last_col - first_col + 1, first_row),
+            np.arange(first_row + 1, last_row + 1),
+        ]
+        ring_cols = [
+            np.arange(first_col, last_col + 1),
+            np.full(last_row - first_row, last_col),
+        ]
+        if first_row < last_row and first_col < last_col:
+            # back along the last row, then back along the first column
+            ring_rows += [
+                np.full(last_col - first_col, last_row),
+                np.arange(last_row - 1, first_row, -1),
+            ]
+            ring_cols += [
+                np.arange(last_col - 1, first_col - 1, -1),
+                np.full(last_row - first_row - 1, first_col),
+            ]
+        return np.concatenate(ring_rows) * cols + np.concatenate(ring_cols)
+
+    def get_num_spiral_rings(self):
+        return (min(self.num_rows, self.num_cols) + 1) // 2
+
+    def get_spiral_indices(self):
+        """
+        Returns the flat node indices of a clockwise spiral over the whole grid,
+        starting at the bottom left corner and moving inwards. [int Numpy array]
+
+        The spiral is built ring by ring with index arithmetic, so this runs in
+        O(num_rows * num_cols).
+        """
+        return np.concatenate(
+            [
+                self.get_spiral_ring_indices(k)
+                for k in range(self.get_num_spiral_rings())
+            ]
+        )
+
     def get_spiral_waypoints(self):
         """
         Returns the robot's spiral traversal path for the current grid using every
         single node of the grid. [Node list].
         """
-        waypoints = []
-        node_list = self.nodes
-
-        col = 0  # start at bottom left corner
-        row = 0
-
-        # these tuples simulate the robot's next movement based on turn state
-        step_col = (1, 0, -1, 0)
-        step_row = (0, 1, 0, -1)
-        turn_state = 0  # turn_state is a variable that must be between 0..3
-
-        for _ in range(self.num_rows * self.num_cols):  # for loop over all nodes
-            node = node_list[row, col]
-            self.determine_active_waypoints(node)
-            waypoints.append(node)
-            next_col = col + step_col[turn_state]
-            next_row = row + step_row[turn_state]
-            if (
-                0 <= next_col < self.num_cols
-                and 0 <= next_row < self.num_rows
-                and not node_list[next_row, next_col] in waypoints
-            ):
-                col = next_col
-                row = next_row
-            else:
-                turn_state = (turn_state + 1) % 4
-                next_col = col + step_col[turn_state]
-                next_row = row + step_row[turn_state]
-                col = next_col
-                row = next_row
+        indices = self.get_spiral_indices()
+        waypoints = self.store.nodes(indices)
+        self.determine_active_waypoints_in_bulk(indices, waypoints)
         waypoints.reverse()
         return waypoints
 
+    def iter_spiral_waypoints(self):
+        """
+        Generator form of get_spiral_waypoints, generating one ring of the spiral
+        at a time from the inside out.
+        """
+        for k in reversed(range(self.get_num_spiral_rings())):
+            yield from self._iter_nodes(self.get_spiral_ring_indices(k)[::-1])
+
+    def _iter_nodes(self, indices):
+        """
+        Yields the Node views of the nodes at flat [indices], sorting them into the
+        active/inactive waypoint lists as they are generated.
+        """
+        waypoints = self.store.nodes(indices)
+        self.determine_active_waypoints_in_bulk(indices, waypoints)
+        yield from waypoints
+
     def get_all_lawnmower_waypoints(self):
         """
         Returns the robot's lawnmower traversal path for the current grid using every
         single node of the grid. Starting node is the bottom left node of the list. [Node list].
         """
-        waypoints = []
-        node_list = self.nodes
-        for i in range(self.num_cols):
-            for j in range(self.num_rows):
-                # leftmost and rightmost nodes are considered border nodes
-                is_border = j == 0 or j == self.num_rows - 1
-                if i % 2 == 0:
-                    node = node_list[j, i]
-                    node.is_border = is_border
-                    self.determine_active_waypoints(node)
-                    waypoints.append(node)
-                elif i % 2 == 1:
-                    # adds the nodes in reverse order (not zigzag)
-                    row_index = self.num_rows - (j + 1)
-                    node = node_list[row_index, i]
-                    node.is_border = is_border
-                    self.determine_active_waypoints(node)
-                    waypoints.append(node)
-        return waypoints
+        return list(self.iter_all_lawnmower_waypoints())
+
+    def iter_all_lawnmower_waypoints(self):
+        """
+        Generator form of get_all_lawnmower_waypoints, generating one column at a
+        time.
+        """
+        # bottom and top rows are considered border nodes
+        is_border = np.zeros((self.num_rows, self.num_cols), dtype=bool)
+        is_border[[0, -1], :] = True
+        self.store.clear_flag(NodeStore.BORDER)
+        self.store.set_flag(NodeStore.BORDER, is_border)
+
+        column = np.arange(self.num_rows) * self.num_cols
+        for col in range(self.num_cols):
+            # odd columns are traversed top to bottom (zigzag)
+            yield from self._iter_nodes(column[::-1] + col if col % 2 else column + col)
 
     def get_border_lawnmower_waypoints(self):
         """
@@ -934,24 +1203,22 @@ class Grid:
         only nodes in the top/bottom row of the grid. Starting node is the bottom left
         node of the list. [Node list].
         """
-        waypoints = []
-        node_list = self.nodes
-        for i in range(self.num_cols):
-            if i % 2 == 0:
-                node1 = node_list[0, i]
-                node2 = node_list[self.num_rows - 1, i]
-                self.determine_active_waypoints(node1)
-                self.determine_active_waypoints(node2)
-                waypoints.append(node1)
-                waypoints.append(node2)
-            elif i % 2 == 1:
-                node1 = node_list[self.num_rows - 1, i]
-                node2 = node_list[0, i]
-                self.determine_active_waypoints(node1)
-                self.determine_active_waypoints(node2)
-                waypoints.append(node1)
-                waypoints.append(node2)
-        return waypoints
+        return list(self.iter_border_lawnmower_waypoints())
+
+    def iter_border_lawnmower_waypoints(self, chunk_size=256):
+        """
+        Generator form of get_border_lawnmower_waypoints, generating [chunk_size]
+        columns at a time.
+        """
+        top_row = (self.num_rows - 1) * self.num_cols
+        for first_col in range(0, self.num_cols, chunk_size):
+            cols = np.arange(first_col, min(first_col + chunk_size, self.num_cols))
+            indices = np.empty((len(cols), 2), dtype=int)
+            indices[:, 0] = cols
+            indices[:, 1] = cols + top_row
+            # odd columns are traversed top to bottom
+            indices[cols % 2 == 1] = indices[cols % 2 == 1, ::-1]
+            yield from self._iter_nodes(indices.ravel())
 
     def get_straight_line_waypoints(self, y_start_row=0, y_start_pct=None):
         """
@@ -965,16 +1232,40 @@ class Grid:
         y_start_pct: What percentage height that we want to start the straight line.(ex: 0.5: if there are 20 rows,
                      start straight line at the 10th row up) Default:None
         """
-        waypoints = []
-        node_list = self.nodes
+        return list(self.iter_straight_line_waypoints(y_start_row, y_start_pct))
+
+    def iter_straight_line_waypoints(
+        self, y_start_row=0, y_start_pct=None, chunk_size=256
+    ):
+        """
+        Generator form of get_straight_line_waypoints, generating [chunk_size]
+        nodes at a time.
+        """
         if y_start_pct is not None:
             selected_row = int(y_start_pct * self.num_rows)
         else:
             selected_row = y_start_row
-        for i in range(self.num_cols):
-            selected_row_node = node_list[selected_row][i]
-            self.determine_active_waypoints(selected_row_node)
-            waypoints.append(selected_row_node)
+        for first_col in range(0, self.num_cols, chunk_size):
+            cols = np.arange(first_col, min(first_col + chunk_size, self.num_cols))
+            yield from self._iter_nodes(selected_row * self.num_cols + cols)
+
+    def get_boustrophedon_waypoints(self):
+        """
+        Returns the robot's boustrophedon cell decomposition traversal path over the
+        active nodes of the grid, or over the whole grid if no node is active.
+        Starting node is the bottom node of the leftmost active column. [Node list].
+
+        See engine.boustrophedon: every cell of the active region is swept along the
+        axis needing the fewest turns, and cells are chained with shortest paths
+        through the active region.
+        """
+        mask = self.get_active_mask()
+        if not mask.any():
+            mask = np.ones(self.get_shape(), dtype=bool)
+        indices = boustrophedon_indices(mask)
+
+        waypoints = self.store.nodes(indices)
+        self.determine_active_waypoints_in_bulk(indices, waypoints)
         return waypoints
 
     def get_waypoints(self, mode):
@@ -1003,6 +1294,12 @@ class Grid:
                 - straight_line traversal across a row of nodes
                 - starting node is left most node at selected row
                 - ending node right most node at selected row
+            LAWNMOWER_GUIDED:
+                - guided lawnmower traversal inside the border of the active nodes
+                - starting node is the leftmost border node
+            BOUSTROPHEDON:
+                - boustrophedon cell decomposition traversal of the active nodes
+                - starting node is the bottom node of the leftmost active column
         """
         if mode == ControlMode.LAWNMOWER:
             waypoints = self.get_all_lawnmower_waypoints()
@@ -1014,6 +1311,40 @@ class Grid:
             waypoints = self.get_straight_line_waypoints(y_start_pct=0.5)
         elif mode == ControlMode.LAWNMOWER_GUIDED:
             waypoints = self.get_all_guided_lawnmower_waypoints_adjustable(True)
+        elif mode == ControlMode.BOUSTROPHEDON:
+            waypoints = self.get_boustrophedon_waypoints()
         else:
             return []
         return waypoints
+
+    def iter_waypoints(self, mode):
+        """
+        Generator form of get_waypoints, yielding the same waypoints in the same
+        order. LAWNMOWER, LAWNMOWER_B, SPIRAL and STRAIGHT traversals are generated
+        a piece at a time as they are consumed, and their waypoints are added to
+        the active/inactive waypoint lists as they are generated. Other
+        traversals are planned in full on the first waypoint.
+        """
+        if mode == ControlMode.LAWNMOWER:
+            return self.iter_all_lawnmower_waypoints()
+        elif mode == ControlMode.LAWNMOWER_B:
+            return self.iter_border_lawnmower_waypoints()
+        elif mode == ControlMode.SPIRAL:
+            return self.iter_spiral_waypoints()
+        elif mode == ControlMode.STRAIGHT:
+            return self.iter_straight_line_waypoints(y_start_pct=0.5)
+        return (waypoint for waypoint in self.get_waypoints(mode))
+
+    def get_waypoint_stream(self, mode):
+        """
+        Returns the robot's traversal path for the current grid as a WaypointStream
+        over iter_waypoints, so the robot can start moving before the whole
+        path is generated.
+        """
+        lengths = {
+            ControlMode.LAWNMOWER: self.num_rows * self.num_cols,
+            ControlMode.LAWNMOWER_B: 2 * self.num_cols,
+            ControlMode.SPIRAL: self.num_rows * self.num_cols,
+            ControlMode.STRAIGHT: self.num_cols,
+        }
+        return WaypointStream(self.iter_waypoints(mode), lengths.get(mode))
@@ -7,6 +7,16 @@ MAX_V = 5
 WHEEL_TO_CENTER = 0.2
 EARTH_RADIUS = 6371008.8  # meters
 
+# WGS-84 ellipsoid (same constants as the vincenty package)
+WGS84_A = 6378137.0  # semi-major axis in meters
+WGS84_F = 1 / 298.257223563  # flattening
+WGS84_E2 = WGS84_F * (2 - WGS84_F)  # first eccentricity squared
+WGS84_N = WGS84_F / (2 - WGS84_F)  # third flattening
+# rectifying radius: meters of meridian arc per radian of rectifying latitude
+WGS84_RECTIFYING_RADIUS = (
+    WGS84_A / (1 + WGS84_N) * (1 + WGS84_N**2 / 4 + WGS84_N**4 / 64)
+)
+
 
 def robot_to_global(pose, x_robot, y_robot):
     """
@@ -18,21 +28,9 @@ def robot_to_global(pose, x_robot, y_robot):
         x_R: x coordinate in robot/body frame
         y_R: y coordinate in robot/body frame
     """
-    px = pose[0]
-    py = pose[1]
-    theta = pose[2]
-    Tgr = np.array(
-        [
-            [math.cos(theta), -1 * math.sin(theta), px],
-            [math.sin(theta), math.cos(theta), py],
-            [0, 0, 1],
-        ]
-    )
-    # DEBUG UPDATE: added [1] to array in order to make it 3x3 times 3x1 rather than 2x1
     # rounding x,y coordinates to make it testable (ex: 4.000000001 --> 4); noise?
-    pose_global = np.matmul(Tgr, np.array([[x_robot], [y_robot], [1]]))
-    pose_global = pose_global.round(5)
-    return pose_global[0:2]
+    pose_global = robot_to_global_points(pose, [x_robot, y_robot]).round(5)
+    return pose_global.reshape(2, 1)
 
 
 def global_to_robot(pose, x_global, y_global):
@@ -43,26 +41,66 @@ def global_to_robot(pose, x_global, y_global):
         pose: robot's current pose (global) [3x1]
         x_global: x coordinate in global frame
         y_global: y coordinate in global frame
+    """
+    pose_robot = global_to_robot_points(pose, [x_global, y_global]).round(5)
+    return pose_robot.reshape(2, 1)
+
+
+def _as_poses(poses):
+    """
+    Returns [poses] as a float Numpy array of dimensions [... x 3], taking a
+    single [3x1] pose as a pose of dimensions [3].
+    """
+    poses = np.asarray(poses, dtype=float)
+    if poses.shape == (3, 1):
+        poses = poses.reshape(3)
+    return poses
+
+
+def robot_to_global_points(poses, points):
+    """
+    Transforms the points in robot coordinates [points] into global
+    coordinates. Outputs an np array of dimensions [... x 2].
+
+    Rotates and translates with the closed-form transform of each pose, so that
+    thousands of points (e.g. the obstacles seen by the sensors) cost one pass.
 
-        xy_global: 2D point in gloabl coordinates [2x1] (get rid of this?)
-    """
-    px = pose[0]
-    py = pose[1]
-    theta = pose[2]
-    Tgr = np.array(
-        [
-            [math.cos(theta), -1 * math.sin(theta), px],
-            [math.sin(theta), math.cos(theta), py],
-            [0, 0, 1],
-        ]
+    Inputs:
+        poses: the robot's pose (global), [3x1] or [3], or many poses
+            [... x 3]
+        points: points in robot/body frame [... x 2]
+
+    The leading dimensions of [poses] and [points] broadcast against each other:
+    one pose with [N x 2] points transforms all of them, [N x 3] poses with
+    [N x 2] points transform each point with its own pose, and [M x 1 x 3] poses
+    with [N x 2] points transform every point with every pose into [M x N x 2].
+    """
+    poses = _as_poses(poses)
+    points = np.asarray(points, dtype=float)
+    cos, sin = np.cos(poses[..., 2]), np.sin(poses[..., 2])
+    x, y = points[..., 0], points[..., 1]
+    return np.stack(
+        (poses[..., 0] + cos * x - sin * y, poses[..., 1] + sin * x + cos * y),
+        axis=-1,
     )
-    Trg = np.linalg.inv(Tgr)
-    # DEBUG UPDATE: Adjusting parameters to be consistent with first funtion
-    # Also adding [1] to make it a 3x3 times 3x1
-    # Changed * to @
-    pose_robot = Trg * [[x_global], [y_global], [1]]
-    pose_robot = pose_robot.round(5)
-    return pose_robot[0:2]
+
+
+def global_to_robot_points(poses, points):
+    """
+    Transforms the points in global coordinates [points] into robot
+    coordinates: the inverse of robot_to_global_points, with the same
+    dimensions.
+
+    Inputs:
+        poses: the robot's pose (global), [3x1] or [3], or many poses
+            [... x 3]
+        points: points in global frame [... x 2]
+    """
+    poses = _as_poses(poses)
+    points = np.asarray(points, dtype=float)
+    cos, sin = np.cos(poses[..., 2]), np.sin(poses[..., 2])
+    dx, dy = points[..., 0] - poses[..., 0], points[..., 1] - poses[..., 1]
+    return np.stack((cos * dx + sin * dy, cos * dy - sin * dx), axis=-1)
 
 
 def feedback_lin(curr_pose, vx_global, vy_global, epsilon):
@@ -134,8 +172,11 @@ def meters_to_gps(lat, long, dy, dx):
     """
     Returns the approximate gps coordinate of starting at (lat,long) and moving
     dx meters horizontally (E-W) and dy meters vertically. [N-S]
+
+    On a sphere; geodesy.LocalProjection.meters_to_gps is the exact inverse of
+    the local frame, for whole arrays of points.
     """
-    new_lat = lat + ((dy / EARTH_RADIUS) * (180 / math.pi)) / 1000
+    new_lat = lat + (dy / EARTH_RADIUS) * (180 / math.pi)
     new_long = long + (
         (dx / EARTH_RADIUS) * (180 / math.pi) / math.cos(lat * math.pi / 180)
     )
@@ -196,3 +237,82 @@ def get_haversine_y(coord1, coord2):
     coord1_y = (coord1[0], coord2[1])
     y = haversine(coord1_y, coord2, unit=Unit.METERS)
     return y
+
+
+def get_meridian_arc(lat):
+    """
+    Returns the distance in meters along a meridian from the equator to
+    latitude [lat] (degrees) on the WGS-84 ellipsoid. [lat] may be a float or a
+    Numpy array.
+
+    Uses Helmert's series in the third flattening, which is accurate to well
+    below a millimeter at any latitude.
+    """
+    n = WGS84_N
+    phi = np.radians(lat)
+    return WGS84_RECTIFYING_RADIUS * (
+        phi
+        - (3 / 2 * n - 9 / 16 * n**3) * np.sin(2 * phi)
+        + (15 / 16 * n**2 - 15 / 32 * n**4) * np.sin(4 * phi)
+        - 35 / 48 * n**3 * np.sin(6 * phi)
+        + 315 / 512 * n**4 * np.sin(8 * phi)
+    )
+
+
+def get_meridian_latitude(arc):
+    """
+    Returns the latitude (degrees) at the distance [arc] in meters along a
+    meridian from the equator on the WGS-84 ellipsoid: the inverse of
+    get_meridian_arc. [arc] may be a float or a Numpy array.
+
+    The inverse of Helmert's series, truncated at the same order, is off by
+    about 1e-13 radians; one Newton step on get_meridian_arc takes the latitude
+    to the rounding of the floats.
+    """
+    n = WGS84_N
+    mu = np.asarray(arc) / WGS84_RECTIFYING_RADIUS
+    phi = (
+        mu
+        + (3 / 2 * n - 27 / 32 * n**3) * np.sin(2 * mu)
+        + (21 / 16 * n**2 - 55 / 32 * n**4) * np.sin(4 * mu)
+        + 151 / 96 * n**3 * np.sin(6 * mu)
+        + 1097 / 512 * n**4 * np.sin(8 * mu)
+    )
+    # the derivative of the meridian arc is the meridian radius of curvature
+    meridian_radius = (
+        WGS84_A * (1 - WGS84_E2) / (1 - WGS84_E2 * np.sin(phi) ** 2) ** 1.5
+    )
+    phi = phi - (get_meridian_arc(np.degrees(phi)) - arc) / meridian_radius
+    return np.degrees(phi)
+
+
+def get_ellipsoid_x(coord1, coord2):
+    """
+    Closed-form equivalent of get_vincenty_x: the distance in meters along the
+    parallel at coord2's latitude from coord1's longitude to coord2's longitude.
+    Positive when coord2 is east of coord1.
+
+    coord2 may hold Numpy arrays of latitudes and longitudes, in which case an
+    array of distances is returned in one pass.
+
+    Accuracy: within 0.5 mm of get_vincenty_x for points up to 5 km apart, which
+    is the rounding of the vincenty package itself.
+    """
+    phi = np.radians(coord2[0])
+    prime_vertical_radius = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(phi) ** 2)
+    return prime_vertical_radius * np.cos(phi) * np.radians(coord2[1] - coord1[1])
+
+
+def get_ellipsoid_y(coord1, coord2):
+    """
+    Closed-form equivalent of get_vincenty_y: the distance in meters along a
+    meridian from coord1's latitude to coord2's latitude. Positive when coord2
+    is north of coord1.
+
+    coord2 may hold Numpy arrays of latitudes and longitudes, in which case an
+    array of distances is returned in one pass.
+
+    Accuracy: within 0.5 mm of get_vincenty_y for points up to 5 km apart, which
+    is the rounding of the vincenty package itself.
+    """
+    return get_meridian_arc(coord2[0]) - get_meridian_arc(coord1[0])
@@ -2,7 +2,8 @@ import math
 import threading
 import json
 
-from constants.definitions import ENGINE_PATH
+from constants.definitions import ENGINE_PATH, PLAN_CACHE_PATH
+from csv_files.csv_util import read_gps_polygon_from_csv
 from engine.robot import Robot
 from engine.robot_state import Robot_State
 from engine.mission import Mission
@@ -46,9 +47,13 @@ if __name__ == "__main__":
         init_control_mode = ControlMode.STRAIGHT
     elif init_control_mode == "roomba":
         init_control_mode = ControlMode.ROOMBA
+    elif init_control_mode == "boustrophedon":
+        init_control_mode = ControlMode.BOUSTROPHEDON
     else:
         raise Exception("Control Mode Undefined")
 
+    # csv file of the GPS vertices of the field, for a multi-resolution grid
+    field_file = config_args.get("multi_resolution_field")
     mission_state = Mission_State(
         robot=r2d2,
         base_station_coord=(
@@ -56,6 +61,14 @@ if __name__ == "__main__":
             user_args.get("base_long", -76.483682),
         ),
         init_control_mode=init_control_mode,
+        step_size=config_args.get("grid_step_size"),
+        tour_time_budget=config_args.get("tour_time_budget"),
+        stream_waypoints=config_args.get("stream_waypoints"),
+        smooth_turns=config_args.get("smooth_turns"),
+        multi_resolution_field=(
+            read_gps_polygon_from_csv(field_file) if field_file else None
+        ),
+        plan_cache_dir=PLAN_CACHE_PATH if config_args.get("plan_cache") else None,
     )
     r2d2_state.control_mode = mission_state.control_mode
     m = Mission(mission_state=mission_state)
@@ -1,7 +1,25 @@
+import logging
 from collections import deque
 from engine.control_mode import ControlMode
 from engine.grid import Grid
 from engine.base_station import BaseStation
+from engine.distance_field import DistanceField
+from engine.node import Node
+from engine.plan_cache import load_or_plan
+from engine.quadtree_grid import QuadTreeGrid
+from engine.replanner import Replanner
+from engine.tour_optimizer import optimize_tour
+from engine.turn_planner import TurnPlanner
+from engine.waypoint_stream import WaypointStream
+
+# Traversals where every waypoint is a node to cover, so their order is free. The
+# waypoints of the others are the ends of sweeps, and reordering them would skip
+# the nodes in between.
+REORDERABLE_MODES = (
+    ControlMode.LAWNMOWER,
+    ControlMode.SPIRAL,
+    ControlMode.BOUSTROPHEDON,
+)
 
 
 class Mission_State:
@@ -18,9 +36,22 @@ class Mission_State:
         Instance Attributes:
             robot: the Robot object linked to this Mission
             control_mode: the traversal mode linked to this Mission.
-            grid: the Grid which the robot should traverse
+            grid: the Grid which the robot should traverse. Without a "grid" kwarg, the default grid
+                and its waypoints are loaded from the plan cache in the "plan_cache_dir" kwarg
+                (None, the default, disables the cache), see engine.plan_cache. The "step_size" kwarg sets the
+                distance between nodes of the default grid in meters. The grid may be a TiledGrid,
+                whose waypoints are generated as the robot reaches them. With a true "stream_waypoints"
+                kwarg, the waypoints of a Grid are generated as the robot reaches them too, see
+                Grid.get_waypoint_stream. With a "multi_resolution_field" kwarg, the GPS (latitude, longitude)
+                vertices of a field, the grid is a QuadTreeGrid over the field, see engine.quadtree_grid.
+                With a true "smooth_turns" kwarg, the turns between the rows of a guided traversal are
+                planned by a TurnPlanner for the turning radius of the robot, see engine.turn_planner.
             base_station: the BaseStation object linked to this Mission.
             all_waypoints: TODO
+                With a "tour_time_budget" kwarg (seconds, None or 0 disables) and a control mode in
+                REORDERABLE_MODES, the waypoints of a traversal of only a part of the grid (a partial
+                activation) are reordered into a shorter path with engine.tour_optimizer, and
+                tour_lengths holds the (before, after) path lengths in meters.
             active_waypoints: TODO
             inactive_waypoints: TODO
             waypoints_to_visit: TODO
@@ -32,22 +63,150 @@ class Mission_State:
                 before it can start docking.
             time_limit: the maximum time the robot can execute roomba traversal mode
             roomba_radius: the maximum radius from the base station that the robot in roomba traversal mode can move
+            replanner: the Replanner repairing waypoints_to_visit around obstacles, made by the first call to
+                add_obstacles
+            distance_field: the DistanceField from the base station used to return, computed for a Grid when the
+                mission is made, see get_distance_field. With a true "return_active_only" kwarg, the way back
+                stays within the active nodes of the grid.
 
         Important: All the ports of the electrical classes (ie. Serial) need to be updated to the respective
                     ports they are connected to on the computer running the code.
         """
         self.robot = robot
         self.control_mode = ControlMode(init_control_mode)
-        self.grid = kwargs.get(
-            "grid", Grid(42.444250, 42.444599, -76.483682, -76.483276)
-        )  # Default grid to eng quad
+        stream_waypoints = kwargs.get("stream_waypoints", False)
+        turn_planner = None
+        if kwargs.get("smooth_turns"):
+            turn_planner = TurnPlanner.for_robot(robot.robot_state)
+        if kwargs.get("multi_resolution_field") is not None:
+            # coarse cells over the open field, the fine step along its border
+            self.grid = QuadTreeGrid(
+                kwargs["multi_resolution_field"], step_size=kwargs.get("step_size")
+            )
+            self.all_waypoints = self.grid.get_waypoints(self.control_mode)
+        elif "grid" in kwargs or stream_waypoints:
+            if "grid" in kwargs:
+                self.grid = kwargs["grid"]
+            else:
+                # Default grid to eng quad. Streamed traversals skip the plan
+                # cache, which loads the whole traversal
+                self.grid = Grid(
+                    42.444250,
+                    42.444599,
+                    -76.483682,
+                    -76.483276,
+                    step_size=kwargs.get("step_size"),
+                )
+            if turn_planner is not None and isinstance(self.grid, Grid):
+                self.grid.turn_planner = turn_planner
+            if stream_waypoints and isinstance(self.grid, Grid):
+                self.all_waypoints = self.grid.get_waypoint_stream(self.control_mode)
+            else:
+                self.all_waypoints = self.grid.get_waypoints(self.control_mode)
+        else:
+            # Default grid to eng quad, loaded from the plan cache when possible
+            self.grid, self.all_waypoints = load_or_plan(
+                42.444250,
+                42.444599,
+                -76.483682,
+                -76.483276,
+                self.control_mode,
+                cache_dir=kwargs.get("plan_cache_dir"),
+                step_size=kwargs.get("step_size"),
+                turn_planner=turn_planner,
+            )
+        self.tour_lengths = None
+        if kwargs.get("tour_time_budget") and self.control_mode in REORDERABLE_MODES:
+            # guided traversals mix Nodes with grid positions, which are not
+            # reordered, streamed traversals are never held as a whole, and the
+            # waypoints of a QuadTreeGrid are the ends of sweeps
+            if not (
+                isinstance(self.grid, Grid)
+                and isinstance(self.all_waypoints, list)
+                and all(isinstance(waypoint, Node) for waypoint in self.all_waypoints)
+            ):
+                logging.warning("Tour optimization is not available for this traversal")
+            elif len(self.all_waypoints) < len(self.grid.store):
+                # only a part of the grid is traversed, e.g. the active nodes of
+                # several shapes; a traversal of every node only steps between
+                # neighbors, and is kept as generated
+                self.all_waypoints, before, after = optimize_tour(
+                    self.all_waypoints, kwargs["tour_time_budget"]
+                )
+                self.tour_lengths = (before, after)
+                logging.info("Tour length: %.1f m -> %.1f m", before, after)
         self.base_station = BaseStation(coord=base_station_coord, grid=self.grid)
-        self.all_waypoints = self.grid.get_waypoints(self.control_mode)
         self.active_waypoints = self.grid.get_active_waypoints_list()
         self.inactive_waypoints = self.grid.get_inactive_waypoints_list()
-        self.waypoints_to_visit = deque(self.all_waypoints)
+        if isinstance(self.all_waypoints, WaypointStream):
+            # a lazily generated traversal is consumed as is
+            self.waypoints_to_visit = self.all_waypoints
+        else:
+            self.waypoints_to_visit = deque(self.all_waypoints)
         self.allowed_dist_error = kwargs.get("allowed_dist_error", 0.5)
         self.allowed_heading_error = kwargs.get("allowed_heading_error", 0.1)
         self.allowed_docking_pos_error = kwargs.get("allowed_docking_pos_error", 0.1)
         self.time_limit = kwargs.get("time_limit", 400)
         self.roomba_radius = kwargs.get("roomba_radius", 20)
+        self.replanner = None
+        self.return_active_only = kwargs.get("return_active_only", False)
+        self.distance_field = None
+        if isinstance(self.grid, Grid):
+            # computed up front, so the cost of returning can be checked at every
+            # control step of the traversal
+            self.distance_field = DistanceField(
+                self.grid,
+                self.grid.m_coords_to_index(*self.base_station.position),
+                active_only=self.return_active_only,
+            )
+
+    def get_distance_field(self):
+        """
+        Returns the DistanceField of the grid from the base station's node,
+        computed when the mission is made, see engine.distance_field. Returns
+        None, and logs a warning, for a TiledGrid, which is never held in memory
+        as a whole.
+        """
+        if self.distance_field is None:
+            logging.warning(
+                "The distance field is not available for a %s",
+                type(self.grid).__name__,
+            )
+        return self.distance_field
+
+    def add_obstacles(self, positions):
+        """
+        Marks the nodes of the grid at the (row, col) [positions] as obstacles, and
+        repairs waypoints_to_visit around them in place, see engine.replanner, and
+        the distance field, if any. Returns the number of damaged stretches of the
+        plan that were repaired.
+
+        Only a Grid traversal held in a deque of Nodes can be repaired; otherwise
+        the nodes are only marked, a warning is logged, and 0 is returned.
+        """
+        if (
+            self.replanner is None
+            or self.replanner.waypoints is not self.waypoints_to_visit
+        ):
+            self.replanner = None
+            if (
+                isinstance(self.grid, Grid)
+                and isinstance(self.waypoints_to_visit, deque)
+                and all(
+                    getattr(node, "store", None) is self.grid.store
+                    for node in self.waypoints_to_visit
+                )
+            ):
+                self.replanner = Replanner(self.grid, self.waypoints_to_visit)
+        if self.replanner is None:
+            logging.warning(
+                "Replanning is not available for this traversal, the obstacles are "
+                "only marked"
+            )
+            self.grid.mark_obstacles(positions)
+            num_repairs = 0
+        else:
+            num_repairs = self.replanner.add_obstacles(positions)
+        if self.distance_field is not None:
+            self.distance_field.update_nodes(positions)
+        return num_repairs
@@ -1,6 +1,145 @@
+import numpy as np
+
+
+class NodeStore:
+    """Compact struct-of-arrays storage for a set of Nodes, e.g. all the nodes of
+    a Grid. Each node costs 33 bytes, and whole-grid queries (which nodes are
+    active, which are on the border, ...) are plain Numpy array operations.
+
+    INSTANCE ATTRIBUTES:
+    shape: dimensions of the node set, e.g. (num_rows, num_cols) [int tuple]
+
+    lat, long, x, y: flat float64 arrays of the node coordinates, in the same
+        units as the Node attributes of the same name
+
+    state: flat uint8 array packing the remaining Node attributes
+        [bit 0 = is_active, bit 1 = is_border, bits 2-7 = status]
+
+    OBSTACLE: the status of the nodes marked as obstacles [int]
+
+    version: incremented every time the state of any node changes, so that
+        caches derived from the state can tell when they are stale [int]
+
+    Flat index i corresponds to position np.unravel_index(i, shape).
+    """
+
+    ACTIVE = 1
+    BORDER = 2
+    STATUS_SHIFT = 2
+    STATUS_MASK = 0b11111100
+    OBSTACLE = 2
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        size = int(np.prod(self.shape))
+        self.lat = np.zeros(size)
+        self.long = np.zeros(size)
+        self.x = np.zeros(size)
+        self.y = np.zeros(size)
+        self.state = np.zeros(size, dtype=np.uint8)
+        self.version = 0
+
+    @classmethod
+    def from_arrays(cls, lat, long, x, y):
+        """
+        Returns a NodeStore holding the given coordinate arrays, which must all
+        have the same shape. The arrays are copied.
+        """
+        store = cls(np.shape(lat))
+        store.lat[:] = np.ravel(lat)
+        store.long[:] = np.ravel(long)
+        store.x[:] = np.ravel(x)
+        store.y[:] = np.ravel(y)
+        return store
+
+    @classmethod
+    def from_buffers(cls, lat, long, x, y, state):
+        """
+        Returns a NodeStore backed by the given flat arrays without copying them,
+        e.g. arrays memory-mapped from a file. [state] must have dtype uint8.
+        """
+        store = cls.__new__(cls)
+        store.shape = np.shape(lat)
+        store.lat, store.long, store.x, store.y = lat, long, x, y
+        store.state = state
+        store.version = 0
+        return store
+
+    def __len__(self):
+        return self.state.size
+
+    def node(self, index):
+        """
+        Returns a Node view of the node at flat index [index].
+        """
+        return Node.view(self, index)
+
+    def nodes(self, indices):
+        """
+        Returns a list of Node views of the nodes at the given flat indices.
+        """
+        view = Node.view
+        return [view(self, index) for index in np.asarray(indices).tolist()]
+
+    def get_flag(self, flag):
+        """
+        Returns a boolean array of dimensions [shape] that is True where [flag]
+        (NodeStore.ACTIVE or NodeStore.BORDER) is set.
+        """
+        return (self.state & flag).astype(bool).reshape(self.shape)
+
+    def set_flag(self, flag, mask=None):
+        """
+        Sets [flag] on every node where the boolean array [mask] is True, or on
+        every node if [mask] is None.
+        """
+        if mask is None:
+            self.state |= flag
+        else:
+            self.state[np.ravel(mask)] |= flag
+        self.version += 1
+
+    def clear_flag(self, flag, mask=None):
+        """
+        Clears [flag] on every node where the boolean array [mask] is True, or on
+        every node if [mask] is None.
+        """
+        keep = np.uint8(0xFF ^ flag)
+        if mask is None:
+            self.state &= keep
+        else:
+            self.state[np.ravel(mask)] &= keep
+        self.version += 1
+
+    def get_status(self):
+        """
+        Returns a uint8 array of dimensions [shape] holding the status of every node.
+        """
+        return (self.state >> self.STATUS_SHIFT).reshape(self.shape)
+
+    def set_status(self, status, mask=None):
+        """
+        Sets the status of every node where the boolean array [mask] is True, or
+        of every node if [mask] is None.
+        """
+        bits = np.uint8((status << self.STATUS_SHIFT) & self.STATUS_MASK)
+        keep = np.uint8(0xFF ^ self.STATUS_MASK)
+        if mask is None:
+            self.state &= keep
+            self.state |= bits
+        else:
+            selected = np.ravel(mask)
+            self.state[selected] = (self.state[selected] & keep) | bits
+        self.version += 1
+
+
 class Node:
     """Instances represent the position node of the robot's graph traversal.
 
+    A Node is a thin view over one entry of a NodeStore. Nodes of a Grid share
+    the Grid's store, so reading or writing their attributes reads or writes the
+    Grid's arrays. A Node created directly gets a store of its own.
+
     INSTANCE ATTRIBUTES:
     lat: latitude GPS coordinate (y) [float]
     long: longitude GPS coordinate (x) [float]
@@ -18,7 +157,11 @@ class Node:
 
     """
 
+    __slots__ = ("_store", "_index")
+
     def __init__(self, lat, long, x, y, is_border=False, active=False, status=0):
+        self._store = NodeStore((1,))
+        self._index = 0
         self.lat = lat
         self.long = long
         self.x = x
@@ -27,6 +170,91 @@ class Node:
         self.status = status
         self.is_active = active
 
+    @classmethod
+    def view(cls, store, index):
+        """
+        Returns a Node backed by the entry at flat index [index] of [store].
+        """
+        node = object.__new__(cls)
+        node._store = store
+        node._index = index
+        return node
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def lat(self):
+        return self._store.lat.item(self._index)
+
+    @lat.setter
+    def lat(self, value):
+        self._store.lat[self._index] = value
+
+    @property
+    def long(self):
+        return self._store.long.item(self._index)
+
+    @long.setter
+    def long(self, value):
+        self._store.long[self._index] = value
+
+    @property
+    def x(self):
+        return self._store.x.item(self._index)
+
+    @x.setter
+    def x(self, value):
+        self._store.x[self._index] = value
+
+    @property
+    def y(self):
+        return self._store.y.item(self._index)
+
+    @y.setter
+    def y(self, value):
+        self._store.y[self._index] = value
+
+    def _get_bit(self, flag):
+        return bool(self._store.state.item(self._index) & flag)
+
+    def _set_bit(self, flag, value):
+        state = self._store.state.item(self._index) & (0xFF ^ flag)
+        self._store.state[self._index] = state | flag if value else state
+        self._store.version += 1
+
+    @property
+    def is_active(self):
+        return self._get_bit(NodeStore.ACTIVE)
+
+    @is_active.setter
+    def is_active(self, value):
+        self._set_bit(NodeStore.ACTIVE, value)
+
+    @property
+    def is_border(self):
+        return self._get_bit(NodeStore.BORDER)
+
+    @is_border.setter
+    def is_border(self, value):
+        self._set_bit(NodeStore.BORDER, value)
+
+    @property
+    def status(self):
+        return self._store.state.item(self._index) >> NodeStore.STATUS_SHIFT
+
+    @status.setter
+    def status(self, value):
+        state = self._store.state.item(self._index) & (0xFF ^ NodeStore.STATUS_MASK)
+        bits = (int(value) << NodeStore.STATUS_SHIFT) & NodeStore.STATUS_MASK
+        self._store.state[self._index] = state | bits
+        self._store.version += 1
+
     def get_m_coords(self):
         return (self.x, self.y)
 
@@ -62,4 +290,16 @@ class Node:
             return False
 
     def __repr__(self):
-        return "".join("(" + str(self.lat) + "," + str(self.long) + ")")
+        return "".join(
+            "(" + _format_coord(self.lat) + "," + _format_coord(self.long) + ")"
+        )
+
+
+def _format_coord(value):
+    """
+    Formats a stored coordinate the way the original Python number printed,
+    i.e. without a trailing ".0" for whole numbers.
+    """
+    if value.is_integer():
+        return str(int(value))
+    return str(value)
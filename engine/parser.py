@@ -71,6 +71,7 @@ def parse_main():
             "spiral",
             "roomba",
             "straight",
+            "boustrophedon",
         ],
         help="determines initial control mode",
     )
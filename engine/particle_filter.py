@@ -0,0 +1,309 @@
+import math
+
+import numpy as np
+
+from engine.ekf import LocalizationEKF, MeasurementModel
+
+"""
+A particle filter localization for the robot, the alternative to the
+LocalizationEKF when the sensor errors are not unimodal Gaussians: the GPS jumps
+by meters near the buildings of the engineering quad, and an EKF follows the
+jump. The particles follow any distribution of the state, and the measurement
+likelihood has a floor, so a reading far outside of its noise weighs all the
+particles about the same instead of dragging them to it.
+
+ParticleFilter has the interface of LocalizationEKF (predict_step, update_step,
+predict_odometry, update_model, mu, sigma, Q, R), so it replaces the EKF in
+SensorFusion and update_state; Robot_State.using_particle_filter selects it.
+
+The motion and measurement models are applied to all the particles at once, in
+work buffers allocated once, and mu and sigma are only computed from the
+particles when they are read: the filter runs at the rate of the IMU, and its
+estimate is read once per control step.
+"""
+
+TWO_PI = 2 * math.pi
+# largest number of measurement noise matrices whose whitening is cached
+MAX_WHITENINGS = 16
+
+
+class ParticleFilter:
+    """
+    INSTANCE ATTRIBUTES:
+        # robot_width: the width of the robot (meters)
+        # particles: the (x, y, theta) poses of the particles; the headings are
+            wrapped to [-pi, pi) when the particles are resampled [N x 3 np array]
+        # weights: the normalized weights of the particles [N np array]
+        # mu: the weighted mean of the particles, in the form [[x],[y],[theta]],
+            with the circular mean of the headings [3x1 np array]
+        # sigma: the weighted covariance of the particles [3x3 np array]
+        # Q: the process noise covariance matrix, of the noise added to every
+            particle by every prediction [3x3 np array]
+        # R: measurement noise covariance matrix of update_step [3x3 np array]
+        # outlier_likelihood: floor of the likelihood of a measurement, relative
+            to its largest value; measurements further than
+            sqrt(-2 log(outlier_likelihood)) standard deviations from a particle
+            all weigh it about the same [float]
+        # resample_threshold: fraction of N under which the effective number of
+            particles triggers a resampling [float]
+    """
+
+    # the controls of the robot are found as for the EKF
+    get_arc_lengths = LocalizationEKF.get_arc_lengths
+    get_controls = LocalizationEKF.get_controls
+    get_predicted_state = staticmethod(LocalizationEKF.get_predicted_state)
+
+    def __init__(
+        self,
+        init_mu,
+        init_sigma,
+        robot_width,
+        num_particles=2000,
+        outlier_likelihood=0.01,
+        resample_threshold=0.5,
+        seed=None,
+    ):
+        """
+        Arguments:
+            init_mu, init_sigma: mean and covariance of the Gaussian the
+                particles are drawn from
+            robot_width: the width of the robot (meters)
+            num_particles: N, the number of particles [int]
+            outlier_likelihood: see the instance attributes [float]
+            resample_threshold: see the instance attributes [float]
+            seed: seed of the random generator of the filter
+        """
+        self.robot_width = robot_width
+        self.Q = np.array([[10.0, 0, 0], [0, 10, 0], [0, 0, 10]])
+        self.R = np.array([[5.0, 0, 0], [0, 5, 0], [0, 0, 5]])
+        self.outlier_likelihood = outlier_likelihood
+        self.resample_threshold = resample_threshold
+        self._rng = np.random.default_rng(seed)
+
+        init_mu = np.array(init_mu, dtype=float).reshape(3)
+        init_sigma = np.array(init_sigma, dtype=float).reshape(3, 3)
+        self.particles = self._rng.multivariate_normal(
+            init_mu, init_sigma, num_particles
+        )
+        _wrap(self.particles[:, 2], out=self.particles[:, 2])
+        self.weights = np.full(num_particles, 1 / num_particles)
+
+        # Work buffers, allocated once and reused by every step, as in the EKF
+        self._mu = np.empty((3, 1))
+        self._sigma = np.empty((3, 3))
+        self._estimated = False
+        self._noise = np.empty((num_particles, 3))
+        self._theta = np.empty(num_particles)
+        self._sin = np.empty(num_particles)
+        self._cos = np.empty(num_particles)
+        self._spare = np.empty((num_particles, 3))
+        self._positions = np.arange(num_particles) / num_particles
+        self._update_buffers = {}
+        # Cholesky factors of Q and of the R of every model, keyed by the bytes
+        # of the matrix they were computed from, so that they are computed
+        # again only when it changes, even in place
+        self._noise_key = None
+        self._noise_factor = None
+        self._whitenings = {}
+        self._full_model = MeasurementModel(np.eye(3), self.R, angles=(2,))
+
+    @property
+    def mu(self):
+        if not self._estimated:
+            self._estimate()
+        return self._mu
+
+    @property
+    def sigma(self):
+        if not self._estimated:
+            self._estimate()
+        return self._sigma
+
+    def predict_step(self, arc_lengths):
+        """
+        Moves the particles by the prediction step of the filter, based on the
+        robot's controls. Let arc_lengths be a tuple such that it represents
+        (left-side-length-traveled, right-side-length-traveled)
+
+        Returns [mu_bar, sigma_bar], the mean and covariance of the particles,
+        as LocalizationEKF.predict_step does.
+        """
+        d, phi = self.get_controls(arc_lengths)
+        self.predict_odometry(d, phi)
+        return self.mu, self.sigma
+
+    def update_step(self, mu_bar, sigma_bar, measurement):
+        """
+        Weighs the particles by the robot's sensor [measurement] ([3x1], the
+        pose measured with the noise R), as LocalizationEKF.update_step does;
+        [mu_bar] and [sigma_bar] are not needed, the particles are the
+        predicted distribution.
+        """
+        self._full_model.R = self.R
+        self.update_model(self._full_model, measurement)
+
+    def predict_odometry(self, d, phi):
+        """
+        Moves every particle [d] meters along an arc turning [phi] radians, as
+        measured by wheel odometry, then adds Gaussian noise of covariance Q.
+        """
+        particles = self.particles
+        sin, cos = self._sin, self._cos
+        np.copyto(self._theta, particles[:, 2])
+        np.sin(self._theta, out=sin)
+        np.cos(self._theta, out=cos)
+        if phi == 0:
+            sin *= d
+            cos *= d
+            particles[:, 0] += cos
+            particles[:, 1] += sin
+        else:
+            # sin(theta + phi) - sin(theta) = (cos(phi) - 1) sin(theta) + sin(phi) cos(theta)
+            # cos(theta) - cos(theta + phi) = (1 - cos(phi)) cos(theta) + sin(phi) sin(theta)
+            radius = d / phi
+            a, b = radius * (math.cos(phi) - 1), radius * math.sin(phi)
+            np.multiply(sin, a, out=self._theta)
+            particles[:, 0] += self._theta
+            np.multiply(cos, -a, out=self._theta)
+            particles[:, 1] += self._theta
+            cos *= b
+            sin *= b
+            particles[:, 0] += cos
+            particles[:, 1] += sin
+            particles[:, 2] += phi
+
+        noise = self._noise
+        self._rng.standard_normal(out=noise)
+        factor = self._get_noise_factor()
+        if factor.ndim == 1:
+            # independent noise, the common case: scale the columns
+            np.multiply(noise, factor, out=noise)
+        else:
+            np.matmul(noise, factor, out=noise)
+        particles += noise
+        self._estimated = False
+
+    def update_model(self, model, measurement):
+        """
+        Weighs the particles by the [measurement] ([k x 1], or a float if k = 1)
+        of a sensor with the MeasurementModel [model], then resamples them if
+        too few carry most of the weight.
+        """
+        buffers = self._get_update_buffers(len(model.R))
+        innovations = buffers["innovations"]
+        # the innovation of every particle, measurement - H x, whitened by the
+        # Cholesky factor of R into independent standard normals
+        np.matmul(self.particles, model.jac_H_T, out=innovations)
+        np.subtract(np.reshape(measurement, -1), innovations, out=innovations)
+        for row in model.angles:
+            _wrap(innovations[:, row], out=innovations[:, row])
+        whitening = self._get_whitening(model.R)
+        np.matmul(innovations, whitening, out=buffers["whitened"])
+
+        likelihood = self._theta
+        np.square(buffers["whitened"], out=buffers["whitened"])
+        np.sum(buffers["whitened"], axis=1, out=likelihood)
+        likelihood *= -0.5
+        np.exp(likelihood, out=likelihood)
+        likelihood += self.outlier_likelihood
+        weights = self.weights
+        weights *= likelihood
+        total = weights.sum()
+        if total > 0 and math.isfinite(total):
+            weights /= total
+        else:
+            weights.fill(1 / len(weights))
+        self._estimated = False
+
+        effective = 1 / np.dot(weights, weights)
+        if effective < self.resample_threshold * len(weights):
+            self.resample()
+
+    def resample(self):
+        """
+        Draws N new particles with the probability of their weights by low
+        variance (systematic) resampling, which uses a single random number, and
+        gives them equal weights.
+        """
+        num_particles = len(self.weights)
+        cumulative = np.cumsum(self.weights, out=self._theta)
+        cumulative[-1] = 1.0
+        positions = self._positions + self._rng.random() / num_particles
+        indices = np.searchsorted(cumulative, positions)
+        np.take(self.particles, indices, axis=0, out=self._spare)
+        self.particles, self._spare = self._spare, self.particles
+        _wrap(self.particles[:, 2], out=self.particles[:, 2])
+        self.weights.fill(1 / num_particles)
+        self._estimated = False
+
+    def _get_update_buffers(self, k):
+        """
+        Returns the work buffers of the update for measurements of [k]
+        dimensions, allocated on the first update with [k] dimensions.
+        """
+        buffers = self._update_buffers.get(k)
+        if buffers is None:
+            buffers = {
+                "innovations": np.empty((len(self.weights), k)),
+                "whitened": np.empty((len(self.weights), k)),
+            }
+            self._update_buffers[k] = buffers
+        return buffers
+
+    def _get_noise_factor(self):
+        """
+        Returns the transposed Cholesky factor of Q, or only its diagonal if Q
+        is diagonal, computed again only when Q changed since the last call.
+        """
+        key = self.Q.tobytes()
+        if key != self._noise_key:
+            factor = np.linalg.cholesky(self.Q)
+            if np.count_nonzero(factor) == 3:
+                self._noise_factor = np.diagonal(factor).copy()
+            else:
+                self._noise_factor = factor.T.copy()
+            self._noise_key = key
+        return self._noise_factor
+
+    def _get_whitening(self, R):
+        """
+        Returns the transposed inverse of the Cholesky factor of the
+        measurement noise [R], computed on the first update with this R.
+        """
+        key = R.tobytes()
+        whitening = self._whitenings.get(key)
+        if whitening is None:
+            if len(self._whitenings) >= MAX_WHITENINGS:
+                # R changes at every update, e.g. while it is tuned
+                self._whitenings.clear()
+            whitening = np.linalg.inv(np.linalg.cholesky(R)).T
+            self._whitenings[key] = whitening
+        return whitening
+
+    def _estimate(self):
+        """
+        Writes the weighted mean of the particles into mu, with the circular
+        mean of their headings, and their weighted covariance into sigma.
+        """
+        particles, weights, mu = self.particles, self.weights, self._mu
+        np.matmul(weights, particles, out=mu[:, 0])
+        np.copyto(self._theta, particles[:, 2])
+        np.sin(self._theta, out=self._sin)
+        np.cos(self._theta, out=self._cos)
+        mu[2, 0] = math.atan2(np.dot(weights, self._sin), np.dot(weights, self._cos))
+
+        deviations = self._spare
+        np.subtract(particles, mu.T, out=deviations)
+        _wrap(deviations[:, 2], out=deviations[:, 2])
+        np.matmul(deviations.T * weights, deviations, out=self._sigma)
+        self._estimated = True
+
+
+def _wrap(angles, out=None):
+    """
+    Returns [angles] (radians, array) wrapped to [-pi, pi), into [out] if given.
+    """
+    out = np.add(angles, math.pi, out=out)
+    np.mod(out, TWO_PI, out=out)
+    out -= math.pi
+    return out
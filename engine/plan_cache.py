@@ -0,0 +1,221 @@
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from engine.grid import Grid
+from engine.node import Node, NodeStore
+
+"""
+Persistent cache of traversal plans (a Grid and its waypoints).
+
+Planning a mission builds every node of the grid and runs the traversal
+algorithm, which is repeated on every boot although the field rarely changes.
+This module stores the result of that work on disk, keyed by the grid bounds,
+the step size, the activation shape, the ControlMode and the source of the
+planning modules, so that a restarted mission loads it instead of recomputing
+it. Caching is opt-in: plans are only stored in a cache directory given by the
+caller, constants.definitions PLAN_CACHE_PATH for the robot (the "plan_cache"
+option of engine/config.json).
+
+Each plan is a directory of .npy files under the cache directory:
+    lat, long, x, y, state: the NodeStore arrays of the grid after planning
+    waypoints: the flat node index of every waypoint, in traversal order [int32]
+    active_waypoints, inactive_waypoints: the flat node indices of the grid's
+        active_waypoints_list and inactive_waypoints_list [int32]
+The arrays are memory-mapped copy-on-write when loaded, so loading costs a few
+file opens regardless of the grid size, and changes to the loaded grid are never
+written back to the cache.
+"""
+
+# Bump whenever the file layout changes, so that stale plans are not loaded
+CACHE_VERSION = 1
+
+# The modules of the engine package that plan a traversal. Their source is
+# hashed into every key, so a change to the planning algorithms (new modes, step
+# sizes, turn shapes...) invalidates the plans made by the previous version.
+PLANNER_MODULES = (
+    "grid",
+    "node",
+    "shape_mask",
+    "boustrophedon",
+    "kinematics",
+    "turn_planner",
+)
+
+STORE_ARRAYS = ("lat", "long", "x", "y", "state")
+WAYPOINT_ARRAYS = ("waypoints", "active_waypoints", "inactive_waypoints")
+
+
+def _is_grid_node(grid, node):
+    return isinstance(node, Node) and node.store is grid.store
+
+
+@functools.lru_cache(maxsize=None)
+def planner_digest():
+    """
+    Returns the SHA-1 digest of the source of the PLANNER_MODULES, read once.
+    [bytes]
+    """
+    digest = hashlib.sha1()
+    engine_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in PLANNER_MODULES:
+        with open(os.path.join(engine_dir, name + ".py"), "rb") as source:
+            digest.update(source.read())
+    return digest.digest()
+
+
+def plan_key(
+    lat_min,
+    lat_max,
+    long_min,
+    long_max,
+    mode,
+    active_mask=None,
+    step_size=None,
+    turn_planner=None,
+):
+    """
+    Returns the cache key of the plan for the given grid bounds, ControlMode
+    [mode], boolean [active_mask] of the nodes activated before planning (None if
+    no nodes are activated), [step_size] (Grid.STEP_SIZE_METERS if None) and
+    TurnPlanner [turn_planner] of the grid (None if not set), made with the
+    current planner_digest. [str]
+    """
+    if step_size is None:
+        step_size = Grid.STEP_SIZE_METERS
+    turn = None
+    if turn_planner is not None:
+        turn = (float(turn_planner.radius), float(turn_planner.spacing))
+    digest = hashlib.sha1(planner_digest())
+    digest.update(
+        repr(
+            (
+                CACHE_VERSION,
+                float(lat_min),
+                float(lat_max),
+                float(long_min),
+                float(long_max),
+                float(step_size),
+                mode.name,
+                turn,
+            )
+        ).encode()
+    )
+    if active_mask is not None and np.any(active_mask):
+        mask = np.asarray(active_mask, dtype=bool)
+        digest.update(repr(mask.shape).encode())
+        digest.update(np.packbits(mask).tobytes())
+    return digest.hexdigest()
+
+
+def save_plan(cache_dir, key, grid, waypoints):
+    """
+    Stores [grid] and its list of Node [waypoints] in [cache_dir] under [key].
+
+    Returns whether the plan was stored. Plans whose waypoints are not Nodes of
+    [grid] (e.g. positions of a guided traversal) cannot be stored as node
+    indices and are skipped.
+    """
+    node_lists = (
+        waypoints,
+        grid.get_active_waypoints_list(),
+        grid.get_inactive_waypoints_list(),
+    )
+    if not all(_is_grid_node(grid, node) for nodes in node_lists for node in nodes):
+        return False
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary directory first, so a plan is never partially visible
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        for name in STORE_ARRAYS:
+            np.save(os.path.join(tmp_dir, name + ".npy"), getattr(grid.store, name))
+        for name, nodes in zip(WAYPOINT_ARRAYS, node_lists):
+            indices = np.array([node.index for node in nodes], dtype=np.int32)
+            np.save(os.path.join(tmp_dir, name + ".npy"), indices)
+        os.replace(tmp_dir, os.path.join(cache_dir, key))
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return False
+    return True
+
+
+def load_plan(cache_dir, key, lat_min, lat_max, long_min, long_max, step_size=None):
+    """
+    Returns the (grid, waypoints) stored in [cache_dir] under [key], or None if
+    there is no such plan. The grid bounds and step size must be the ones the
+    key was made from.
+    """
+    plan_dir = os.path.join(cache_dir, key)
+    try:
+        arrays = [
+            np.load(os.path.join(plan_dir, name + ".npy"), mmap_mode="c")
+            for name in STORE_ARRAYS + WAYPOINT_ARRAYS
+        ]
+    except (OSError, ValueError):
+        return None
+    store = NodeStore.from_buffers(*arrays[: len(STORE_ARRAYS)])
+    try:
+        grid = Grid(
+            lat_min, lat_max, long_min, long_max, store=store, step_size=step_size
+        )
+    except ValueError:
+        return None
+    # index the grid's own Node views, so each node gets a single view
+    nodes = grid.nodes.ravel()
+    waypoints, active, inactive = arrays[len(STORE_ARRAYS) :]
+    grid.active_waypoints_list = nodes[active].tolist()
+    grid.inactive_waypoints_list = nodes[inactive].tolist()
+    return grid, nodes[waypoints].tolist()
+
+
+def load_or_plan(
+    lat_min,
+    lat_max,
+    long_min,
+    long_max,
+    mode,
+    active_mask=None,
+    cache_dir=None,
+    step_size=None,
+    turn_planner=None,
+):
+    """
+    Returns the (grid, waypoints) of the traversal with ControlMode [mode] over
+    the grid with the given bounds and [step_size], where the nodes of the
+    boolean [active_mask] are activated before planning, and the turns are
+    planned by the TurnPlanner [turn_planner] if not None.
+
+    The plan is loaded from [cache_dir] if it was stored there before, and is
+    otherwise planned with Grid.get_waypoints and stored for the next time.
+    Caching is disabled if [cache_dir] is None, the default.
+    """
+    if cache_dir is not None:
+        key = plan_key(
+            lat_min,
+            lat_max,
+            long_min,
+            long_max,
+            mode,
+            active_mask,
+            step_size,
+            turn_planner,
+        )
+        plan = load_plan(
+            cache_dir, key, lat_min, lat_max, long_min, long_max, step_size
+        )
+        if plan is not None:
+            plan[0].turn_planner = turn_planner
+            return plan
+
+    grid = Grid(lat_min, lat_max, long_min, long_max, step_size=step_size)
+    if active_mask is not None:
+        grid.activate_mask(active_mask)
+    grid.turn_planner = turn_planner
+    waypoints = grid.get_waypoints(mode)
+    if cache_dir is not None:
+        save_plan(cache_dir, key, grid, waypoints)
+    return grid, waypoints
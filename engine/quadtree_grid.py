@@ -0,0 +1,405 @@
+import numpy as np
+
+from engine.grid import Grid
+from engine.kinematics import (
+    meters_to_lat,
+    meters_to_long,
+    get_ellipsoid_x,
+    get_ellipsoid_y,
+)
+from engine.node import NodeStore
+from engine.shape_mask import nodes_in_polygon
+
+
+class QuadTreeGrid:
+    """
+    Instances represent a multi-resolution grid over a field given by a GPS polygon.
+
+    The field is laid over the same fine grid as Grid.from_gps_polygon with the same
+    step size, which is then covered by square cells of 1, 2, 4, ... up to
+    max_cell_size fine steps. A cell is split into four only while a border edge of
+    the field or an obstacle passes through it, so open ground is covered by a few
+    coarse cells and only the cells along the border and around obstacles go down
+    to the fine step. The number of cells, and the cost of building them, grows
+    with the length of the border rather than the area of the field.
+
+    Every cell holds one Node at its center. The nodes are stored in traversal
+    order: the top level cells are visited row by row in a snake pattern, and the
+    cells inside each of them along a Hilbert curve, so consecutive cells are
+    neighbors unless the cells between them are outside of the field. The
+    traversal covers every cell by sweeping it back and forth one fine row at a
+    time, so its waypoints are the ends of the sweeps, as in
+    ControlMode.LAWNMOWER_B: two per fine row of a coarse cell, and the node of a
+    cell of the fine step.
+
+    Mission_State builds a QuadTreeGrid over the field of its
+    "multi_resolution_field" kwarg.
+
+    INSTANCE ATTRIBUTES:
+        # lat_min, lat_max, long_min, long_max: bounding box of the field [float]
+        # step_size: size of the smallest cells, in meters [float]
+        # max_cell_size: size of the largest cells, in fine steps [int]
+        # lat_step, long_step: latitude/longitude difference between neighboring
+            fine rows/cols [float]
+        # num_rows, num_cols: dimensions of the fine grid [int]
+
+        # cell_rows, cell_cols: fine (row, col) position of the bottom left corner of
+            every cell, in traversal order [int array]
+        # cell_sizes: side length of every cell, in fine steps [int array]
+        # store: NodeStore of the node at the center of every cell, in traversal order.
+            Nodes of cells containing an obstacle are inactive with the status
+            NodeStore.OBSTACLE.
+        # nodes: 1D Numpy array of Node views over store
+        # waypoint_store: NodeStore of the waypoints of the traversal, the ends of
+            the sweeps of every active cell, built by get_waypoints
+        # active_waypoints_list: the waypoints of the traversal, filled by
+            get_waypoints [Node list]
+        # inactive_waypoints_list: the nodes of the obstacle cells, filled by
+            get_waypoints [Node list]
+    """
+
+    def __init__(self, vertices, step_size=None, max_cell_size=16, obstacles=()):
+        """
+        Arguments:
+            vertices: GPS vertices of the field, a sequence of (latitude, longitude) pairs
+            step_size: size of the smallest cells in meters, Grid.STEP_SIZE_METERS when
+                None [float]
+            max_cell_size: size of the largest cells in fine steps, a power of 2 [int]
+            obstacles: GPS (latitude, longitude) coordinates of known obstacles
+        """
+        if max_cell_size < 1 or max_cell_size & (max_cell_size - 1):
+            raise ValueError("max_cell_size must be a power of 2")
+        if step_size is None:
+            step_size = Grid.STEP_SIZE_METERS
+
+        lats, longs = np.asarray(vertices, dtype=float).T
+        self.lat_min, self.lat_max = lats.min(), lats.max()
+        self.long_min, self.long_max = longs.min(), longs.max()
+        self.step_size = step_size
+        self.max_cell_size = max_cell_size
+        self.lat_step = meters_to_lat(step_size)
+        self.long_step = meters_to_long(step_size, self.lat_min)
+
+        # the polygon and obstacles in fine grid index space
+        polygon = np.column_stack(self.gps_to_index(lats, longs))
+        self.num_rows = int(np.floor(polygon[:, 0].max())) + 1
+        self.num_cols = int(np.floor(polygon[:, 1].max())) + 1
+        obstacle_pos = np.reshape(np.asarray(obstacles, dtype=float), (-1, 2))
+        obstacle_pos = np.round(
+            np.column_stack(self.gps_to_index(*obstacle_pos.T))
+        ).astype(int)
+
+        rows, cols, sizes, on_border = self._build_cells(polygon, obstacle_pos)
+
+        # keep the cells inside the field; a cell that no edge crosses is entirely
+        # inside or outside, like its bottom left node
+        inside = nodes_in_polygon(polygon, rows, cols)
+        rows, cols = rows[inside], cols[inside]
+        sizes, on_border = sizes[inside], on_border[inside]
+
+        order = self._traversal_order(rows, cols, sizes)
+        self.cell_rows, self.cell_cols = rows[order], cols[order]
+        self.cell_sizes = sizes[order]
+
+        self.store = self._make_store(
+            self.cell_rows + (self.cell_sizes - 1) / 2,
+            self.cell_cols + (self.cell_sizes - 1) / 2,
+        )
+        self.store.set_flag(NodeStore.BORDER, on_border[order])
+        is_obstacle = np.zeros(len(self.store), dtype=bool)
+        if len(obstacle_pos):
+            # obstacle cells are always split down to a single fine node
+            cell_index = {
+                pos: i
+                for i, pos in enumerate(
+                    zip(self.cell_rows.tolist(), self.cell_cols.tolist())
+                )
+            }
+            for pos in map(tuple, obstacle_pos.tolist()):
+                if pos in cell_index:
+                    is_obstacle[cell_index[pos]] = True
+        self.store.set_flag(NodeStore.ACTIVE, ~is_obstacle)
+        self.store.set_status(NodeStore.OBSTACLE, is_obstacle)
+
+        self._nodes = None
+        self.waypoint_store = None
+        self.active_waypoints_list = []
+        self.inactive_waypoints_list = []
+
+    def _make_store(self, rows, cols):
+        """
+        Returns a NodeStore of nodes at the fine (row, col) positions [rows],
+        [cols], which may be fractional, placed like the nodes of a Grid.
+        """
+        lats = self.lat_min + rows * self.lat_step
+        longs = self.long_min + cols * self.long_step
+        gps_origin = (self.lat_min, self.long_min)
+        return NodeStore.from_arrays(
+            lats,
+            longs,
+            get_ellipsoid_x(gps_origin, (lats, longs)),
+            get_ellipsoid_y(gps_origin, (lats, longs)),
+        )
+
+    def _build_cells(self, polygon, obstacle_pos):
+        """
+        Returns the (rows, cols, sizes, on_border) arrays of the leaf cells covering
+        the fine grid, before dropping the cells outside of the field.
+
+        The cells are split one level at a time. Each level tests all pairs of a
+        cell and an edge that crossed its parent cell at once, so the work is
+        proportional to the number of cells along the border.
+        """
+        row0, col0 = polygon[:, 0], polygon[:, 1]
+        row1, col1 = np.roll(row0, -1), np.roll(col0, -1)
+
+        # top level cells, and the pairs of a top level cell and an edge whose
+        # bounding box overlaps it
+        size = self.max_cell_size
+        num_top_rows = -(-self.num_rows // size)
+        num_top_cols = -(-self.num_cols // size)
+        rows = np.repeat(np.arange(num_top_rows) * size, num_top_cols)
+        cols = np.tile(np.arange(num_top_cols) * size, num_top_rows)
+
+        def top_range(low, high, num_top):
+            first = np.clip(np.floor(low / size), 0, num_top - 1).astype(int)
+            last = np.clip(np.floor(high / size), 0, num_top - 1).astype(int)
+            return first, last - first + 1
+
+        first_row, num_rows = top_range(
+            np.minimum(row0, row1), np.maximum(row0, row1), num_top_rows
+        )
+        first_col, num_cols = top_range(
+            np.minimum(col0, col1), np.maximum(col0, col1), num_top_cols
+        )
+        counts = num_rows * num_cols
+        pair_edge = np.repeat(np.arange(len(polygon)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        d_row, d_col = np.divmod(offsets, num_cols[pair_edge])
+        pair_cell = (first_row[pair_edge] + d_row) * num_top_cols + (
+            first_col[pair_edge] + d_col
+        )
+
+        leaves = []
+        while True:
+            # keep the pairs where the edge touches the closed box spanned by the
+            # nodes of the cell
+            r0, c0 = row0[pair_edge], col0[pair_edge]
+            r1, c1 = row1[pair_edge], col1[pair_edge]
+            row_lo, col_lo = rows[pair_cell], cols[pair_cell]
+            row_hi, col_hi = row_lo + size - 1, col_lo + size - 1
+            overlaps = (
+                (np.maximum(r0, r1) >= row_lo)
+                & (np.minimum(r0, r1) <= row_hi)
+                & (np.maximum(c0, c1) >= col_lo)
+                & (np.minimum(c0, c1) <= col_hi)
+            )
+            # the corners of the box are not all on the same side of the edge
+            sides = [
+                (r1 - r0) * (corner_col - c0) - (c1 - c0) * (corner_row - r0)
+                for corner_row in (row_lo, row_hi)
+                for corner_col in (col_lo, col_hi)
+            ]
+            crosses = (
+                overlaps
+                & (np.minimum.reduce(sides) <= 0)
+                & (np.maximum.reduce(sides) >= 0)
+            )
+            pair_cell, pair_edge = pair_cell[crosses], pair_edge[crosses]
+            is_crossed = np.bincount(pair_cell, minlength=len(rows)) > 0
+
+            if size == 1:
+                leaves.append((rows, cols, np.ones_like(rows), is_crossed))
+                break
+
+            # cells containing an obstacle are split down to the fine step
+            has_obstacle = np.zeros(len(rows), dtype=bool)
+            if len(obstacle_pos):
+                cols_per_row = self.num_cols // size + 1
+                obstacle_keys = (obstacle_pos[:, 0] // size) * cols_per_row + (
+                    obstacle_pos[:, 1] // size
+                )
+                cell_keys = (rows // size) * cols_per_row + cols // size
+                has_obstacle = np.isin(cell_keys, obstacle_keys)
+
+            is_split = is_crossed | has_obstacle
+            is_leaf = ~is_split
+            leaves.append(
+                (
+                    rows[is_leaf],
+                    cols[is_leaf],
+                    np.full(is_leaf.sum(), size),
+                    np.zeros(is_leaf.sum(), dtype=bool),
+                )
+            )
+
+            # split into four children, dropping the ones outside the fine grid
+            half = size // 2
+            child_rows = (rows[is_split][:, np.newaxis] + [0, 0, half, half]).ravel()
+            child_cols = (cols[is_split][:, np.newaxis] + [0, half, 0, half]).ravel()
+            in_grid = (child_rows < self.num_rows) & (child_cols < self.num_cols)
+            child_id = np.cumsum(in_grid) - 1
+
+            parent_rank = np.cumsum(is_split) - 1
+            pair_child = (4 * parent_rank[pair_cell])[:, np.newaxis] + np.arange(4)
+            pair_edge = np.repeat(pair_edge, 4)
+            pair_child = pair_child.ravel()
+            keep = in_grid[pair_child]
+            pair_cell, pair_edge = child_id[pair_child[keep]], pair_edge[keep]
+
+            rows, cols = child_rows[in_grid], child_cols[in_grid]
+            size = half
+
+        rows, cols, sizes, on_border = (
+            np.concatenate(values) for values in zip(*leaves)
+        )
+        return rows, cols, sizes, on_border
+
+    def _traversal_order(self, rows, cols, sizes):
+        """
+        Returns the permutation of the cells that visits the top level cells in a
+        snake pattern (left to right on even rows of top level cells, right to left
+        on odd ones), and the cells inside each top level cell along a Hilbert curve
+        that enters at its bottom left (bottom right on odd rows) and leaves at its
+        bottom right (bottom left) corner.
+        """
+        top = self.max_cell_size
+        top_rows, top_cols = rows // top, cols // top
+        local_rows, local_cols = rows % top, cols % top
+
+        is_odd_row = top_rows % 2 == 1
+        num_top_cols = -(-self.num_cols // top)
+        top_cols = np.where(is_odd_row, num_top_cols - 1 - top_cols, top_cols)
+        local_cols = np.where(is_odd_row, top - sizes - local_cols, local_cols)
+
+        curve_index = hilbert_index(top, local_cols, local_rows)
+        return np.lexsort((curve_index, top_cols, top_rows))
+
+    @property
+    def nodes(self):
+        """
+        1D Numpy array of Node views over self.store, built the first time it is
+        accessed.
+        """
+        if self._nodes is None:
+            self._nodes = np.fromiter(
+                self.store.nodes(range(len(self.store))),
+                dtype=object,
+                count=len(self.store),
+            )
+        return self._nodes
+
+    def gps_to_index(self, lat, long):
+        """
+        Returns the fractional (row, col) fine grid position of the given GPS
+        coordinates, which may be Numpy arrays. See Grid.gps_to_index.
+        """
+        row = (np.asarray(lat) - self.lat_min) / self.lat_step
+        col = (np.asarray(long) - self.long_min) / self.long_step
+        return row, col
+
+    def get_num_nodes(self):
+        return len(self.store)
+
+    def get_active_waypoints_list(self):
+        return self.active_waypoints_list
+
+    def get_inactive_waypoints_list(self):
+        return self.inactive_waypoints_list
+
+    def get_cell_size_meters(self):
+        """
+        Returns the side length in meters of the cell of every node. [float array]
+        """
+        return self.cell_sizes * self.step_size
+
+    def mark_obstacles(self, positions):
+        """
+        Gives the cells holding the fine (row, col) [positions], a list or (n, 2)
+        array, the obstacle status, and deactivates them, as Grid.mark_obstacles
+        does for nodes. Returns the indices of their nodes in store.
+        [int Numpy array]
+
+        A coarse cell is given up as a whole; building the grid again with the
+        obstacle splits it down to the fine step around it.
+        """
+        rows, cols = np.asarray(positions, dtype=int).reshape(-1, 2).T
+        in_cell = (
+            (rows[:, np.newaxis] >= self.cell_rows)
+            & (rows[:, np.newaxis] < self.cell_rows + self.cell_sizes)
+            & (cols[:, np.newaxis] >= self.cell_cols)
+            & (cols[:, np.newaxis] < self.cell_cols + self.cell_sizes)
+        )
+        indices = np.flatnonzero(in_cell.any(axis=0))
+        self.store.clear_flag(NodeStore.ACTIVE, indices)
+        self.store.set_status(NodeStore.OBSTACLE, indices)
+        return indices
+
+    def get_sweeps(self, rows, cols, sizes):
+        """
+        Returns the fine (row, col) positions of the waypoints covering the cells
+        with bottom left corners [rows], [cols] and [sizes], in order, as two
+        int arrays: the node of a cell of size 1, and for a larger cell, the two
+        ends of each of its fine rows, swept back and forth from its bottom row.
+        Also returns the index of the cell of every waypoint. [int array]
+        """
+        counts = np.where(sizes == 1, 1, 2 * sizes)
+        cells = np.repeat(np.arange(len(sizes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        line, end = np.divmod(offsets, 2)
+        # even rows are swept left to right, odd rows right to left
+        is_right = (end ^ (line & 1)).astype(bool)
+        sweep_rows = rows[cells] + line
+        sweep_cols = cols[cells] + np.where(is_right, sizes[cells] - 1, 0)
+        return sweep_rows, sweep_cols, cells
+
+    def get_waypoints(self, mode=None):
+        """
+        Returns the ends of the sweeps covering every active cell, in traversal
+        order, see get_sweeps. [Node list]
+
+        The cells can only be traversed in their own order, so [mode] is accepted
+        for compatibility with Grid.get_waypoints and otherwise ignored.
+        """
+        is_active = (self.store.state & NodeStore.ACTIVE).astype(bool)
+        rows, cols, cells = self.get_sweeps(
+            self.cell_rows[is_active],
+            self.cell_cols[is_active],
+            self.cell_sizes[is_active],
+        )
+        self.waypoint_store = self._make_store(rows, cols)
+        self.waypoint_store.set_flag(NodeStore.ACTIVE)
+        is_border = (self.store.state[is_active] & NodeStore.BORDER).astype(bool)
+        self.waypoint_store.set_flag(NodeStore.BORDER, is_border[cells])
+        self.active_waypoints_list = self.waypoint_store.nodes(
+            np.arange(len(self.waypoint_store))
+        )
+        self.inactive_waypoints_list = self.nodes[~is_active].tolist()
+        return list(self.active_waypoints_list)
+
+
+def hilbert_index(n, x, y):
+    """
+    Returns the position along the Hilbert curve through an [n] x [n] square,
+    [n] a power of 2, of the points with the given integer coordinates, which may
+    be Numpy arrays. The curve starts at (0, 0) and ends at (n - 1, 0).
+    """
+    x = np.array(x, dtype=np.int64)
+    y = np.array(y, dtype=np.int64)
+    d = np.zeros(np.broadcast(x, y).shape, dtype=np.int64)
+    s = n // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant so that the curve inside it has the canonical shape
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return d
@@ -0,0 +1,311 @@
+import bisect
+
+import numpy as np
+
+from engine.boustrophedon import find_path
+from engine.node import NodeStore
+
+"""
+Incremental repair of a traversal plan when nodes of the grid become obstacles.
+
+A Replanner is made for a Grid and the deque of the remaining waypoints of a
+traversal of it, while the robot visits them with popleft(). When nodes are
+marked as obstacles, only the stretches of the plan that they damage are
+repaired, in place:
+    - waypoints on an obstacle are dropped,
+    - moves between consecutive waypoints that cross an obstacle (e.g. the sweeps
+      of the border lawnmower) are replaced,
+and each damaged stretch is replaced by a shortest detour through the free
+nodes, between the last undamaged waypoint before it and the first undamaged
+waypoint after it.
+
+When it is made, the Replanner numbers the waypoints of the plan and indexes
+which numbers each node is visited at, or crossed by a move. Repairs then look
+the obstacles up in the index and edit the deque around them, so their cost
+depends on the size of the damage and of the detours, not on the length of the
+plan. The Replanner keeps track of its own edits and of the waypoints visited
+since, to find the current position in the deque of any numbered waypoint.
+The nodes of the detours are indexed as they are inserted, so detours are
+repaired in turn when an obstacle appears on them.
+"""
+
+
+class _FreeNodes:
+    """
+    Sequence telling, for the flat index of a node of [store], whether the node is
+    not an obstacle, computed on demand.
+    """
+
+    def __init__(self, store):
+        self.state = store.state
+
+    def __getitem__(self, index):
+        return (self.state.item(index) >> NodeStore.STATUS_SHIFT) != NodeStore.OBSTACLE
+
+
+def _line_nodes(rows0, cols0, rows1, cols1, num_cols):
+    """
+    Returns (nodes, moves): the flat indices of the nodes strictly between the
+    ends of every move from (rows0[k], cols0[k]) to (rows1[k], cols1[k]), and the
+    move k each of them belongs to.
+    """
+    steps = np.maximum(np.abs(rows1 - rows0), np.abs(cols1 - cols0))
+    counts = np.maximum(steps - 1, 0)
+    moves = np.repeat(np.arange(len(steps)), counts)
+    offsets = (
+        1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    t = offsets / steps[moves]
+    rows = np.rint(rows0[moves] + t * (rows1[moves] - rows0[moves])).astype(int)
+    cols = np.rint(cols0[moves] + t * (cols1[moves] - cols0[moves])).astype(int)
+    return rows * num_cols + cols, moves
+
+
+class Replanner:
+    """
+    INSTANCE ATTRIBUTES:
+        # grid: the Grid the plan traverses
+        # waypoints: deque of the remaining Node waypoints of the plan, repaired in
+            place
+        # num_repairs: number of damaged stretches repaired so far [int]
+    """
+
+    def __init__(self, grid, waypoints):
+        """
+        Arguments:
+            grid: the Grid the plan traverses
+            waypoints: deque of the remaining waypoints, all Nodes of [grid]
+        """
+        if not all(getattr(node, "store", None) is grid.store for node in waypoints):
+            raise ValueError("waypoints are not all Nodes of the grid")
+        self.grid = grid
+        self.waypoints = waypoints
+        self.num_repairs = 0
+        self._free = _FreeNodes(grid.store)
+
+        # waypoint number k is the node plan[k]; move k goes from waypoint k to k + 1
+        plan = np.fromiter((node.index for node in waypoints), dtype=np.int64)
+        self._plan = plan
+        rows, cols = np.divmod(plan, grid.num_cols)
+        line_nodes, line_moves = _line_nodes(
+            rows[:-1], cols[:-1], rows[1:], cols[1:], grid.num_cols
+        )
+        # every (node, waypoint number) visit and (node, move number) crossing,
+        # sorted by node for lookups
+        order = np.argsort(plan, kind="stable")
+        self._visit_nodes, self._visit_numbers = plan[order], order
+        order = np.argsort(line_nodes, kind="stable")
+        self._cross_nodes, self._cross_moves = line_nodes[order], line_moves[order]
+
+        # edits made to the deque since it was numbered
+        self._length = len(plan)
+        self._removed = []  # sorted numbers of the waypoints removed
+        self._removed_set = set()
+        # sorted numbers of the waypoints with detours before them
+        self._insert_before = []
+        # flat node indices of the detour waypoints before each of them, and the
+        # numbers whose detours go through each node
+        self._detours = {}
+        self._detour_keys = {}
+
+    # --------------------- POSITIONS IN THE DEQUE -------------- #
+
+    def _num_visited(self):
+        return (
+            self._length
+            - len(self._removed)
+            + sum(len(detour) for detour in self._detours.values())
+            - len(self.waypoints)
+        )
+
+    def _position(self, number, num_visited):
+        """
+        Returns the current position in the deque of waypoint [number], negative
+        if it was visited. The waypoint must not have been removed.
+        """
+        inserted = 0
+        for before in self._insert_before[
+            : bisect.bisect_right(self._insert_before, number)
+        ]:
+            inserted += len(self._detours[before])
+        removed = bisect.bisect_left(self._removed, number)
+        return number - removed + inserted - num_visited
+
+    def _is_present(self, number, num_visited):
+        return (
+            0 <= number < self._length
+            and number not in self._removed_set
+            and self._position(number, num_visited) >= 0
+        )
+
+    # --------------------- REPAIRS -------------- #
+
+    def _lookup(self, sorted_nodes, values, nodes):
+        """
+        Returns the values of every entry of the index (sorted_nodes, values)
+        whose node is one of [nodes].
+        """
+        starts = np.searchsorted(sorted_nodes, nodes, side="left")
+        stops = np.searchsorted(sorted_nodes, nodes, side="right")
+        return [v for a, b in zip(starts, stops) for v in values[a:b].tolist()]
+
+    def _damaged_stretches(self, nodes, num_visited):
+        """
+        Returns the sorted, disjoint (first, last) waypoint number ranges that
+        must be replaced, where every waypoint in between is damaged (or already
+        removed), given the flat indices of the new obstacle [nodes].
+        """
+        damaged = set(
+            k
+            for k in self._lookup(self._visit_nodes, self._visit_numbers, nodes)
+            if self._is_present(k, num_visited)
+        )
+        # a crossed move k is damaged if it still goes straight from k to k + 1
+        moves = set(
+            k
+            for k in self._lookup(self._cross_nodes, self._cross_moves, nodes)
+            if k + 1 not in self._detours
+            and self._is_present(k, num_visited)
+            and self._is_present(k + 1, num_visited)
+        )
+
+        # a detour through an obstacle is replaced, unless the robot already went
+        # past it
+        detours = set()
+        for node in nodes.tolist():
+            for key in self._detour_keys.get(node, ()):
+                detour = self._detours[key]
+                num_left = min(len(detour), max(self._position(key, num_visited), 0))
+                if node in detour[len(detour) - num_left :]:
+                    detours.add(key)
+
+        stretches = []
+        for k in sorted(damaged):
+            stretches.append((k, k))
+        for k in sorted(moves):
+            # an empty stretch: nothing to drop, a detour between k and k + 1
+            stretches.append((k + 1, k))
+        for k in sorted(detours):
+            stretches.append((k, k - 1))
+        stretches.sort()
+        merged = []
+        for first, last in stretches:
+            # stretches not separated by a kept waypoint are replaced together
+            if merged and first <= self._next_kept(merged[-1][1], damaged):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+            else:
+                merged.append((first, last))
+        return merged, damaged
+
+    def _next_kept(self, number, damaged):
+        """
+        Returns the first waypoint number after [number] that was neither removed
+        nor damaged.
+        """
+        number += 1
+        while number in self._removed_set or number in damaged:
+            number += 1
+        return number
+
+    def _previous_kept(self, number, damaged):
+        number -= 1
+        while number >= 0 and (number in self._removed_set or number in damaged):
+            number -= 1
+        return number
+
+    def add_obstacles(self, positions):
+        """
+        Marks the nodes at the (row, col) [positions] as obstacles, and repairs the
+        remaining plan around them. Returns the number of damaged stretches
+        repaired.
+        """
+        nodes = self.grid.mark_obstacles(positions)
+        num_visited = self._num_visited()
+        stretches, damaged = self._damaged_stretches(np.unique(nodes), num_visited)
+        # repair from the back, so the positions of the stretches in front stay valid
+        for first, last in reversed(stretches):
+            before = self._previous_kept(first, damaged)
+            after = self._next_kept(last, damaged)
+            self._replace(before, after, num_visited)
+        self.num_repairs += len(stretches)
+        return len(stretches)
+
+    def _replace(self, before, after, num_visited):
+        """
+        Replaces everything between the kept waypoints [before] and [after] (either
+        of which may be visited already, or past the end of the plan) with a
+        detour between them. Without a free path between them, as between parts of
+        the grid cut off from each other, the move from one to the other is left
+        straight. If [before] was visited, the robot is already on its way, and only
+        its own navigation can take it around the obstacles to [after].
+        """
+        has_before = self._is_present(before, num_visited)
+        has_after = after < self._length
+        start = self._position(before, num_visited) + 1 if has_before else 0
+        stop = self._position(after, num_visited) if has_after else len(self.waypoints)
+
+        detour = []
+        if has_before and has_after:
+            num_cols = self.grid.num_cols
+            path = find_path(
+                self._free,
+                self.grid.get_shape(),
+                divmod(int(self._plan[before]), num_cols),
+                divmod(int(self._plan[after]), num_cols),
+            )
+            detour = self.grid.store.nodes([row * num_cols + col for row, col in path])
+
+        # record the edit: every waypoint in between that was not visited yet is
+        # removed, numbered or part of an earlier detour
+        removed = [
+            number
+            for number in range(max(before + 1, 0), min(after, self._length))
+            if number not in self._removed_set
+            and self._position(number, num_visited) >= 0
+        ]
+        lo = bisect.bisect_right(self._insert_before, before)
+        hi = bisect.bisect_right(self._insert_before, after)
+        # the detour waypoints before [key] are the ones just before its position
+        dropped = [
+            (
+                key,
+                min(len(self._detours[key]), max(self._position(key, num_visited), 0)),
+            )
+            for key in self._insert_before[lo:hi]
+        ]
+        for number in removed:
+            self._removed_set.add(number)
+            bisect.insort(self._removed, number)
+        for key, count in dropped:
+            kept = self._detours[key][: len(self._detours[key]) - count]
+            self._set_detour(key, kept)
+        if detour:
+            self._set_detour(
+                after, self._detours.get(after, []) + [node.index for node in detour]
+            )
+
+        self.waypoints.rotate(-start)
+        for _ in range(stop - start):
+            self.waypoints.popleft()
+        self.waypoints.extendleft(reversed(detour))
+        self.waypoints.rotate(start)
+
+    def _set_detour(self, key, detour):
+        """
+        Records [detour] as the flat node indices of the detour waypoints before
+        waypoint [key].
+        """
+        for node in self._detours.get(key, ()):
+            keys = self._detour_keys[node]
+            keys.discard(key)
+            if not keys:
+                del self._detour_keys[node]
+        if detour:
+            if key not in self._detours:
+                bisect.insort(self._insert_before, key)
+            self._detours[key] = detour
+            for node in detour:
+                self._detour_keys.setdefault(node, set()).add(key)
+        elif key in self._detours:
+            del self._detours[key]
+            self._insert_before.remove(key)
@@ -27,6 +27,19 @@ def return_logic(robot_state, mission_state, database):
         mission_state.base_station.position[1] + dy,
     )
 
+    # Drive around obstacles and, if required, within the active region, by the
+    # corners of the shortest path home, then straight to the docking position
+    distance_field = mission_state.get_distance_field()
+    if distance_field is not None:
+        corners = distance_field.get_return_waypoints(
+            float(robot_state.state[0]), float(robot_state.state[1])
+        )
+        for corner in corners[:-1]:
+            robot_state.goal_location = corner
+            move_to_target_node(
+                robot_state, corner, mission_state.allowed_dist_error, database
+            )
+
     robot_state.goal_location = target_loc
     move_to_target_node(
         robot_state, target_loc, mission_state.allowed_docking_pos_error, database
@@ -6,6 +6,8 @@ import numpy as np
 from engine.robot_logic.robot_helpers import phase_change
 from engine.phase import Phase
 from engine.ekf import LocalizationEKF
+from engine.particle_filter import ParticleFilter
+from engine.sensor_fusion import SensorFusion
 from constants.definitions import *
 
 from engine.is_raspberrypi import is_raspberrypi
@@ -127,10 +129,9 @@ def setup_logic(robot_state):
         )
         robot_state.imu_data = robot_state.imu.get_gps()
         x_init, y_init = (0, 0)
-        heading_init = math.degrees(
-            math.atan2(
-                robot_state.imu_data["mag"]["y"], robot_state.imu_data["mag"]["x"]
-            )
+        # the filter works with the heading in radians
+        heading_init = math.atan2(
+            robot_state.imu_data["mag"]["y"], robot_state.imu_data["mag"]["x"]
         )
 
         # mu is meters from start position (bottom left position facing up)
@@ -138,7 +139,14 @@ def setup_logic(robot_state):
 
         # confidence of mu, set it to high initially b/c not confident, algo brings it down
         sigma = np.array([[10, 0, 0], [0, 10, 0], [0, 0, 10]])
-        robot_state.ekf = LocalizationEKF(mu, sigma)
+        if robot_state.using_particle_filter:
+            robot_state.particle_filter = ParticleFilter(
+                mu, sigma, 2 * robot_state.radius
+            )
+            robot_state.sensor_fusion = SensorFusion(robot_state.particle_filter)
+        else:
+            robot_state.ekf = LocalizationEKF(mu, sigma, 2 * robot_state.radius)
+            robot_state.sensor_fusion = SensorFusion(robot_state.ekf)
 
         if robot_state.radio_session.connected and gps_setup and imu_setup:
             obstacle_avoidance = threading.Thread(
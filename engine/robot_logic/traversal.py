@@ -5,6 +5,8 @@ from engine.control_mode import ControlMode
 from engine.phase import Phase
 from constants.definitions import *
 from engine.kinematics import *
+from engine.geodesy import get_projection
+from engine.sensor_fusion import GPS, HEADING
 from engine.robot_logic.robot_helpers import phase_change, calculate_dist
 from csv_files.csv_util import write_state_to_csv
 
@@ -41,13 +43,14 @@ def traverse_standard(robot_state, unvisited_waypoints, allowed_dist_error, data
     """Move the robot by following the traversal path given by [unvisited_waypoints].
     Args:
         unvisited_waypoints ([Node list]): GPS traversal path in terms of meters for the current grid.
+            A deque, or a WaypointStream that generates the next waypoint when it is needed.
         allowed_dist_error (Double): the maximum distance in meters that the robot can be from a node for the
             robot to have "visited" that node
     Returns:
         robot_state
         unvisited_waypoints ([Node list]): GPS traversal path in terms of meters for the current grid.
     """
-    if unvisited_waypoints is None or len(unvisited_waypoints) == 0:
+    if not unvisited_waypoints:
         robot_state.phase = Phase.RETURN
         phase_change(robot_state)
         return robot_state, None
@@ -241,32 +244,42 @@ def update_state(robot_state, velocity, omega):
         velocity (Float): linear velocity of robot
         omega (Float): angular velocity of robot
     Returns:
-        new_state/measurement (Tuple): new x, y, and heading of robot
-    """
-    robot_state.gps_data = (
-        robot_state.gps.get_gps()["long"],
-        robot_state.gps.get_gps()["lat"],
-    )
+        new_state/measurement (Tuple): new x, y, and heading of robot, with the
+            heading in radians like robot_state.state
 
+    With the EKF or the particle filter, the odometry of the time step, the
+    heading of the IMU and the GPS fix, only when it is a new one, are added as
+    timestamped events to robot_state.sensor_fusion, which fuses each at its own
+    rate.
+    """
+    gps = robot_state.gps.get_gps()
+    # init_gps and gps_data are (longitude, latitude) pairs
+    gps_data = (gps["long"], gps["lat"])
     robot_state.imu_data = robot_state.imu.get_gps()
 
-    x = get_vincenty_x(robot_state.init_gps, robot_state.gps_data)
-    y = get_vincenty_y(robot_state.init_gps, robot_state.gps_data)
+    init_long, init_lat = robot_state.init_gps
+    x, y = get_projection((init_lat, init_long)).gps_to_meters(gps_data[1], gps_data[0])
 
-    heading = math.degrees(
-        math.atan2(robot_state.imu_data["mag"]["y"], robot_state.imu_data["mag"]["x"])
+    heading = math.atan2(
+        robot_state.imu_data["mag"]["y"], robot_state.imu_data["mag"]["x"]
     )
 
-    measurements = np.array([[x], [y], [heading]])
-    if robot_state.using_ekf:
-        mu, sigma = robot_state.ekf.predict_step(velocity, omega)
-        robot_state.ekf.update_step(mu, sigma, measurements)
-        new_x = robot_state.ekf.mu[0][0]
-        new_y = robot_state.ekf.mu[1][0]
-        new_heading = robot_state.ekf.mu[2][0]
-        new_state = np.array([[new_x], [new_y], [new_heading]])
-        return new_state
-    return measurements
+    if robot_state.using_ekf or robot_state.using_particle_filter:
+        fusion = robot_state.sensor_fusion
+        now = time.monotonic()
+        fusion.add_odometry(
+            now, velocity * robot_state.time_step, omega * robot_state.time_step
+        )
+        # the GPS updates at 1-10 Hz, slower than the control loop: a fix that
+        # was already fused is not a new measurement
+        if gps_data != robot_state.gps_data:
+            fusion.add_measurement(GPS, now, np.array([[x], [y]]))
+        fusion.add_measurement(HEADING, now, heading)
+        fusion.process(now)
+        robot_state.gps_data = gps_data
+        return fusion.ekf.mu.copy()
+    robot_state.gps_data = gps_data
+    return np.array([[x], [y], [heading]])
 
 
 def traverse_roomba(robot_state, base_station_loc, time_limit, roomba_radius, database):
@@ -32,6 +32,8 @@ class Robot_State:
         Instance Attributes:
             FLAGS
             using_ekf: False if are only using GPS/IMU, True if we are using EKF
+            using_particle_filter: True if we are using the particle filter
+                instead of the EKF
             is_sim: False if the physical robot is being used, True otherwise
             store_data: False if csv data should not be stored, True otherwise
             phase: the phase of the robot
@@ -99,12 +101,17 @@ class Robot_State:
             gps:
             imu:
             ekf:
+            particle_filter:
+            sensor_fusion: the SensorFusion that fuses the timestamped sensor
+                data into ekf, or into particle_filter if using_particle_filter
         """
         # TODO: Fill in missing spec for attributes above
 
         # FLAGS
         # If false, only uses GPS and IMU; else, uses EKF
         self.using_ekf = False
+        # If true, uses the particle filter instead of the EKF
+        self.using_particle_filter = False
         self.is_sim = kwargs.get("is_sim", not is_raspberrypi())
         self.should_store_data = kwargs.get("store_data", False)
         self.phase = Phase(
@@ -197,6 +204,8 @@ class Robot_State:
         self.gps = kwargs.get("gps", None)
         self.imu = kwargs.get("imu", None)
         self.ekf = kwargs.get("ekf", None)
+        self.particle_filter = kwargs.get("particle_filter", None)
+        self.sensor_fusion = kwargs.get("sensor_fusion", None)
 
         self.front_ultrasonic = kwargs.get("front_ultrasonic", None)
         self.lf_ultrasonic = kwargs.get("lf_ultrasonic", None)
@@ -0,0 +1,138 @@
+import heapq
+import itertools
+
+from engine.ekf import MeasurementModel
+
+"""
+Asynchronous, multi-rate fusion of timestamped sensor data into a
+LocalizationEKF.
+
+Every sensor is a stream of timestamped events that arrive at its own rate: GPS
+fixes at 1-10 Hz, IMU headings at 100 Hz, wheel odometry at every control step.
+Measurement streams update the filter with their own MeasurementModel (their own
+H and R), and the odometry stream moves it with the prediction step, so the
+filter does work only when a sensor has new data.
+
+Events may arrive out of order, e.g. from sensors read in different threads or
+with different latencies. A SensorFusion holds them in a buffer ordered by
+timestamp, and only fuses the events older than max_delay seconds, so that an
+event arriving up to max_delay late is still fused in order. Events older than
+the last fused event are dropped, and the buffer never holds more than
+capacity events: when it is full, its oldest event is fused early.
+"""
+
+GPS = "gps"
+HEADING = "heading"
+ODOMETRY = "odometry"
+
+
+class SensorFusion:
+    """
+    INSTANCE ATTRIBUTES:
+        # ekf: the LocalizationEKF, or the ParticleFilter, the events are fused
+            into
+        # models: dictionary from the name of every measurement stream to its
+            MeasurementModel
+        # max_delay: how late in seconds an event may arrive and still be fused
+            in order [float]
+        # capacity: largest number of events held in the buffer [int]
+        # time: timestamp of the last fused event, None before the first [float]
+        # num_fused: dictionary from stream name to its number of fused events
+        # num_dropped: number of events dropped for arriving after a newer event
+            was fused [int]
+    """
+
+    def __init__(self, ekf, models=None, max_delay=0.05, capacity=64):
+        """
+        Arguments:
+            ekf: the LocalizationEKF, or the ParticleFilter, to fuse the events
+                into
+            models: dictionary from the name of every measurement stream to its
+                MeasurementModel; by default GPS (x and y) and HEADING streams
+                with the noise of ekf.R
+            max_delay: how late in seconds an event may arrive and still be
+                fused in order, which is also how far the fused state lags
+                behind the latest events [float]
+            capacity: largest number of events held in the buffer [int]
+        """
+        self.ekf = ekf
+        if models is None:
+            models = {
+                GPS: MeasurementModel.position(ekf.R[:2, :2]),
+                HEADING: MeasurementModel.heading(ekf.R[2:, 2:]),
+            }
+        self.models = models
+        self.max_delay = max_delay
+        self.capacity = capacity
+        self.time = None
+        self.num_fused = {name: 0 for name in [ODOMETRY, *models]}
+        self.num_dropped = 0
+        # heap of (timestamp, arrival number, stream name, data)
+        self._buffer = []
+        self._arrivals = itertools.count()
+
+    def add_measurement(self, stream, timestamp, measurement):
+        """
+        Buffers the [measurement] taken at [timestamp] (seconds) by the
+        measurement stream named [stream]. Returns False if it was dropped for
+        being older than the last fused event. [bool]
+        """
+        if stream not in self.models:
+            raise ValueError("unknown measurement stream " + str(stream))
+        return self._push(timestamp, stream, measurement)
+
+    def add_odometry(self, timestamp, d, phi):
+        """
+        Buffers the odometry measured at [timestamp] (seconds): the robot moved
+        [d] meters and turned [phi] radians since the previous odometry event.
+        Returns False if it was dropped for being older than the last fused
+        event. [bool]
+        """
+        return self._push(timestamp, ODOMETRY, (d, phi))
+
+    def _push(self, timestamp, stream, data):
+        if self.time is not None and timestamp < self.time:
+            self.num_dropped += 1
+            return False
+        heapq.heappush(self._buffer, (timestamp, next(self._arrivals), stream, data))
+        if len(self._buffer) > self.capacity:
+            self._fuse(heapq.heappop(self._buffer))
+        return True
+
+    def process(self, now):
+        """
+        Fuses, in timestamp order, every buffered event taken at least max_delay
+        seconds before [now]. Returns the number of events fused. [int]
+        """
+        buffer = self._buffer
+        cutoff = now - self.max_delay
+        num_events = 0
+        while buffer and buffer[0][0] <= cutoff:
+            self._fuse(heapq.heappop(buffer))
+            num_events += 1
+        return num_events
+
+    def flush(self):
+        """
+        Fuses every buffered event, in timestamp order. Returns the number of
+        events fused. [int]
+        """
+        num_events = len(self._buffer)
+        while self._buffer:
+            self._fuse(heapq.heappop(self._buffer))
+        return num_events
+
+    def __len__(self):
+        """
+        Returns the number of buffered events. [int]
+        """
+        return len(self._buffer)
+
+    def _fuse(self, event):
+        timestamp, _, stream, data = event
+        if stream == ODOMETRY:
+            self.ekf.predict_odometry(*data)
+        else:
+            self.ekf.update_model(self.models[stream], data)
+        self.time = timestamp
+        self.num_fused[stream] += 1
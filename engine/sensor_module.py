@@ -5,7 +5,7 @@ import serial
 import numpy as np
 import math
 
-from engine.kinematics import get_vincenty_x, get_vincenty_y
+from engine.geodesy import get_projection
 
 
 class SensorModule:
@@ -67,11 +67,8 @@ class SensorModule:
         """
         measurement = np.zeros((3, 1))
 
-        x_measurement = get_vincenty_x(
-            origin, (self.gps_dict["lat"], self.gps_dict["lon"])
-        )
-        y_measurement = get_vincenty_y(
-            origin, (self.gps_dict["lat"], self.gps_dict["lon"])
+        x_measurement, y_measurement = get_projection(tuple(origin)).gps_to_meters(
+            self.gps_dict["lat"], self.gps_dict["lon"]
         )
         theta_measurement = math.degrees(
             math.atan2(self.imu_dict["mag"]["y"], self.imu_dict["mag"]["x"])
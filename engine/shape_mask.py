@@ -0,0 +1,198 @@
+import math
+
+import numpy as np
+
+"""
+Boolean masks of shapes over a grid of nodes.
+
+Every function takes the [shape] of the grid, (num_rows, num_cols), and returns a
+boolean Numpy array of that shape which is True for every node inside the shape.
+Points are given in grid index coordinates (row, col), the same convention as the
+Grid.activate_* methods, and may be fractional.
+
+Masks are built with Numpy broadcasting, so their cost does not depend on how
+many Python objects the grid holds. Shapes are combined with the usual boolean
+operators, e.g.
+    circle_mask(shape, (10, 10), 5) | polygon_mask(shape, vertices)
+for a union, or
+    rectangle_mask(shape, 0, 0, 20, 20) & ~circle_mask(shape, (10, 10), 5)
+for a difference, and the result is applied with Grid.activate_mask.
+"""
+
+
+def _index_grids(shape):
+    """
+    Returns broadcastable arrays of the row and col index of every node.
+    """
+    rows, cols = shape
+    return np.arange(rows)[:, np.newaxis], np.arange(cols)[np.newaxis, :]
+
+
+def rectangle_mask(shape, row, col, row_limit, col_limit):
+    """
+    Returns the mask of all nodes with row in [row, row_limit) and col in
+    [col, col_limit).
+    """
+    mask = np.zeros(shape, dtype=bool)
+    mask[row:row_limit, col:col_limit] = True
+    return mask
+
+
+def circle_mask(shape, center, radius):
+    """
+    Returns the mask of all nodes strictly inside the circle of [radius] around
+    [center].
+    """
+    row, col = _index_grids(shape)
+    return (row - center[0]) ** 2 + (col - center[1]) ** 2 - radius**2 < 0
+
+
+def _triangle_area(p1, p2, p3):
+    return abs(
+        (p1[0] * (p2[1] - p3[1]) + p2[0] * (p3[1] - p1[1]) + p3[0] * (p1[1] - p2[1]))
+        / 2.0
+    )
+
+
+def _is_inside_triangle(p1, p2, p3, point):
+    """
+    Vectorized Grid.is_inside_triangle: [point] is a (row, col) pair of
+    broadcastable arrays.
+    """
+    area = _triangle_area(p1, p2, p3)
+    return area == (
+        _triangle_area(point, p2, p3)
+        + _triangle_area(p1, point, p3)
+        + _triangle_area(p1, p2, point)
+    )
+
+
+def _block_mask(shape, row_lo, row_hi, col_lo, col_hi, block_test):
+    """
+    Returns a mask that is False everywhere except in rows [row_lo, row_hi) and
+    cols [col_lo, col_hi) (clipped to the grid), where it is block_test(point)
+    for the (row, col) index arrays of the block.
+    """
+    rows, cols = shape
+    row_lo, row_hi = min(max(row_lo, 0), rows), min(max(row_hi, 0), rows)
+    col_lo, col_hi = min(max(col_lo, 0), cols), min(max(col_hi, 0), cols)
+    point = (
+        np.arange(row_lo, row_hi)[:, np.newaxis],
+        np.arange(col_lo, col_hi)[np.newaxis, :],
+    )
+    mask = np.zeros(shape, dtype=bool)
+    mask[row_lo:row_hi, col_lo:col_hi] = block_test(point)
+    return mask
+
+
+def triangle_mask(shape, p1, p2, p3):
+    """
+    Returns the mask of all nodes inside (or on the edge of) the triangle with
+    vertices [p1], [p2], [p3].
+
+    This is the area test of Grid.is_inside_triangle evaluated for every node in
+    the triangle's bounding box at once, so it selects exactly the same nodes.
+    """
+    corner_rows = (p1[0], p2[0], p3[0])
+    corner_cols = (p1[1], p2[1], p3[1])
+    return _block_mask(
+        shape,
+        math.floor(min(corner_rows)),
+        math.ceil(max(corner_rows)) + 1,
+        math.floor(min(corner_cols)),
+        math.ceil(max(corner_cols)) + 1,
+        lambda point: _is_inside_triangle(p1, p2, p3, point),
+    )
+
+
+def hexagon_mask(shape, center, radius):
+    """
+    Returns the mask of all nodes inside the regular hexagon with circumradius
+    [radius] around [center], with a vertex straight "up" (+row) from the center.
+    The hexagon is the union of six triangular sectors, each tested like
+    triangle_mask.
+    """
+    row, col = center
+    corners = [
+        (row + radius, col),
+        (row + radius / 2, col + radius * math.sqrt(3) / 2),
+        (row - radius / 2, col + radius * math.sqrt(3) / 2),
+        (row - radius, col),
+        (row - radius / 2, col - radius * math.sqrt(3) / 2),
+        (row + radius / 2, col - radius * math.sqrt(3) / 2),
+    ]
+
+    def in_any_sector(point):
+        inside = False
+        for i in range(6):
+            inside = inside | _is_inside_triangle(
+                center, corners[i], corners[(i + 1) % 6], point
+            )
+        return inside
+
+    # A circle circumscribes a hexagon
+    return _block_mask(
+        shape,
+        math.floor(row - radius),
+        math.ceil(row + radius) + 1,
+        math.floor(col - radius),
+        math.ceil(col + radius) + 1,
+        in_any_sector,
+    )
+
+
+def polygon_mask(shape, vertices):
+    """
+    Returns the mask of all nodes inside the polygon with the given [vertices],
+    which may be convex or concave (self-intersecting polygons use the even-odd
+    rule). The last vertex connects back to the first.
+
+    Uses a scanline fill: every edge is intersected with the rows it spans, and
+    the crossings toggle the inside state along each row. The cost is
+    O(num_rows * num_cols + crossings), independent of how many nodes each edge
+    passes, which keeps polygons with thousands of vertices fast on grids with
+    millions of nodes.
+
+    A node exactly on an edge counts as inside when the polygon continues to its
+    right (+col) and outside otherwise, so shapes that share an edge never
+    overlap.
+    """
+    rows, cols = shape
+    points = np.asarray(vertices, dtype=float)
+    row0, col0 = points[:, 0], points[:, 1]
+    row1, col1 = np.roll(row0, -1), np.roll(col0, -1)
+
+    # Each edge crosses the scanlines low <= row < high
+    first = np.clip(np.ceil(np.minimum(row0, row1)), 0, rows).astype(int)
+    stop = np.clip(np.ceil(np.maximum(row0, row1)), 0, rows).astype(int)
+    counts = stop - first
+    edges = np.repeat(np.arange(len(points)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    scan_rows = first[edges] + offsets
+
+    t = (scan_rows - row0[edges]) / (row1[edges] - row0[edges])
+    crossings = col0[edges] + t * (col1[edges] - col0[edges])
+    toggle_cols = np.clip(np.ceil(crossings), 0, cols).astype(int)
+
+    toggles = np.bincount(
+        scan_rows * (cols + 1) + toggle_cols, minlength=rows * (cols + 1)
+    )
+    parity = (toggles & 1).astype(np.uint8).reshape(rows, cols + 1)[:, :cols]
+    return np.bitwise_xor.accumulate(parity, axis=1).astype(bool)
+
+
+def nodes_in_polygon(vertices, rows, cols):
+    """
+    Returns a boolean array that is True for every node (rows[i], cols[i]) inside
+    the polygon with the given [vertices]. Node positions are integers, and need
+    not form a full grid: polygon_mask is evaluated over their bounding box, so
+    the same even-odd and edge rules apply.
+    """
+    rows = np.asarray(rows, dtype=np.int64).ravel()
+    cols = np.asarray(cols, dtype=np.int64).ravel()
+    if rows.size == 0:
+        return np.zeros(0, dtype=bool)
+    row_lo, col_lo = rows.min(), cols.min()
+    shape = (int(rows.max() - row_lo) + 1, int(cols.max() - col_lo) + 1)
+    mask = polygon_mask(shape, np.asarray(vertices, dtype=float) - (row_lo, col_lo))
+    return mask[rows - row_lo, cols - col_lo]
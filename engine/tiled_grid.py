@@ -0,0 +1,382 @@
+from collections import deque
+
+import numpy as np
+
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.kinematics import meters_to_lat, meters_to_long
+from engine.node import NodeStore
+from engine.waypoint_stream import WaypointStream
+
+
+class TiledGrid:
+    """
+    Instances represent a grid that is too large to hold in memory at once, split
+    into square tiles of nodes that are generated on demand.
+
+    A tile is generated the first time one of its nodes is accessed, either
+    through [nodes] or because a traversal planned by get_waypoints is about to
+    reach it, and is evicted as soon as every waypoint planned in it has been
+    visited. Nodes have the same positions as the nodes of a Grid with the same
+    bounds and step size, and the traversals visit them in the same order, so
+    memory use depends on the tile size and not on the size of the field.
+
+    INSTANCE ATTRIBUTES:
+        # lat_min, lat_max, long_min, long_max: minimum/maximum latitude/longitude boundary
+            coordinates of the grid [float]
+        # step_size: distance between neighboring nodes, in meters [float]
+        # lat_step, long_step: latitude/longitude difference between neighboring rows/cols
+            of nodes [float]
+        # num_rows, num_cols: dimensions of the whole grid [int]
+        # tile_size: number of rows and cols of nodes in a tile [int]
+
+        # tiles: dictionary from (tile_row, tile_col) to the NodeStore of every tile
+            currently in memory
+        # obstacles: flat indices (row * num_cols + col) of the nodes marked as
+            obstacles by mark_obstacles, which keep their status when their tile
+            is evicted and generated again [int set]
+        # nodes: indexable view of every node of the grid, e.g. nodes[row, col] or
+            nodes[row][col]. Accessing a node generates its tile.
+    """
+
+    def __init__(
+        self, lat_min, lat_max, long_min, long_max, step_size=None, tile_size=64
+    ):
+        """
+        Arguments:
+            lat_min, lat_max, long_min, long_max: latitude/longitude boundaries of the grid [float]
+            step_size: distance between neighboring nodes in meters,
+                Grid.STEP_SIZE_METERS when None [float]
+            tile_size: number of rows and cols of nodes in a tile [int]
+        """
+        if step_size is None:
+            step_size = Grid.STEP_SIZE_METERS
+        self.lat_min = lat_min
+        self.lat_max = lat_max
+        self.long_min = long_min
+        self.long_max = long_max
+        self.step_size = step_size
+        self.tile_size = tile_size
+
+        self.num_rows, self.num_cols = Grid.calc_step(
+            lat_min, lat_max, long_min, long_max, step_size
+        )
+        self.lat_step = meters_to_lat(step_size)
+        self.long_step = meters_to_long(step_size, lat_min)
+
+        self.tiles = {}
+        self.obstacles = set()
+        # number of planned, not yet visited waypoints in every tile with a plan
+        self._waypoints_left = {}
+        self.nodes = TiledNodes(self)
+
+    def get_num_rows(self):
+        return self.num_rows
+
+    def get_num_cols(self):
+        return self.num_cols
+
+    def get_shape(self):
+        return (self.num_rows, self.num_cols)
+
+    def get_active_waypoints_list(self):
+        """
+        Returns an empty list: listing every active waypoint would hold every node
+        of the grid in memory.
+        """
+        return []
+
+    def get_inactive_waypoints_list(self):
+        """
+        Returns an empty list, see get_active_waypoints_list.
+        """
+        return []
+
+    # --------------------------- TILES ---------------------------------- #
+
+    def get_tile_shape(self, tile_row, tile_col):
+        """
+        Returns the (rows, cols) dimensions of tile [tile_row], [tile_col]. Tiles on
+        the top and right edges of the grid may be smaller than tile_size.
+        """
+        first_row = tile_row * self.tile_size
+        first_col = tile_col * self.tile_size
+        return (
+            min(self.tile_size, self.num_rows - first_row),
+            min(self.tile_size, self.num_cols - first_col),
+        )
+
+    def get_tile(self, tile_row, tile_col):
+        """
+        Returns the NodeStore of tile [tile_row], [tile_col], generating it if it is
+        not in memory. As in a Grid after a lawnmower traversal, nodes on the
+        bottom and top rows of the grid are border nodes.
+        """
+        key = (tile_row, tile_col)
+        store = self.tiles.get(key)
+        if store is None:
+            rows, cols = self.get_tile_shape(tile_row, tile_col)
+            first_row = tile_row * self.tile_size
+            store = NodeStore.from_arrays(
+                *Grid.generate_node_coords(
+                    self.lat_min,
+                    self.long_min,
+                    rows,
+                    cols,
+                    self.step_size,
+                    first_row=first_row,
+                    first_col=tile_col * self.tile_size,
+                )
+            )
+            is_border = np.zeros((rows, cols), dtype=bool)
+            if first_row == 0:
+                is_border[0, :] = True
+            if first_row + rows == self.num_rows:
+                is_border[-1, :] = True
+            store.set_flag(NodeStore.BORDER, is_border)
+            if self.obstacles:
+                self._apply_obstacles(store, first_row, tile_col * self.tile_size)
+            self.tiles[key] = store
+        return store
+
+    def _apply_obstacles(self, store, first_row, first_col):
+        """
+        Gives the obstacle status to the nodes of [store], the tile whose first
+        node is at [first_row], [first_col], that are in obstacles.
+        """
+        rows, cols = store.shape
+        row_starts = np.arange(first_row, first_row + rows) * self.num_cols
+        indices = row_starts[:, np.newaxis] + np.arange(first_col, first_col + cols)
+        is_obstacle = np.isin(indices, np.fromiter(self.obstacles, dtype=int))
+        if is_obstacle.any():
+            store.set_status(NodeStore.OBSTACLE, is_obstacle)
+
+    def mark_obstacles(self, positions):
+        """
+        Gives the nodes at the (row, col) [positions], a list or (n, 2) array, the
+        obstacle status, as Grid.mark_obstacles does, in the tiles in memory and
+        in the tiles generated later. Returns their flat indices. [int Numpy array]
+        """
+        rows, cols = np.asarray(positions, dtype=int).reshape(-1, 2).T
+        indices = rows * self.num_cols + cols
+        self.obstacles.update(indices.tolist())
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            tile_row, local_row = divmod(row, self.tile_size)
+            tile_col, local_col = divmod(col, self.tile_size)
+            store = self.tiles.get((tile_row, tile_col))
+            if store is not None:
+                store.set_status(
+                    NodeStore.OBSTACLE,
+                    np.array([local_row * store.shape[1] + local_col]),
+                )
+        return indices
+
+    def evict_tile(self, tile_row, tile_col):
+        """
+        Removes tile [tile_row], [tile_col] from memory. Node views of the tile
+        stay valid, but changes made through them are lost when the tile is
+        generated again.
+        """
+        self.tiles.pop((tile_row, tile_col), None)
+        self._waypoints_left.pop((tile_row, tile_col), None)
+
+    def get_node(self, row, col):
+        """
+        Returns a Node view of the node at [row], [col].
+        """
+        if not (0 <= row < self.num_rows and 0 <= col < self.num_cols):
+            raise IndexError("node is outside of the grid")
+        tile_row, local_row = divmod(row, self.tile_size)
+        tile_col, local_col = divmod(col, self.tile_size)
+        store = self.get_tile(tile_row, tile_col)
+        return store.node(local_row * store.shape[1] + local_col)
+
+    def get_nodes(self, rows, cols):
+        """
+        Returns the list of Node views of the nodes at the given row and col
+        index arrays, generating the tiles they are in.
+        """
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        tile_rows, local_rows = np.divmod(rows, self.tile_size)
+        tile_cols, local_cols = np.divmod(cols, self.tile_size)
+        nodes = [None] * len(rows)
+        # group the nodes by tile, keeping their order within each tile
+        keys = tile_rows * (self.num_cols // self.tile_size + 1) + tile_cols
+        order = np.argsort(keys, kind="stable")
+        starts = np.flatnonzero(np.diff(keys[order], prepend=-1))
+        for start, stop in zip(starts, np.append(starts[1:], len(order))):
+            selected = order[start:stop]
+            first = selected[0]
+            store = self.get_tile(int(tile_rows[first]), int(tile_cols[first]))
+            indices = local_rows[selected] * store.shape[1] + local_cols[selected]
+            for position, node in zip(selected.tolist(), store.nodes(indices)):
+                nodes[position] = node
+        return nodes
+
+    def _plan(self, rows, cols):
+        """
+        Records that the nodes at the given index arrays have been planned as
+        waypoints, and returns their Node views and the (tile_row, tile_col) of
+        each of them.
+        """
+        nodes = self.get_nodes(rows, cols)
+        tiles = list(
+            zip(
+                (np.asarray(rows) // self.tile_size).tolist(),
+                (np.asarray(cols) // self.tile_size).tolist(),
+            )
+        )
+        for key in tiles:
+            self._waypoints_left[key] = self._waypoints_left.get(key, 0) + 1
+        return nodes, tiles
+
+    def _visit(self, key):
+        """
+        Records that a waypoint planned in tile [key] has been visited, and evicts
+        the tile if no planned waypoint in it is left.
+        """
+        left = self._waypoints_left.get(key, 0) - 1
+        if left > 0:
+            self._waypoints_left[key] = left
+        else:
+            self.evict_tile(*key)
+
+    # --------------------- STANDARD TRAVERSAL ALGORITHMS -------------- #
+
+    def _lawnmower_columns(self):
+        """
+        Yields the (rows, cols) index arrays of the lawnmower traversal, one column
+        at a time, in the order of Grid.get_all_lawnmower_waypoints.
+        """
+        rows = np.arange(self.num_rows)
+        for col in range(self.num_cols):
+            yield (rows[::-1] if col % 2 else rows), np.full(self.num_rows, col)
+
+    def _border_lawnmower_columns(self):
+        """
+        Yields the (rows, cols) index arrays of the border lawnmower traversal, in
+        the order of Grid.get_border_lawnmower_waypoints.
+        """
+        ends = np.array([0, self.num_rows - 1])
+        for col in range(self.num_cols):
+            yield (ends[::-1] if col % 2 else ends), np.full(2, col)
+
+    def _straight_line(self, selected_row):
+        """
+        Yields the (rows, cols) index arrays of a straight line along
+        [selected_row], in tile sized pieces.
+        """
+        for first_col in range(0, self.num_cols, self.tile_size):
+            cols = np.arange(first_col, min(first_col + self.tile_size, self.num_cols))
+            yield np.full(len(cols), selected_row), cols
+
+    def get_waypoints(self, mode):
+        """
+        Returns the robot's traversal path for the grid as a WaypointQueue, which
+        generates the waypoints, and the tiles they are in, as the robot gets close
+        to them.
+
+        Supports the ControlMode.LAWNMOWER, ControlMode.LAWNMOWER_B and
+        ControlMode.STRAIGHT traversals of Grid.get_waypoints, with the same
+        waypoints in the same order. Returns an empty list for any other [mode].
+
+        The lawnmower traversals come back through every tile of a column of
+        tiles once per column of nodes, so the queue plans two columns ahead: a
+        tile left by the robot in one column is still planned in the next one,
+        and is kept instead of being evicted and generated again.
+        """
+        if mode == ControlMode.LAWNMOWER:
+            pieces = self._lawnmower_columns()
+            length = self.num_rows * self.num_cols
+            span = self.num_rows
+        elif mode == ControlMode.LAWNMOWER_B:
+            pieces = self._border_lawnmower_columns()
+            length = 2 * self.num_cols
+            span = 2
+        elif mode == ControlMode.STRAIGHT:
+            pieces = self._straight_line(int(0.5 * self.num_rows))
+            length = self.num_cols
+            span = self.tile_size
+        else:
+            return []
+        return WaypointQueue(self, pieces, length, lookahead=2 * span)
+
+
+class TiledNodes:
+    """
+    Indexable view of the nodes of a TiledGrid, supporting nodes[row, col] and
+    nodes[row][col] like the 2D nodes array of a Grid.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.shape = grid.get_shape()
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            row, col = key
+            return self.grid.get_node(self._index(row, 0), self._index(col, 1))
+        return _TiledRow(self.grid, self._index(key, 0))
+
+    def _index(self, index, axis):
+        index = int(index)
+        return index + self.shape[axis] if index < 0 else index
+
+
+class _TiledRow:
+    def __init__(self, grid, row):
+        self.grid = grid
+        self.row = row
+
+    def __getitem__(self, col):
+        col = int(col)
+        return self.grid.get_node(
+            self.row, col + self.grid.num_cols if col < 0 else col
+        )
+
+
+class WaypointQueue(WaypointStream):
+    """
+    WaypointStream of the waypoints of a TiledGrid traversal.
+
+    Waypoints are generated in pieces (e.g. one lawnmower column) whenever fewer
+    than [lookahead] generated waypoints are left. popleft() marks the waypoint as
+    visited, which evicts its tile once all the waypoints planned in it are
+    visited.
+    """
+
+    def __init__(self, grid, pieces, length, lookahead=None):
+        """
+        Arguments:
+            grid: the TiledGrid being traversed
+            pieces: iterator of (rows, cols) index arrays of the waypoints, in order
+            length: total number of waypoints [int]
+            lookahead: minimum number of waypoints generated ahead of the robot,
+                a tile's worth when None [int]
+        """
+        super().__init__(pieces, length)
+        self.grid = grid
+        self.lookahead = grid.tile_size**2 if lookahead is None else lookahead
+        self.buffer_tiles = deque()
+
+    def _fill(self, count):
+        """
+        Generates waypoints until at least [count] are buffered, or all of them
+        have been generated.
+        """
+        while len(self.buffer) < count:
+            piece = next(self.iterator, None)
+            if piece is None:
+                return
+            nodes, tiles = self.grid._plan(*piece)
+            self.buffer.extend(nodes)
+            self.buffer_tiles.extend(tiles)
+
+    def popleft(self):
+        """
+        Removes and returns the next waypoint, marking it as visited.
+        """
+        self._fill(max(1, self.lookahead))
+        node = super().popleft()
+        self.grid._visit(self.buffer_tiles.popleft())
+        return node
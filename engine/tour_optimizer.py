@@ -0,0 +1,271 @@
+import time
+
+import numpy as np
+
+"""
+Reordering of a traversal's waypoints to shorten the path the robot drives.
+
+The traversals of engine.grid visit waypoints in the order they are generated,
+which wastes a lot of driving when the active region is made of several shapes.
+optimize_tour treats the waypoints as an open traveling salesman path from the
+first waypoint:
+    1. the path is seeded with the shorter of the given order and the greedy
+       nearest neighbor order, unless the given order is within NEAR_OPTIMAL of
+       path_lower_bound (e.g. a traversal stepping between neighboring nodes),
+    2. it is improved with 2-opt moves (reversing a stretch of the path) and
+       Or-opt moves (moving a stretch of up to three waypoints elsewhere,
+       possibly reversed) until no move shortens it or the time budget runs out.
+
+Every step evaluates all candidate moves for one waypoint at once with Numpy, so
+no distance matrix is stored and memory stays O(n) for n waypoints. Distances are
+straight lines between the waypoints' meter coordinates. The seeding and the
+improvements all check the time budget, and the given order is returned when it
+runs out before the nearest neighbor order is complete.
+"""
+
+# Moves shorter than this, in meters, are not worth the extra work
+MIN_GAIN = 1e-9
+# Paths within this fraction of path_lower_bound are not worth optimizing
+NEAR_OPTIMAL = 1e-3
+# Largest number of points in a cell of nearest_distances
+MAX_PER_CELL = 16
+
+
+def tour_length(points, order=None):
+    """
+    Returns the length of the open path through [points], an (n, 2) array,
+    visited in [order] (the given order if None). [float]
+    """
+    points = np.asarray(points, dtype=float)
+    if order is not None:
+        points = points[order]
+    if len(points) < 2:
+        return 0.0
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
+
+
+def path_lower_bound(points, start=0, max_per_cell=MAX_PER_CELL):
+    """
+    Returns a lower bound on the length of any open path through [points] that
+    starts at [start]: every other point is entered by an edge at least as long
+    as the distance to its nearest neighbor. Returns None when the bound is not
+    cheap to compute, see nearest_distances. [float]
+    """
+    nearest = nearest_distances(points, max_per_cell)
+    if nearest is None:
+        return None
+    return float(nearest.sum() - nearest[start])
+
+
+def nearest_distances(points, max_per_cell=MAX_PER_CELL):
+    """
+    Returns the distance from every point of [points], an (n, 2) array, to its
+    nearest other point [float Numpy array], or None when some cell holds more
+    than [max_per_cell] points.
+
+    The points are hashed into square cells as wide as the longest of the
+    shorter edges of every point in the given order, so the nearest neighbor of
+    every point is in the 3 x 3 cells around it, and the search takes
+    O(n * max_per_cell) time instead of O(n^2). The cells are small for orders
+    that step between neighbors, e.g. a traversal of a grid, and too large for
+    scattered orders, for which the bound is of no use anyway.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n < 2:
+        return np.full(n, np.inf)
+    edges = np.hypot(*np.diff(points, axis=0).T)
+    shorter = np.minimum(np.append(edges, np.inf), np.insert(edges, 0, np.inf))
+    # a little wider, so that rounding never puts neighbors two cells apart
+    width = shorter.max() * (1 + 1e-6)
+    if width == 0:
+        return np.zeros(n)
+
+    # cells numbered row by row, with an empty border for the neighbor offsets
+    cells = np.floor((points - points.min(axis=0)) / width).astype(np.int64) + 1
+    num_cols = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * num_cols + cells[:, 1]
+    by_key = np.argsort(keys, kind="stable")
+    sorted_keys = keys[by_key]
+    if np.unique(sorted_keys, return_counts=True)[1].max() > max_per_cell:
+        return None
+
+    nearest = np.full(n, np.inf)
+    own = np.arange(n)
+    for row_offset in (-1, 0, 1):
+        for col_offset in (-1, 0, 1):
+            neighbor_keys = keys + row_offset * num_cols + col_offset
+            first = np.searchsorted(sorted_keys, neighbor_keys, side="left")
+            stop = np.searchsorted(sorted_keys, neighbor_keys, side="right")
+            # the k-th point of the neighbor cell of every point, if any
+            for k in range(int((stop - first).max())):
+                candidates = by_key[np.minimum(first + k, n - 1)]
+                dist = np.hypot(*(points[candidates] - points).T)
+                dist[(first + k >= stop) | (candidates == own)] = np.inf
+                np.minimum(nearest, dist, out=nearest)
+    return nearest
+
+
+def nearest_neighbor_order(points, start=0, deadline=None):
+    """
+    Returns the greedy order of [points] that starts at [start] and always moves
+    on to the nearest point not yet visited [int Numpy array], or None if
+    time.monotonic() passes [deadline] first.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    order = np.empty(n, dtype=int)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for k in range(n):
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        order[k] = current
+        visited[current] = True
+        if k == n - 1:
+            break
+        delta = points - points[current]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        dist[visited] = np.inf
+        current = int(np.argmin(dist))
+    return order
+
+
+def two_opt(points, order, deadline=None):
+    """
+    Improves the open path [order] over [points] in place with 2-opt moves,
+    keeping the first point fixed, until no move shortens it or
+    time.monotonic() passes [deadline]. Returns whether it converged.
+    """
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            # reverse order[i:j + 1]: the edges (i - 1, i) and (j, j + 1) become
+            # (i - 1, j) and (i, j + 1), and the last point has no next edge
+            path = points[order]
+            js = np.arange(i + 1, n)
+            nexts = np.minimum(js + 1, n - 1)
+            has_next = js < n - 1
+            old = np.hypot(*(path[i - 1] - path[i])) + np.where(
+                has_next, np.hypot(*(path[js] - path[nexts]).T), 0.0
+            )
+            new = np.hypot(*(path[i - 1] - path[js]).T) + np.where(
+                has_next, np.hypot(*(path[i] - path[nexts]).T), 0.0
+            )
+            gains = old - new
+            best = int(np.argmax(gains))
+            if gains[best] > MIN_GAIN:
+                j = int(js[best])
+                order[i : j + 1] = order[i : j + 1][::-1].copy()
+                improved = True
+    return True
+
+
+def or_opt(points, order, deadline=None, max_segment=3):
+    """
+    Improves the open path [order] over [points] in place by moving stretches of
+    up to [max_segment] consecutive points elsewhere in the path, possibly
+    reversed, keeping the first point fixed. Stops when no move shortens the
+    path or time.monotonic() passes [deadline]. Returns whether it converged.
+    """
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length <= n:
+                if deadline is not None and time.monotonic() > deadline:
+                    return False
+                if _move_segment(points, order, i, i + length):
+                    improved = True
+                i += 1
+    return True
+
+
+def _move_segment(points, order, first, stop):
+    """
+    Moves order[first:stop] to the position where it shortens the path the most,
+    if any. Returns whether the path changed.
+    """
+    n = len(order)
+    path = points[order]
+    head, tail = path[first], path[stop - 1]
+    # gain of removing the segment from between first - 1 and stop
+    removal = np.hypot(*(path[first - 1] - head))
+    if stop < n:
+        removal += np.hypot(*(tail - path[stop])) - np.hypot(
+            *(path[first - 1] - path[stop])
+        )
+
+    # cost of inserting it between k and k + 1 of the path without the segment,
+    # forward or reversed, or after its last point
+    rest = np.concatenate([order[:first], order[stop:]])
+    rest_path = points[rest]
+    starts, ends = rest_path[:-1], rest_path[1:]
+    edge = np.hypot(*(starts - ends).T)
+    forward = np.hypot(*(starts - head).T) + np.hypot(*(tail - ends).T) - edge
+    backward = np.hypot(*(starts - tail).T) + np.hypot(*(head - ends).T) - edge
+    at_end = min(np.hypot(*(rest_path[-1] - head)), np.hypot(*(rest_path[-1] - tail)))
+    costs = np.minimum(forward, backward)
+    # reinserting where the segment was is no move
+    if stop < n:
+        costs[first - 1] = np.inf
+    else:
+        at_end = np.inf
+    k = int(np.argmin(costs)) if len(costs) else 0
+    best = min(costs[k], at_end) if len(costs) else at_end
+    if best >= removal - MIN_GAIN:
+        return False
+
+    segment = order[first:stop]
+    if at_end == best:
+        reverse = np.hypot(*(rest_path[-1] - tail)) < np.hypot(*(rest_path[-1] - head))
+        order[:] = np.concatenate([rest, segment[::-1] if reverse else segment])
+    else:
+        reverse = backward[k] < forward[k]
+        order[:] = np.concatenate(
+            [rest[: k + 1], segment[::-1] if reverse else segment, rest[k + 1 :]]
+        )
+    return True
+
+
+def optimize_tour(waypoints, time_budget=1.0):
+    """
+    Returns ([waypoints] reordered into a shorter path, path length before,
+    path length after), with lengths in meters. The first waypoint stays first.
+
+    Arguments:
+        waypoints: list of Nodes, or of anything with get_m_coords()
+        time_budget: maximum running time in seconds, after which the best path
+            found so far, or the given order, is returned [float]
+    """
+    deadline = time.monotonic() + time_budget
+    points = np.array([waypoint.get_m_coords() for waypoint in waypoints], dtype=float)
+    points = points.reshape(-1, 2)
+    given = np.arange(len(points))
+    before = tour_length(points)
+    if len(points) < 3:
+        return list(waypoints), before, before
+    # e.g. a lawnmower traversal of every node, which only steps to neighbors
+    bound = path_lower_bound(points)
+    if bound is not None and before <= bound * (1 + NEAR_OPTIMAL):
+        return list(waypoints), before, before
+
+    order = nearest_neighbor_order(points, deadline=deadline)
+    if order is None:
+        return list(waypoints), before, before
+    if tour_length(points, order) >= before:
+        order = given
+    # alternate the two improvements, each one can unlock moves for the other
+    while time.monotonic() < deadline:
+        length = tour_length(points, order)
+        converged = two_opt(points, order, deadline)
+        converged = or_opt(points, order, deadline) and converged
+        if converged and tour_length(points, order) >= length - MIN_GAIN:
+            break
+    return [waypoints[i] for i in order.tolist()], before, tour_length(points, order)
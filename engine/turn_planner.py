@@ -0,0 +1,218 @@
+import math
+
+import numpy as np
+
+"""
+Minimum length turns between robot poses, under a minimum turning radius.
+
+A pose is (x, y, heading), with the heading in radians counterclockwise from the
+x axis. The shortest path between two poses for a vehicle that only drives
+forward and never turns tighter than a radius r is a Dubins path: two arcs of
+radius r joined by a straight segment or by a third arc (words LSL, RSR, LSR,
+RSL, RLR and LRL, with L/R a left/right arc and S a straight segment).
+
+Turns are sampled into points in closed form with Numpy. Lawnmower traversals
+repeat the same few turns at every row transition, so a TurnPlanner caches the
+sampled turns as templates relative to their start point, keyed by the
+orientations of the start and end poses, the offset between them, the radius
+and the spacing of the points. A turn that was planned before is then only a
+translation of its template.
+"""
+
+TWO_PI = 2 * math.pi
+WORDS = ("LSL", "RSR", "LSR", "RSL", "RLR", "LRL")
+# decimals the poses are rounded to in the template cache keys, so
+# that turns that only differ by rounding errors share a template
+KEY_DECIMALS = 6
+
+
+def turning_radius(epsilon, radius):
+    """
+    Returns the minimum turning radius in meters of a robot driven by
+    kinematics.feedback_lin: the point [epsilon] meters ahead of the axle that
+    the controller steers cannot follow curves tighter than [epsilon], and
+    curves tighter than the wheel to center distance [radius] would need a wheel
+    to drive backwards. [float]
+    """
+    return max(epsilon, radius)
+
+
+def _mod2pi(angle):
+    return angle % TWO_PI
+
+
+def _word_lengths(word, alpha, beta, d):
+    """
+    Returns the (t, p, q) lengths of the three segments of the Dubins path
+    [word], normalized by the turning radius, from heading [alpha] to heading
+    [beta] relative to the line between the poses, [d] turning radii apart. None
+    if the word cannot join the poses.
+    """
+    sa, sb, ca, cb = math.sin(alpha), math.sin(beta), math.cos(alpha), math.cos(beta)
+    c_ab = math.cos(alpha - beta)
+    if word == "LSL":
+        p_sq = 2 + d * d - 2 * c_ab + 2 * d * (sa - sb)
+        if p_sq < 0:
+            return None
+        tmp = math.atan2(cb - ca, d + sa - sb)
+        return _mod2pi(tmp - alpha), math.sqrt(p_sq), _mod2pi(beta - tmp)
+    if word == "RSR":
+        p_sq = 2 + d * d - 2 * c_ab + 2 * d * (sb - sa)
+        if p_sq < 0:
+            return None
+        tmp = math.atan2(ca - cb, d - sa + sb)
+        return _mod2pi(alpha - tmp), math.sqrt(p_sq), _mod2pi(tmp - beta)
+    if word == "LSR":
+        p_sq = -2 + d * d + 2 * c_ab + 2 * d * (sa + sb)
+        if p_sq < 0:
+            return None
+        p = math.sqrt(p_sq)
+        tmp = math.atan2(-ca - cb, d + sa + sb) - math.atan2(-2, p)
+        return _mod2pi(tmp - alpha), p, _mod2pi(tmp - _mod2pi(beta))
+    if word == "RSL":
+        p_sq = -2 + d * d + 2 * c_ab - 2 * d * (sa + sb)
+        if p_sq < 0:
+            return None
+        p = math.sqrt(p_sq)
+        tmp = math.atan2(ca + cb, d - sa - sb) - math.atan2(2, p)
+        return _mod2pi(alpha - tmp), p, _mod2pi(beta - tmp)
+    if word == "RLR":
+        tmp = (6 - d * d + 2 * c_ab + 2 * d * (sa - sb)) / 8
+        if abs(tmp) > 1:
+            return None
+        p = _mod2pi(2 * math.pi - math.acos(tmp))
+        t = _mod2pi(alpha - math.atan2(ca - cb, d - sa + sb) + p / 2)
+        return t, p, _mod2pi(alpha - beta - t + p)
+    if word == "LRL":
+        tmp = (6 - d * d + 2 * c_ab + 2 * d * (sb - sa)) / 8
+        if abs(tmp) > 1:
+            return None
+        p = _mod2pi(2 * math.pi - math.acos(tmp))
+        t = _mod2pi(-alpha - math.atan2(ca - cb, d + sa - sb) + p / 2)
+        return t, p, _mod2pi(beta - alpha - t + p)
+    raise ValueError("unknown Dubins word " + word)
+
+
+def dubins_path(start, end, radius):
+    """
+    Returns (word, lengths) for the shortest Dubins path from pose [start] to
+    pose [end] with turning radius [radius], where lengths are the lengths of
+    its three segments in the units of the poses.
+    """
+    if radius <= 0:
+        raise ValueError("the turning radius must be positive")
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    d = math.hypot(dx, dy) / radius
+    phi = math.atan2(dy, dx) if d > 0 else 0.0
+    alpha, beta = _mod2pi(start[2] - phi), _mod2pi(end[2] - phi)
+    best = None
+    for word in WORDS:
+        lengths = _word_lengths(word, alpha, beta, d)
+        if lengths is not None and (best is None or sum(lengths) < sum(best[1])):
+            best = (word, lengths)
+    word, lengths = best
+    return word, tuple(length * radius for length in lengths)
+
+
+def sample_path(start, word, lengths, radius, spacing):
+    """
+    Returns the (n, 2) array of the points every [spacing] along the Dubins
+    path ([word], [lengths]) from pose [start], including the start and
+    excluding the end.
+    """
+    # the end is excluded even if rounding puts it a hair past a whole spacing
+    s = np.arange(math.ceil(sum(lengths) / spacing - 1e-6)) * spacing
+    points = np.empty((len(s), 2))
+    x, y, heading = start
+    offset = 0.0
+    for i, (kind, length) in enumerate(zip(word, lengths)):
+        selected = s >= offset
+        if i < 2:
+            selected &= s < offset + length
+        u = s[selected] - offset
+        if kind == "S":
+            points[selected, 0] = x + u * math.cos(heading)
+            points[selected, 1] = y + u * math.sin(heading)
+        else:
+            # turning left around the center on the left of the heading, or right
+            side = 1 if kind == "L" else -1
+            angle = heading + side * u / radius
+            points[selected, 0] = x + side * radius * (
+                np.sin(angle) - math.sin(heading)
+            )
+            points[selected, 1] = y - side * radius * (
+                np.cos(angle) - math.cos(heading)
+            )
+        # pose at the end of the segment
+        if kind == "S":
+            x += length * math.cos(heading)
+            y += length * math.sin(heading)
+        else:
+            end_heading = heading + side * length / radius
+            x += side * radius * (math.sin(end_heading) - math.sin(heading))
+            y -= side * radius * (math.cos(end_heading) - math.cos(heading))
+            heading = end_heading
+        offset += length
+    return points
+
+
+class TurnPlanner:
+    """
+    INSTANCE ATTRIBUTES:
+        # radius: minimum turning radius, in meters [float]
+        # spacing: distance between the points of the turns, in meters [float]
+        # templates: dictionary from (end offset x, y, start heading, end
+            heading, radius, spacing) to the points of the turn relative to its
+            start point [list of (float, float) tuples]
+        # num_planned: number of turns planned from scratch, one per template [int]
+    """
+
+    def __init__(self, radius, spacing=None):
+        """
+        Arguments:
+            radius: minimum turning radius, in meters [float]
+            spacing: distance between the points of the turns in meters, an arc of
+                pi / 12 radians (the theta_step of Grid.plot_circle) when None
+                [float]
+        """
+        self.radius = radius
+        self.spacing = radius * math.pi / 12 if spacing is None else spacing
+        self.templates = {}
+        self.num_planned = 0
+
+    @classmethod
+    def for_robot(cls, robot_state, spacing=None):
+        """
+        Returns a TurnPlanner for the turning radius of the robot with the
+        Robot_State [robot_state], see turning_radius.
+        """
+        return cls(turning_radius(robot_state.epsilon, robot_state.radius), spacing)
+
+    def get_turn(self, start, end, scale=1.0):
+        """
+        Returns the (x, y) points of the shortest turn from pose [start] to pose
+        [end], every spacing along it, including the start and excluding the end,
+        as a list of tuples like Grid.plot_circle.
+
+        [scale] is the number of units of the poses per meter, e.g. 1 / step_size
+        for poses in grid indices.
+        """
+        x, y, heading = start
+        dx, dy = end[0] - x, end[1] - y
+        radius, spacing = self.radius * scale, self.spacing * scale
+        key = (
+            round(dx, KEY_DECIMALS),
+            round(dy, KEY_DECIMALS),
+            round(heading % TWO_PI, KEY_DECIMALS),
+            round(end[2] % TWO_PI, KEY_DECIMALS),
+            radius,
+            spacing,
+        )
+        template = self.templates.get(key)
+        if template is None:
+            word, lengths = dubins_path((0.0, 0.0, heading), (dx, dy, end[2]), radius)
+            points = sample_path((0.0, 0.0, heading), word, lengths, radius, spacing)
+            template = [tuple(point) for point in points.tolist()]
+            self.templates[key] = template
+            self.num_planned += 1
+        return [(x + dx, y + dy) for dx, dy in template]
@@ -0,0 +1,86 @@
+from collections import deque
+from itertools import islice
+
+
+class WaypointStream:
+    """
+    Lazily generated queue of waypoints, with the parts of the deque interface
+    used by the traversal logic: len(), truth value, indexing from the front,
+    popleft() and iteration.
+
+    Waypoints are pulled from [iterator] only when they are looked at or visited,
+    so a traversal can start as soon as its first waypoint is generated, and only
+    the waypoints looked at but not yet visited are held in memory.
+
+    INSTANCE ATTRIBUTES:
+        # iterator: iterator over the waypoints that were not generated yet
+        # length: number of waypoints left, None if not known yet [int]
+        # buffer: deque of the waypoints generated but not visited yet
+    """
+
+    def __init__(self, iterator, length=None):
+        """
+        Arguments:
+            iterator: iterable of the waypoints, in traversal order
+            length: total number of waypoints, if known [int]
+        """
+        self.iterator = iter(iterator)
+        self.length = length
+        self.buffer = deque()
+
+    def _fill(self, count):
+        """
+        Generates waypoints until at least [count] are buffered, or all of them
+        have been generated.
+        """
+        missing = count - len(self.buffer)
+        if missing > 0:
+            self.buffer.extend(islice(self.iterator, missing))
+
+    def __len__(self):
+        """
+        Returns the number of waypoints left. If the stream was made without a
+        length, every remaining waypoint is generated to count them.
+        """
+        if self.length is None:
+            self.buffer.extend(self.iterator)
+            self.length = len(self.buffer)
+        return self.length
+
+    def __bool__(self):
+        if self.length is not None:
+            return self.length > 0
+        self._fill(1)
+        return len(self.buffer) > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        self._fill(index + 1)
+        if not 0 <= index < len(self.buffer):
+            raise IndexError("waypoint index out of range")
+        return self.buffer[index]
+
+    def popleft(self):
+        """
+        Removes and returns the next waypoint.
+        """
+        self._fill(1)
+        if not self.buffer:
+            raise IndexError("pop from an empty WaypointStream")
+        if self.length is not None:
+            self.length -= 1
+        return self.buffer.popleft()
+
+    def __iter__(self):
+        """
+        Iterates over the remaining waypoints without visiting them, generating
+        all of them.
+        """
+        index = 0
+        while True:
+            self._fill(index + 1)
+            if index >= len(self.buffer):
+                return
+            yield self.buffer[index]
+            index += 1
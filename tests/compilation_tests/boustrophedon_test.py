@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.shape_mask import circle_mask, polygon_mask, rectangle_mask
+from engine.boustrophedon import boustrophedon_indices, count_turns, decompose
+
+"""
+Unit tests for boustrophedon.py
+"""
+
+
+def is_covered(mask, indices):
+    visited = np.zeros(mask.size, dtype=bool)
+    visited[indices] = True
+    return np.array_equal(mask.ravel(), visited)
+
+
+class TestBoustrophedon(unittest.TestCase):
+    shape = (40, 35)
+    # a "U" shape with a notch cut from the top
+    u_shape = [
+        (2, 2),
+        (2, 30),
+        (35, 30),
+        (35, 22),
+        (10, 22),
+        (10, 10),
+        (35, 10),
+        (35, 2),
+    ]
+
+    def test_decompose_convex(self):
+        mask = circle_mask(self.shape, (20, 17), 12)
+        self.assertEqual(1, len(decompose(mask)))
+
+    def test_decompose_concave(self):
+        # every column of the U is a single run
+        self.assertEqual(1, len(decompose(polygon_mask(self.shape, self.u_shape))))
+        # turned sideways, the U splits into its base and its two arms
+        mask = polygon_mask(self.shape, [(col, row) for row, col in self.u_shape])
+        cells = decompose(mask)
+        self.assertEqual(3, len(cells))
+        self.assertEqual(int(mask.sum()), sum(int(c.get_mask().sum()) for c in cells))
+
+    def test_covers_only_the_active_region(self):
+        mask = polygon_mask(self.shape, self.u_shape) & ~circle_mask(
+            self.shape, (6, 15), 3
+        )
+        indices = boustrophedon_indices(mask)
+        self.assertTrue(is_covered(mask, indices))
+        # transitions between cells stay on active nodes
+        self.assertTrue(mask.ravel()[indices].all())
+
+    def test_sweep_direction_minimizes_turns(self):
+        mask = rectangle_mask(self.shape, 5, 0, 10, 35)
+        indices = boustrophedon_indices(mask)
+        self.assertTrue(is_covered(mask, indices))
+        rows, cols = np.divmod(indices, self.shape[1])
+        # wide and short, so swept row by row
+        self.assertEqual((5, 0), (rows[0], cols[0]))
+        self.assertEqual(5, rows[34])
+        self.assertEqual(4 * 2, count_turns(indices, self.shape[1]))
+
+    def test_fewer_turns_than_lawnmower(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        shape = g.get_shape()
+        mask = polygon_mask(shape, [(2, 2), (2, 60), (12, 60), (25, 30), (12, 2)])
+        g.activate_mask(mask)
+        lawnmower = np.flatnonzero(mask.T.ravel())
+        waypoints = g.get_waypoints(ControlMode.BOUSTROPHEDON)
+        indices = [node.index for node in waypoints]
+        self.assertTrue(is_covered(mask, indices))
+        self.assertEqual(len(waypoints), len(g.get_active_waypoints_list()))
+        self.assertEqual([], g.get_inactive_waypoints_list())
+        self.assertLess(
+            count_turns(indices, shape[1]), count_turns(lawnmower, shape[1])
+        )
+
+    def test_whole_grid_without_active_nodes(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        waypoints = g.get_waypoints(ControlMode.BOUSTROPHEDON)
+        self.assertEqual(g.get_num_rows() * g.get_num_cols(), len(waypoints))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import math
+import unittest
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.distance_field import DistanceField
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.shape_mask import rectangle_mask
+
+"""
+Unit tests for distance_field.py
+"""
+
+
+def make_grid():
+    return Grid(42.444250, 42.444599, -76.483682, -76.483276)
+
+
+def path_length(grid, path):
+    return sum(
+        grid.step_size * math.hypot(a[0] - b[0], a[1] - b[1])
+        for a, b in zip(path, path[1:])
+    )
+
+
+class TestDistanceField(unittest.TestCase):
+    def test_open_grid(self):
+        g = make_grid()
+        field = DistanceField(g, (5, 5))
+        rows, cols = np.indices(g.get_shape())
+        d_row, d_col = np.abs(rows - 5), np.abs(cols - 5)
+        octile = np.maximum(d_row, d_col) + (math.sqrt(2) - 1) * np.minimum(
+            d_row, d_col
+        )
+        np.testing.assert_allclose(octile * g.step_size, field.get_distances())
+
+    def test_path(self):
+        g = make_grid()
+        field = DistanceField(g, (5, 5))
+        field.add_obstacles([(10, col) for col in range(0, 20)])
+        path = field.get_path((20, 3))
+        self.assertEqual((20, 3), path[0])
+        self.assertEqual((5, 5), path[-1])
+        self.assertAlmostEqual(field.get_cost((20, 3)), path_length(g, path))
+        status = g.store.get_status()
+        for a, b in zip(path, path[1:]):
+            self.assertEqual(1, max(abs(a[0] - b[0]), abs(a[1] - b[1])))
+            self.assertNotEqual(2, status[b])
+
+    def test_incremental_matches_fresh(self):
+        g = make_grid()
+        field = DistanceField(g, (5, 5))
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            obstacles = [
+                position
+                for position in zip(
+                    rng.integers(0, g.num_rows, 15), rng.integers(0, g.num_cols, 15)
+                )
+                if position != (5, 5)
+            ]
+            field.add_obstacles(obstacles)
+            fresh = DistanceField(g, (5, 5))
+            np.testing.assert_allclose(fresh.get_distances(), field.get_distances())
+
+        # a wall next to the base changes the paths of most of the grid
+        field.add_obstacles([(6, col) for col in range(0, 12)])
+        fresh = DistanceField(g, (5, 5))
+        np.testing.assert_allclose(fresh.get_distances(), field.get_distances())
+
+        # clearing obstacles shortens the paths again
+        cleared = list(zip(*np.nonzero(g.store.get_status() == 2)))[::2]
+        g.store.set_status(0, np.array([r * g.num_cols + c for r, c in cleared]))
+        field.update_nodes(cleared)
+        fresh = DistanceField(g, (5, 5))
+        np.testing.assert_allclose(fresh.get_distances(), field.get_distances())
+
+    def test_unreachable(self):
+        g = make_grid()
+        field = DistanceField(g, (5, 5))
+        field.add_obstacles([(row, 20) for row in range(g.num_rows)])
+        self.assertEqual(math.inf, field.get_cost((5, 25)))
+        self.assertEqual([], field.get_path((5, 25)))
+
+    def test_active_only(self):
+        g = make_grid()
+        g.activate_mask(rectangle_mask(g.get_shape(), 0, 0, 10, 30))
+        g.activate_mask(rectangle_mask(g.get_shape(), 0, 20, 30, 30))
+        field = DistanceField(g, (5, 5), active_only=True)
+        # around the L shape, not across the inactive corner
+        path = field.get_path((25, 25))
+        self.assertTrue(all(row < 10 or col >= 20 for row, col in path))
+        self.assertEqual(math.inf, field.get_cost((25, 5)))
+
+    def test_return_waypoints(self):
+        g = make_grid()
+        field = DistanceField(g, (5, 5))
+        x, y = g.node_xs[5, 25], g.node_ys[5, 25]
+        self.assertEqual(
+            [(g.node_xs[5, 5], g.node_ys[5, 5])], field.get_return_waypoints(x, y)
+        )
+        self.assertAlmostEqual(20 * g.step_size, field.get_return_cost(x, y))
+        field.add_obstacles([(row, 15) for row in range(0, 20)])
+        corners = field.get_return_waypoints(x, y)
+        self.assertGreater(len(corners), 1)
+        self.assertEqual((g.node_xs[5, 5], g.node_ys[5, 5]), corners[-1])
+
+    def test_m_coords_to_index(self):
+        g = make_grid()
+        for row, col in [(0, 0), (7, 3), (g.num_rows - 1, g.num_cols - 1)]:
+            x, y = g.node_xs[row, col], g.node_ys[row, col]
+            self.assertEqual((row, col), g.m_coords_to_index(x + 0.2, y - 0.2))
+        self.assertEqual((0, 0), g.m_coords_to_index(-5, -5))
+
+    def test_mission_state(self):
+        g = make_grid()
+        mission = Mission_State(
+            None, (g.node_lats[5, 5], g.node_longs[5, 5]), ControlMode.LAWNMOWER, grid=g
+        )
+        # computed with the mission, before the robot heads home
+        field = mission.distance_field
+        self.assertIs(field, mission.get_distance_field())
+        self.assertEqual(5 * g.num_cols + 5, field.source)
+        self.assertAlmostEqual(
+            field.get_distances()[0, 0], field.get_return_cost(0.0, 0.0)
+        )
+        mission.add_obstacles([(row, 15) for row in range(0, 20)])
+        self.assertIs(field, mission.get_distance_field())
+        np.testing.assert_allclose(
+            DistanceField(g, (5, 5)).get_distances(), field.get_distances()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
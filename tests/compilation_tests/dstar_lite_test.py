@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+from engine.dstar_lite import DIAGONAL_COST, STRAIGHT_COST, DStarLite
+from engine.grid import Grid
+
+"""
+Unit tests for dstar_lite.py
+"""
+
+
+def make_grid():
+    return Grid(42.444250, 42.444599, -76.483682, -76.483276)
+
+
+def path_cost(path):
+    return sum(
+        STRAIGHT_COST if a[0] == b[0] or a[1] == b[1] else DIAGONAL_COST
+        for a, b in zip(path, path[1:])
+    )
+
+
+class TestDStarLite(unittest.TestCase):
+    def assert_valid(self, grid, path, start, goal):
+        self.assertEqual(start, path[0])
+        self.assertEqual(goal, path[-1])
+        status = grid.store.get_status()
+        for a, b in zip(path, path[1:]):
+            self.assertEqual(1, max(abs(a[0] - b[0]), abs(a[1] - b[1])))
+            self.assertNotEqual(2, status[b])
+
+    def test_open_grid(self):
+        g = make_grid()
+        search = DStarLite(g, (0, 0), (20, 10))
+        path = search.get_path()
+        self.assert_valid(g, path, (0, 0), (20, 10))
+        self.assertEqual(10 * DIAGONAL_COST + 10 * STRAIGHT_COST, path_cost(path))
+        self.assertAlmostEqual(
+            (10 * DIAGONAL_COST + 10 * STRAIGHT_COST) / STRAIGHT_COST * g.step_size,
+            search.get_cost(),
+        )
+
+    def test_wall(self):
+        g = make_grid()
+        search = DStarLite(g, (10, 0), (10, 20))
+        search.get_path()
+        # a wall across the straight line, open at the top
+        search.add_obstacles([(row, 10) for row in range(0, 30)])
+        path = search.get_path()
+        self.assert_valid(g, path, (10, 0), (10, 20))
+        self.assertIn((30, 10), path)
+
+    def test_unreachable(self):
+        g = make_grid()
+        search = DStarLite(g, (10, 0), (10, 20))
+        search.add_obstacles([(row, 10) for row in range(g.num_rows)])
+        self.assertEqual([], search.get_path())
+        self.assertEqual(float("inf"), search.get_cost())
+        # reopening a gap makes it reachable again
+        g.store.set_status(0, np.array([5 * g.num_cols + 10]))
+        search.update_nodes([(5, 10)])
+        self.assertIn((5, 10), search.get_path())
+
+    def test_incremental_matches_fresh(self):
+        g = make_grid()
+        goal = (g.num_rows - 1, g.num_cols - 1)
+        search = DStarLite(g, (0, 0), goal)
+        path = search.get_path()
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            search.move_start(path[min(3, len(path) - 1)])
+            obstacles = zip(
+                rng.integers(1, g.num_rows - 1, 20), rng.integers(0, g.num_cols, 20)
+            )
+            search.add_obstacles([o for o in obstacles if o != goal])
+            path = search.get_path()
+            start = divmod(search.start, g.num_cols)
+            fresh = DStarLite(g, start, goal).get_path()
+            self.assertEqual(path_cost(fresh), path_cost(path))
+            if path:
+                self.assert_valid(g, path, start, goal)
+
+    def test_incremental_expands_less(self):
+        g = make_grid()
+        goal = (g.num_rows - 1, 15)
+        # a wall the robot only sees once it is within 2 nodes of it
+        hidden = np.zeros(g.get_shape(), dtype=bool)
+        hidden[20, 3:30] = True
+        hidden[10:20, 29] = True
+        search = DStarLite(g, (0, 15), goal)
+        search.compute_shortest_path()
+        fresh_expanded = 0
+        position = (0, 15)
+        while position != goal:
+            row, col = position
+            seen = np.zeros_like(hidden)
+            seen[max(row - 2, 0) : row + 3, max(col - 2, 0) : col + 3] = True
+            new = hidden & seen & (g.store.get_status() != 2)
+            if new.any():
+                search.add_obstacles(list(zip(*np.nonzero(new))))
+                fresh = DStarLite(g, position, goal)
+                fresh.compute_shortest_path()
+                fresh_expanded += fresh.num_expanded
+            path = search.get_path()
+            self.assertEqual(position, path[0])
+            position = path[1]
+            search.move_start(position)
+        self.assertLess(2 * search.num_expanded, fresh_expanded)
+
+
+if __name__ == "__main__":
+    unittest.main()
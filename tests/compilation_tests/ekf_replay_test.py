@@ -0,0 +1,126 @@
+import math
+import os
+import tempfile
+import unittest
+import numpy as np
+from engine.ekf import LocalizationEKF
+from engine.ekf_replay import EKFReplay, load_log, log_measurements, wrap_angles
+from engine.geodesy import get_projection
+
+"""
+Unit tests for ekf_replay.py
+"""
+
+GPS_FILE = "./csv_files/GPS_22-11-2021.txt"
+IMU_FILE = "./csv_files/imu_360_sample1.csv"
+
+
+def make_ekf():
+    return LocalizationEKF(np.zeros((3, 1)), 10 * np.eye(3), 0.4)
+
+
+def make_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    measurements = rng.normal(0, 1, (n, 3))
+    measurements[:, 2] = rng.uniform(-math.pi, math.pi, n)
+    measurements[np.arange(n) % 5 != 0, :2] = np.nan
+    measurements[7::10, 2] = np.nan
+    controls = np.column_stack([rng.uniform(0, 0.5, n), rng.uniform(-0.3, 0.3, n)])
+    return measurements, controls
+
+
+def loop_smooth(mus, sigmas, mu_bars, sigma_bars, jac_Gs):
+    """
+    The backward recursion of the RTS smoother, one frame at a time.
+    """
+    mus, mu_bars = mus.copy(), mu_bars.copy()
+    mus[:, 2] = np.unwrap(mus[:, 2])
+    mu_bars[:, 2] = mus[:, 2] + wrap_angles(mu_bars[:, 2] - mus[:, 2])
+    smoothed_mus, smoothed_sigmas = mus.copy(), sigmas.copy()
+    for k in reversed(range(len(mus) - 1)):
+        gain = sigmas[k] @ jac_Gs[k + 1].T @ np.linalg.inv(sigma_bars[k + 1])
+        smoothed_mus[k] = mus[k] + gain @ (smoothed_mus[k + 1] - mu_bars[k + 1])
+        smoothed_sigmas[k] = (
+            sigmas[k] + gain @ (smoothed_sigmas[k + 1] - sigma_bars[k + 1]) @ gain.T
+        )
+    smoothed_mus[:, 2] = wrap_angles(smoothed_mus[:, 2])
+    return smoothed_mus, smoothed_sigmas
+
+
+class TestEKFReplay(unittest.TestCase):
+    def test_run_matches_filter(self):
+        measurements, controls = make_frames(30)
+        replay = EKFReplay(make_ekf())
+        replay.run(measurements, controls)
+
+        ekf = make_ekf()
+        for i, ((d, phi), (x, y, heading)) in enumerate(zip(controls, measurements)):
+            ekf.predict_odometry(d, phi)
+            np.testing.assert_allclose(ekf.mu[:, 0], replay.mu_bars[i])
+            if not math.isnan(x):
+                ekf.update_model(replay.gps_model, np.array([[x], [y]]))
+            if not math.isnan(heading):
+                ekf.update_model(replay.heading_model, heading)
+            np.testing.assert_allclose(ekf.mu[:, 0], replay.mus[i])
+            np.testing.assert_allclose(ekf.sigma, replay.sigmas[i])
+
+    def test_smoother_matches_loop(self):
+        for n in [1, 2, 3, 37, 64]:
+            replay = EKFReplay(make_ekf())
+            replay.run(*make_frames(n, seed=n))
+            replay.smooth()
+            mus, sigmas = loop_smooth(
+                replay.mus,
+                replay.sigmas,
+                replay.mu_bars,
+                replay.sigma_bars,
+                replay.jac_Gs,
+            )
+            np.testing.assert_allclose(mus, replay.smoothed_mus, atol=1e-9)
+            np.testing.assert_allclose(sigmas, replay.smoothed_sigmas, atol=1e-9)
+            # the last frame has no later measurements to smooth with
+            np.testing.assert_allclose(replay.mus[-1, :2], replay.smoothed_mus[-1, :2])
+
+    def test_smoothing_reduces_uncertainty(self):
+        replay = EKFReplay(make_ekf())
+        replay.run(*make_frames(50))
+        replay.smooth()
+        filtered = np.trace(replay.sigmas, axis1=1, axis2=2)
+        smoothed = np.trace(replay.smoothed_sigmas, axis1=1, axis2=2)
+        self.assertTrue((smoothed <= filtered + 1e-12).all())
+
+    def test_log_measurements(self):
+        gps_readings, imu_readings = load_log(GPS_FILE), load_log(IMU_FILE)
+        measurements, origin = log_measurements(gps_readings, imu_readings)
+        self.assertEqual(max(len(gps_readings), len(imu_readings)), len(measurements))
+        self.assertEqual((gps_readings[0]["lat"], gps_readings[0]["lon"]), origin)
+        np.testing.assert_allclose([0, 0], measurements[0, :2])
+        x, y = get_projection(origin).gps_to_meters(
+            gps_readings[5]["lat"], gps_readings[5]["lon"]
+        )
+        np.testing.assert_allclose([x, y], measurements[5, :2])
+        mag = imu_readings[5]["mag"]
+        self.assertAlmostEqual(math.atan2(mag["y"], mag["x"]), measurements[5, 2])
+        self.assertTrue(np.isnan(measurements[len(imu_readings) :, 2]).all())
+
+    def test_write(self):
+        replay = EKFReplay(make_ekf())
+        replay.run(*make_frames(20))
+        replay.smooth()
+        stats = replay.statistics()
+        self.assertEqual(20, stats["frames"])
+        self.assertEqual(4, stats["gps_frames"])
+        self.assertEqual(18, stats["heading_frames"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "replay.csv")
+            replay.write(path)
+            frames = np.loadtxt(path, delimiter=",")
+            with open(path) as file:
+                comments = [line for line in file if line.startswith("#")]
+        self.assertEqual((20, 12), frames.shape)
+        np.testing.assert_allclose(replay.smoothed_mus, frames[:, 6:9])
+        self.assertIn("# mean_gps_nis: " + str(stats["mean_gps_nis"]) + "\n", comments)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+from engine.ekf import LocalizationEKF
+
+"""
+Unit tests for ekf.py
+"""
+
+
+def make_ekf():
+    return LocalizationEKF(np.array([[0.0], [0.0], [0.1]]), 2 * np.eye(3), 0.5)
+
+
+def reference_step(ekf, mu, sigma, controls, measurement):
+    """
+    Returns mu, sigma after one textbook EKF step from [mu], [sigma] with the
+    [controls] (d, phi), with the inverse of the innovation covariance.
+    """
+    jac_G = ekf.get_g_jac(mu, controls)
+    mu_bar = ekf.get_predicted_state(mu, controls)
+    sigma_bar = jac_G @ sigma @ jac_G.T + ekf.Q
+    jac_H = ekf.get_h_jac(mu_bar)
+    gain = sigma_bar @ jac_H.T @ np.linalg.inv(jac_H @ sigma_bar @ jac_H.T + ekf.R)
+    mu = mu_bar + gain @ (measurement - ekf.get_expected_measurement(mu_bar))
+    sigma = (np.eye(3) - gain @ jac_H) @ sigma_bar
+    return mu, sigma
+
+
+class TestLocalizationEKF(unittest.TestCase):
+    def test_matches_reference(self):
+        ekf = make_ekf()
+        mu, sigma = ekf.mu.copy(), ekf.sigma.copy()
+        rng = np.random.default_rng(0)
+        for left, turn in rng.uniform(0, 1, (50, 2)):
+            # turning arcs: the right arc is longer than the left one
+            arc_lengths = [float(left), float(left + 0.1 + turn)]
+            controls = ekf.get_controls(arc_lengths)
+            measurement = rng.normal(0, 1, (3, 1))
+            mu, sigma = reference_step(ekf, mu, sigma, controls, measurement)
+            mu_bar, sigma_bar = ekf.predict_step(arc_lengths)
+            ekf.update_step(mu_bar, sigma_bar, measurement)
+            self.assertTrue(np.isfinite(mu).all())
+            self.assertTrue(np.isfinite(ekf.mu).all())
+            np.testing.assert_allclose(mu, ekf.mu, atol=1e-9)
+            np.testing.assert_allclose(sigma, ekf.sigma, atol=1e-9)
+
+    def test_matches_reference_straight(self):
+        ekf = make_ekf()
+        mu, sigma = ekf.mu.copy(), ekf.sigma.copy()
+        rng = np.random.default_rng(3)
+        for d in rng.uniform(0.1, 1, 20):
+            measurement = rng.normal(0, 1, (3, 1))
+            mu, sigma = reference_step(ekf, mu, sigma, [d, 0], measurement)
+            # the phi == 0 branch of the prediction
+            ekf.predict_odometry(d, 0)
+            ekf.update_step(ekf.mu, ekf.sigma, measurement)
+            self.assertTrue(np.isfinite(mu).all())
+            self.assertTrue(np.isfinite(ekf.mu).all())
+            np.testing.assert_allclose(mu, ekf.mu, atol=1e-9)
+            np.testing.assert_allclose(sigma, ekf.sigma, atol=1e-9)
+
+    def test_reuses_buffers(self):
+        ekf = make_ekf()
+        mu, sigma = ekf.mu, ekf.sigma
+        mu_bar, sigma_bar = ekf.predict_step((0.2, 0.3))
+        ekf.update_step(mu_bar, sigma_bar, np.zeros((3, 1)))
+        for _ in range(3):
+            next_mu_bar, next_sigma_bar = ekf.predict_step((0.2, 0.3))
+            self.assertIs(mu_bar, next_mu_bar)
+            self.assertIs(sigma_bar, next_sigma_bar)
+            ekf.update_step(mu_bar, sigma_bar, np.zeros((3, 1)))
+        self.assertIs(mu, ekf.mu)
+        self.assertIs(sigma, ekf.sigma)
+
+    def test_covariance_stays_symmetric(self):
+        ekf = make_ekf()
+        ekf.R = np.diag([1e-6, 1e-6, 1e-6])
+        rng = np.random.default_rng(1)
+        for arc_lengths in rng.uniform(0, 1, (500, 2)):
+            mu_bar, sigma_bar = ekf.predict_step(arc_lengths)
+            ekf.update_step(mu_bar, sigma_bar, rng.normal(0, 1, (3, 1)))
+        np.testing.assert_allclose(ekf.sigma, ekf.sigma.T, rtol=1e-12, atol=0)
+        self.assertTrue((np.linalg.eigvalsh(ekf.sigma) > 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
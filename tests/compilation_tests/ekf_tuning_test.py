@@ -0,0 +1,104 @@
+import math
+import unittest
+import numpy as np
+from engine.ekf_tuning import (
+    PARAMETERS,
+    evaluate,
+    grid_configurations,
+    make_log,
+    random_configurations,
+    sweep,
+)
+
+"""
+Unit tests for ekf_tuning.py
+"""
+
+BOUNDS = {
+    "q_xy": (1e-3, 1),
+    "q_heading": (1e-4, 0.1),
+    "r_gps": (0.1, 10),
+    "r_heading": (0.01, 1),
+}
+
+
+def make_truth_log(n=200, seed=0):
+    """
+    Returns a log of a robot driving a known track, with GPS readings of
+    standard deviation 1 m every 5 frames and headings of standard deviation
+    0.1 rad every frame, and the true track as its reference.
+    """
+    rng = np.random.default_rng(seed)
+    controls = np.column_stack([np.full(n, 0.2), rng.normal(0, 0.02, n)])
+    track = np.zeros((n, 3))
+    x, y, theta = 0.0, 0.0, 0.0
+    for i, (d, phi) in enumerate(controls):
+        x, y = x + d * math.cos(theta), y + d * math.sin(theta)
+        theta += phi
+        track[i] = x, y, theta
+    measurements = track + rng.normal(0, [1, 1, 0.1], (n, 3))
+    measurements[np.arange(n) % 5 != 0, :2] = np.nan
+    # the odometry the filter sees is noisy too
+    controls = controls + rng.normal(0, [0.02, 0.005], (n, 2))
+    return make_log(measurements, controls, reference=track[:, :2])
+
+
+class TestEKFTuning(unittest.TestCase):
+    def test_configurations(self):
+        grid = grid_configurations([1, 2], [3], [4, 5, 6], [7])
+        self.assertEqual(6, len(grid))
+        self.assertEqual(
+            {"q_xy": 2, "q_heading": 3, "r_gps": 6, "r_heading": 7}, grid[-1]
+        )
+
+        samples = random_configurations(50, BOUNDS, seed=0)
+        self.assertEqual(50, len(samples))
+        for name in PARAMETERS:
+            values = [sample[name] for sample in samples]
+            self.assertTrue(
+                BOUNDS[name][0] <= min(values) <= max(values) <= BOUNDS[name][1]
+            )
+        self.assertEqual(samples, random_configurations(50, BOUNDS, seed=0))
+
+    def test_nis_ranks_true_noise_first(self):
+        log = make_truth_log()
+        configurations = grid_configurations([1e-3], [1e-4], [0.01, 1, 100], [0.01])
+        results = sweep(configurations, log, max_workers=1)
+        # the GPS readings have a variance of 1
+        self.assertEqual(1, results[0]["r_gps"])
+        scores = [result["score"] for result in results]
+        self.assertEqual(sorted(scores), scores)
+
+    def test_rmse(self):
+        log = make_truth_log()
+        configurations = grid_configurations([1e-3, 1], [1e-4], [1], [0.01])
+        filtered = sweep(configurations, log, rank_by="rmse", max_workers=1)
+        smoothed = sweep(configurations, log, rank_by="smoothed_rmse", max_workers=1)
+        # the robot follows its odometry closely, so trusting it is better
+        self.assertEqual(1e-3, filtered[0]["q_xy"])
+        self.assertEqual(1e-3, smoothed[0]["q_xy"])
+        smoothed_scores = {result["q_xy"]: result["score"] for result in smoothed}
+        for result in filtered:
+            self.assertLess(smoothed_scores[result["q_xy"]], result["score"])
+        with self.assertRaises(ValueError):
+            sweep(configurations, make_log(log["measurements"]), rank_by="rmse")
+        with self.assertRaises(ValueError):
+            sweep(configurations, log, rank_by="variance")
+
+    def test_pool_matches_serial(self):
+        log = make_truth_log(60)
+        configurations = random_configurations(12, BOUNDS, seed=1)
+        serial = sweep(configurations, log, rank_by="rmse", max_workers=1)
+        pooled = sweep(configurations, log, rank_by="rmse", max_workers=2)
+        self.assertEqual(
+            [(result["score"], result["q_xy"]) for result in serial],
+            [(result["score"], result["q_xy"]) for result in pooled],
+        )
+        configuration = {name: serial[0][name] for name in PARAMETERS}
+        self.assertEqual(
+            serial[0]["score"], evaluate(configuration, log, "rmse")["score"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
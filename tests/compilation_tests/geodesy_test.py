@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from engine.base_station import BaseStation
+from engine.geodesy import LocalProjection, get_projection
+from engine.grid import Grid
+from engine.kinematics import get_vincenty_x, get_vincenty_y
+
+"""
+Unit tests for geodesy.py
+"""
+
+ORIGIN = (42.444250, -76.483682)
+
+
+class TestGeodesy(unittest.TestCase):
+    def test_matches_vincenty(self):
+        projection = LocalProjection(ORIGIN)
+        rng = np.random.default_rng(0)
+        # a field of about 5 km x 5 km north east of the origin
+        lats = ORIGIN[0] + rng.uniform(0, 0.045, 200)
+        longs = ORIGIN[1] + rng.uniform(0, 0.061, 200)
+        for lat, long in zip(lats.tolist(), longs.tolist()):
+            x, y = projection.gps_to_meters(lat, long)
+            self.assertAlmostEqual(get_vincenty_x(ORIGIN, (lat, long)), x, delta=1e-3)
+            self.assertAlmostEqual(get_vincenty_y(ORIGIN, (lat, long)), y, delta=1e-3)
+
+    def test_signed(self):
+        projection = LocalProjection(ORIGIN)
+        x, y = projection.gps_to_meters(ORIGIN[0] - 0.001, ORIGIN[1] - 0.001)
+        self.assertLess(x, 0)
+        self.assertLess(y, 0)
+        self.assertAlmostEqual(
+            get_vincenty_x(ORIGIN, (ORIGIN[0] - 0.001, ORIGIN[1] - 0.001)),
+            -x,
+            delta=1e-3,
+        )
+        self.assertEqual((0.0, 0.0), projection.gps_to_meters(*ORIGIN))
+
+    def test_batch_matches_points(self):
+        projection = LocalProjection(ORIGIN)
+        rng = np.random.default_rng(1)
+        lats = ORIGIN[0] + rng.uniform(-0.01, 0.01, (4, 5))
+        longs = ORIGIN[1] + rng.uniform(-0.01, 0.01, (4, 5))
+        xs, ys = projection.gps_to_meters(lats, longs)
+        self.assertEqual((4, 5), xs.shape)
+        for index in np.ndindex(4, 5):
+            x, y = projection.gps_to_meters(float(lats[index]), float(longs[index]))
+            self.assertAlmostEqual(x, xs[index], places=6)
+            self.assertAlmostEqual(y, ys[index], places=6)
+        xs, ys = projection.gps_to_meters(list(lats[0]), list(longs[0]))
+        np.testing.assert_allclose(xs, projection.gps_to_meters(lats, longs)[0][0])
+
+    def test_round_trip(self):
+        projection = LocalProjection(ORIGIN)
+        rng = np.random.default_rng(2)
+        xs, ys = rng.uniform(-5000, 5000, (2, 1000))
+        lats, longs = projection.meters_to_gps(xs, ys)
+        np.testing.assert_allclose(
+            xs, projection.gps_to_meters(lats, longs)[0], atol=1e-6
+        )
+        np.testing.assert_allclose(
+            ys, projection.gps_to_meters(lats, longs)[1], atol=1e-6
+        )
+        for x, y, lat, long in zip(xs[:20], ys[:20], lats, longs):
+            self.assertEqual((lat, long), projection.meters_to_gps(float(x), float(y)))
+        self.assertEqual(ORIGIN, projection.meters_to_gps(0.0, 0.0))
+
+    def test_round_trip_grid(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        lats, longs = get_projection((g.lat_min, g.long_min)).meters_to_gps(
+            g.node_xs, g.node_ys
+        )
+        np.testing.assert_allclose(g.node_lats, lats, rtol=0, atol=1e-11)
+        np.testing.assert_allclose(g.node_longs, longs, rtol=0, atol=1e-11)
+
+    def test_grid_frame(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        xs, ys = get_projection((g.lat_min, g.long_min)).gps_to_meters(
+            g.node_lats, g.node_longs
+        )
+        np.testing.assert_allclose(g.node_xs, xs, atol=1e-6)
+        np.testing.assert_allclose(g.node_ys, ys, atol=1e-6)
+
+        base = BaseStation((g.node_lats[3, 4], g.node_longs[3, 4]), g)
+        self.assertAlmostEqual(g.node_xs[3, 4], base.position[0], places=6)
+        self.assertAlmostEqual(g.node_ys[3, 4], base.position[1], places=6)
+
+    def test_projection_cache(self):
+        self.assertIs(get_projection(ORIGIN), get_projection(ORIGIN))
+        self.assertIsNot(get_projection(ORIGIN), get_projection((42.0, -76.0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
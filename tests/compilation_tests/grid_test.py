@@ -4,6 +4,7 @@ import numpy as np
 from engine.grid import Grid
 from engine.kinematics import get_vincenty_x, get_vincenty_y
 from engine.control_mode import ControlMode
+from csv_files.csv_util import read_gps_polygon_from_csv
 
 """
 Visualization and unit tests for grid.py
@@ -122,6 +123,94 @@ class TestGrid(unittest.TestCase):
             "The meters grid shouldn't be larger than the long bounds",
         )
 
+    def test_node_coords_match_vincenty(self):
+        lat_min, lat_max, long_min, long_max = (
+            42.444250,
+            42.444599,
+            -76.483682,
+            -76.483276,
+        )
+        g = Grid(lat_min, lat_max, long_min, long_max)
+        origin = (lat_min, long_min)
+        for row in range(0, g.get_num_rows(), 7):
+            for col in range(0, g.get_num_cols(), 5):
+                node = g.nodes[row][col]
+                coord = node.get_gps_coords()
+                self.assertAlmostEqual(node.x, get_vincenty_x(origin, coord), 3)
+                self.assertAlmostEqual(node.y, get_vincenty_y(origin, coord), 3)
+
+    def test_spiral_order(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        rows, cols = g.get_num_rows(), g.get_num_cols()
+
+        # reference walk: turn whenever the next node is off the grid or visited
+        expected = []
+        visited = np.zeros((rows, cols), dtype=bool)
+        row, col, turn_state = 0, 0, 0
+        step_col = (1, 0, -1, 0)
+        step_row = (0, 1, 0, -1)
+        for _ in range(rows * cols):
+            visited[row, col] = True
+            expected.append(g.nodes[row, col])
+            next_row = row + step_row[turn_state]
+            next_col = col + step_col[turn_state]
+            if not (
+                0 <= next_col < cols
+                and 0 <= next_row < rows
+                and not visited[next_row, next_col]
+            ):
+                turn_state = (turn_state + 1) % 4
+            row += step_row[turn_state]
+            col += step_col[turn_state]
+        expected.reverse()
+
+        waypoints = g.get_waypoints(ControlMode.SPIRAL)
+        self.assertEqual(expected, waypoints)
+        self.assertEqual(len(waypoints), len(set(g.get_spiral_indices().tolist())))
+
+    def test_step_size(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276, step_size=2)
+        self.assertEqual((g.get_num_rows(), g.get_num_cols()), (20, 17))
+        # meters_to_lat/meters_to_long are accurate to about 0.5%
+        self.assertAlmostEqual(g.node_ys[1, 0] - g.node_ys[0, 0], 2, delta=0.01)
+        self.assertAlmostEqual(g.node_xs[0, 1] - g.node_xs[0, 0], 2, delta=0.01)
+        with self.assertRaises(Exception):
+            Grid(42.444250, 42.444599, -76.483682, -76.483276, step_size=20)
+
+    def test_activate_gps_polygon(self):
+        vertices = read_gps_polygon_from_csv()
+        g = Grid.from_gps_polygon(vertices)
+        lats, longs = np.array(vertices).T
+
+        # reference even-odd ray casting in GPS coordinates on a sample of nodes
+        for row in range(0, g.get_num_rows(), 23):
+            for col in range(0, g.get_num_cols(), 19):
+                lat, long = g.nodes[row, col].get_gps_coords()
+                inside = False
+                for i in range(len(vertices)):
+                    lat0, long0 = lats[i], longs[i]
+                    lat1, long1 = lats[i - 1], longs[i - 1]
+                    if min(lat0, lat1) <= lat < max(lat0, lat1):
+                        crossing = long0 + (lat - lat0) / (lat1 - lat0) * (
+                            long1 - long0
+                        )
+                        if crossing <= long:
+                            inside = not inside
+                self.assertEqual(inside, g.nodes[row, col].is_active)
+
+        num_active = int(g.get_active_mask().sum())
+        self.assertGreater(num_active, 0)
+        # the waypoint lists are only filled by a traversal, once per waypoint
+        self.assertEqual([], g.get_active_waypoints_list())
+        self.assertEqual([], g.get_inactive_waypoints_list())
+        g.get_all_lawnmower_waypoints()
+        self.assertEqual(len(g.get_active_waypoints_list()), num_active)
+        self.assertEqual(
+            len(g.get_inactive_waypoints_list()),
+            g.get_num_rows() * g.get_num_cols() - num_active,
+        )
+        self.assertTrue(all(nd.is_active for nd in g.get_active_waypoints_list()))
+
     def test_inside(self):
         lat_min, lat_max, long_min, long_max = (
             42.444250,
@@ -169,6 +258,53 @@ class TestGrid(unittest.TestCase):
 
         self.assertEqual(len(g.border_nodes), count)
 
+    def test_find_border_nodes_matches_is_on_border(self):
+        for direction in (Grid.Direction.RIGHT, Grid.Direction.UP):
+            g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+            g.direction = direction
+            g.activate_circle(20, 17, 15)
+            g.deactivate_mask(g.get_active_mask() & (np.arange(34) < 12))
+
+            expected = [
+                (g.nodes[row, col], row, col)
+                for row in range(g.get_num_rows())
+                for col in range(g.get_num_cols())
+                if g.nodes[row, col].is_active
+                and g.is_on_border((row, col), g.get_num_rows(), g.get_num_cols())
+            ]
+            g.find_border_nodes()
+
+            self.assertEqual(expected, g.border_nodes)
+            key = (
+                (lambda info: info[1])
+                if direction == Grid.Direction.UP
+                else (lambda info: info[2])
+            )
+            leftmost = min(expected, key=key)
+            self.assertEqual(leftmost[0], g.leftmost_node)
+            self.assertEqual(leftmost[1:], g.leftmost_node_pos)
+            self.assertTrue(all(info[0].is_border for info in g.border_nodes))
+
+    def test_active_extents(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        g.activate_triangle([0, 0], [16, 16], [32, 0])
+        g.find_border_nodes()
+        row_min_col, row_max_col, col_min_row, col_max_row = g.get_active_extents()
+        for row in range(g.get_num_rows()):
+            cols = [info[2] for info in g.border_nodes if info[1] == row]
+            self.assertEqual(min(cols, default=-1), row_min_col[row])
+            self.assertEqual(max(cols, default=-1), row_max_col[row])
+        for col in range(g.get_num_cols()):
+            rows = [info[1] for info in g.border_nodes if info[2] == col]
+            self.assertEqual(min(rows, default=-1), col_min_row[col])
+            self.assertEqual(max(rows, default=-1), col_max_row[col])
+
+        # the index is rebuilt when activation changes
+        g.activate_node((38, 33))
+        row_min_col, row_max_col, col_min_row, col_max_row = g.get_active_extents()
+        self.assertEqual((row_min_col[38], row_max_col[38]), (33, 33))
+        self.assertEqual(col_max_row[33], 38)
+
     def test_ActivateRectangle(self):
         lat_min, lat_max, long_min, long_max = (
             42.444250,
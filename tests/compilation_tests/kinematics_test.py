@@ -1,4 +1,14 @@
+import math
 import unittest
+import numpy as np
+from engine.geodesy import LocalProjection
+from engine.kinematics import (
+    global_to_robot,
+    global_to_robot_points,
+    meters_to_gps,
+    robot_to_global,
+    robot_to_global_points,
+)
 
 """
 Unit tests for kinematics.py
@@ -9,7 +19,51 @@ TODO: Write test cases
 
 class TestKinematics(unittest.TestCase):
     def test_robot_global_conversions(self):
-        pass
+        pose = np.array([[1.0], [2.0], [math.pi / 2]])
+        np.testing.assert_allclose([[1.0], [3.0]], robot_to_global(pose, 1, 0))
+        np.testing.assert_allclose([[1.0], [0.0]], global_to_robot(pose, 1, 3))
+        np.testing.assert_allclose([[0.0], [1.0]], global_to_robot(pose, 0, 2))
+
+    def test_robot_global_points(self):
+        rng = np.random.default_rng(0)
+        poses = np.column_stack(
+            (rng.uniform(-5, 5, (50, 2)), rng.uniform(-math.pi, math.pi, 50))
+        )
+        points = rng.uniform(-5, 5, (50, 2))
+        # one pose per point, against the homogeneous transform
+        global_points = robot_to_global_points(poses, points)
+        for pose, point, global_point in zip(poses, points, global_points):
+            cos, sin = math.cos(pose[2]), math.sin(pose[2])
+            transform = np.array([[cos, -sin, pose[0]], [sin, cos, pose[1]], [0, 0, 1]])
+            np.testing.assert_allclose(transform @ [*point, 1], [*global_point, 1])
+            np.testing.assert_allclose(
+                robot_to_global(pose.reshape(3, 1), *point).ravel(),
+                global_point,
+                atol=1e-5,
+            )
+            np.testing.assert_allclose(
+                global_to_robot(pose.reshape(3, 1), *global_point).ravel(),
+                point,
+                atol=1e-5,
+            )
+        np.testing.assert_allclose(
+            points, global_to_robot_points(poses, global_points), atol=1e-12
+        )
+
+        # one [3x1] pose for all the points
+        pose = poses[0].reshape(3, 1)
+        np.testing.assert_allclose(
+            robot_to_global_points(poses[0], points),
+            robot_to_global_points(pose, points),
+        )
+        self.assertEqual((50, 2), robot_to_global_points(pose, points).shape)
+
+        # every point with every pose
+        every = global_to_robot_points(poses[:7, np.newaxis, :], points)
+        self.assertEqual((7, 50, 2), every.shape)
+        np.testing.assert_allclose(
+            global_to_robot_points(poses[3], points), every[3], atol=1e-12
+        )
 
     # There should be a bunch of tests in each of the functions below
     def test_feedback_lin(self):
@@ -22,7 +76,12 @@ class TestKinematics(unittest.TestCase):
         pass
 
     def test_meters_to_gps(self):
-        pass
+        origin = (42.444250, -76.483682)
+        lat, long = meters_to_gps(origin[0], origin[1], 300, -200)
+        x, y = LocalProjection(origin).gps_to_meters(lat, long)
+        # spherical approximation, to within 1%
+        self.assertAlmostEqual(-200, x, delta=2)
+        self.assertAlmostEqual(300, y, delta=3)
 
     def test_meters_to_lat(self):
         pass
@@ -1,4 +1,5 @@
-from engine.node import Node
+from engine.node import Node, NodeStore
+import numpy as np
 import unittest
 
 """
@@ -103,5 +104,45 @@ class TestNodes(unittest.TestCase):
         self.assertEqual("(20,30)", repr(self.reg_node))
 
 
+class TestNodeStore(unittest.TestCase):
+    def setUp(self):
+        lat = np.array([[20.0, 20.0], [21.0, 21.0]])
+        long = np.array([[30.0, 31.0], [30.0, 31.0]])
+        self.store = NodeStore.from_arrays(lat, long, np.zeros((2, 2)), np.ones((2, 2)))
+
+    def test_view_reads_store(self):
+        node = self.store.node(3)
+        self.assertEqual((21, 31), node.get_gps_coords())
+        self.assertEqual((0, 1), node.get_m_coords())
+        self.assertFalse(node.is_active_node())
+        self.assertEqual("(21,31)", repr(node))
+
+    def test_view_writes_store(self):
+        node = self.store.node(2)
+        node.activate_node()
+        node.set_border_node()
+        node.set_status(2)
+        self.assertTrue(self.store.get_flag(NodeStore.ACTIVE)[1, 0])
+        self.assertTrue(self.store.get_flag(NodeStore.BORDER)[1, 0])
+        self.assertEqual(2, self.store.get_status()[1, 0])
+        self.assertEqual(1, self.store.get_flag(NodeStore.ACTIVE).sum())
+        self.assertEqual(node, self.store.nodes([2])[0])
+
+    def test_flags_and_status(self):
+        mask = np.array([[True, False], [False, True]])
+        self.store.set_flag(NodeStore.ACTIVE, mask)
+        self.store.set_status(1, mask)
+        self.assertEqual(mask.tolist(), self.store.get_flag(NodeStore.ACTIVE).tolist())
+        self.assertEqual([[1, 0], [0, 1]], self.store.get_status().tolist())
+        self.assertTrue(self.store.node(0).is_active)
+        self.assertEqual(1, self.store.node(3).get_status())
+
+        version = self.store.version
+        self.store.clear_flag(NodeStore.ACTIVE)
+        self.assertFalse(self.store.get_flag(NodeStore.ACTIVE).any())
+        self.assertEqual([[1, 0], [0, 1]], self.store.get_status().tolist())
+        self.assertGreater(self.store.version, version)
+
+
 if __name__ == "__main__":
     unittest.main()
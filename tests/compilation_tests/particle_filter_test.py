@@ -0,0 +1,156 @@
+import math
+import unittest
+from unittest import mock
+import numpy as np
+from engine.ekf import LocalizationEKF, MeasurementModel
+from engine.kinematics import integrate_odom
+from engine.particle_filter import ParticleFilter
+from engine.robot_logic.traversal import update_state
+from engine.robot_state import Robot_State
+from engine.sensor_fusion import GPS, HEADING, ODOMETRY, SensorFusion
+
+"""
+Unit tests for particle_filter.py
+"""
+
+
+def make_filter(num_particles=2000, sigma=0.01, seed=0):
+    pf = ParticleFilter(
+        [1.0, 2.0, 0.5], sigma * np.eye(3), 0.5, num_particles, seed=seed
+    )
+    pf.Q = np.diag([1e-4, 1e-4, 1e-5])
+    return pf
+
+
+class FakeGPS:
+    def get_gps(self):
+        return {"long": -76.48360, "lat": 42.44430}
+
+
+class FakeIMU:
+    def get_gps(self):
+        return {"mag": {"x": 1.0, "y": 1.0}}
+
+
+class TestParticleFilter(unittest.TestCase):
+    def test_motion_model(self):
+        pf = make_filter(50)
+        pf.Q = np.diag([1e-300, 1e-300, 1e-300])
+        for d, phi in [(0.3, 0.0), (0.2, 0.4), (0.5, -2.0)]:
+            expected = [
+                integrate_odom(particle, d, phi)[:, 0] for particle in pf.particles
+            ]
+            pf.predict_odometry(d, phi)
+            expected = np.array(expected)
+            np.testing.assert_allclose(expected[:, :2], pf.particles[:, :2], atol=1e-12)
+            heading_error = pf.particles[:, 2] - expected[:, 2]
+            np.testing.assert_allclose(0, np.sin(heading_error), atol=1e-12)
+
+    def test_matches_ekf_for_gaussian_noise(self):
+        ekf = LocalizationEKF([[1.0], [2.0], [0.5]], 0.01 * np.eye(3), 0.5)
+        ekf.Q = np.diag([1e-4, 1e-4, 1e-5])
+        pf = make_filter(20000)
+        # without the floor, the likelihood of the filters is the same
+        pf.outlier_likelihood = 0
+        gps = MeasurementModel.position(0.01 * np.eye(2))
+        heading = MeasurementModel.heading([[0.001]])
+        fixes = np.random.default_rng(1).normal([[1.5], [2.3]], 0.1, (4, 2, 1))
+        for localizer in [ekf, pf]:
+            for step in range(20):
+                localizer.predict_odometry(0.05, 0.01)
+                if step % 5 == 0:
+                    localizer.update_model(gps, fixes[step // 5])
+                localizer.update_model(heading, 0.5 + 0.01 * step)
+        np.testing.assert_allclose(ekf.mu, pf.mu, atol=0.02)
+        np.testing.assert_allclose(ekf.sigma, pf.sigma, atol=0.005)
+
+    def test_gps_jump(self):
+        ekf = LocalizationEKF([[0.0], [0.0], [0.0]], np.eye(3), 0.5)
+        ekf.Q = np.diag([1e-3, 1e-3, 1e-4])
+        pf = ParticleFilter([0.0, 0.0, 0.0], np.eye(3), 0.5, seed=2)
+        pf.Q = ekf.Q
+        gps = MeasurementModel.position(np.eye(2))
+        for localizer in [ekf, pf]:
+            for _ in range(20):
+                localizer.predict_odometry(0.0, 0.0)
+                localizer.update_model(gps, np.zeros((2, 1)))
+            # a reading 20 m away, near a building
+            localizer.predict_odometry(0.0, 0.0)
+            localizer.update_model(gps, np.array([[20.0], [0.0]]))
+        self.assertGreater(ekf.mu[0, 0], 1.0)
+        self.assertLess(abs(pf.mu[0, 0]), 0.2)
+
+    def test_low_variance_resampling(self):
+        pf = make_filter(1000)
+        rng = np.random.default_rng(3)
+        pf.weights[:] = rng.random(1000) ** 8
+        pf.weights /= pf.weights.sum()
+        pf.particles[:, 0] = np.arange(1000)
+        expected = pf.weights * 1000
+        pf.resample()
+        counts = np.bincount(pf.particles[:, 0].astype(int), minlength=1000)
+        self.assertTrue((counts >= np.floor(expected) - 1e-9).all())
+        self.assertTrue((counts <= np.ceil(expected) + 1e-9).all())
+        np.testing.assert_allclose(1 / 1000, pf.weights)
+
+    def test_heading_mean_wraps(self):
+        pf = ParticleFilter([0.0, 0.0, math.pi - 0.01], 0.01 * np.eye(3), 0.5, seed=4)
+        self.assertTrue((pf.particles[:, 2] < 0).any())
+        self.assertGreater(abs(pf.mu[2, 0]), 3.0)
+        self.assertLess(pf.sigma[2, 2], 0.02)
+
+    def test_ekf_interface(self):
+        pf = make_filter()
+        mu_bar, sigma_bar = pf.predict_step((0.1, 0.12))
+        pf.update_step(mu_bar, sigma_bar, np.array([[1.1], [2.05], [0.55]]))
+        self.assertEqual((3, 1), pf.mu.shape)
+        self.assertEqual((3, 3), pf.sigma.shape)
+        np.testing.assert_allclose(pf.sigma, pf.sigma.T)
+        self.assertAlmostEqual(1.0, pf.weights.sum())
+
+    def test_factors_are_cached(self):
+        pf = make_filter(100)
+        gps = MeasurementModel.position(0.01 * np.eye(2))
+        choleskys = []
+        cholesky = np.linalg.cholesky
+
+        def counted(matrix):
+            choleskys.append(matrix.shape)
+            return cholesky(matrix)
+
+        with mock.patch("numpy.linalg.cholesky", counted):
+            for _ in range(5):
+                pf.predict_odometry(0.05, 0.01)
+                pf.update_model(gps, np.array([[1.0], [2.0]]))
+            self.assertEqual([(3, 3), (2, 2)], choleskys)
+            # changed in place, and replaced
+            pf.Q[0, 1] = pf.Q[1, 0] = 1e-5
+            gps.R[0, 0] = 0.02
+            pf.predict_odometry(0.05, 0.01)
+            pf.update_model(gps, np.array([[1.0], [2.0]]))
+            pf.Q = np.diag([1e-4, 1e-4, 1e-5])
+            pf.predict_odometry(0.05, 0.01)
+            self.assertEqual([(3, 3), (2, 2)] * 2 + [(3, 3)], choleskys)
+        np.testing.assert_allclose(
+            np.linalg.inv(cholesky(gps.R)).T, pf._get_whitening(gps.R)
+        )
+
+    def test_update_state(self):
+        robot_state = Robot_State(
+            gps=FakeGPS(), imu=FakeIMU(), init_gps=(-76.483682, 42.444250)
+        )
+        robot_state.using_particle_filter = True
+        robot_state.particle_filter = make_filter(500)
+        robot_state.sensor_fusion = SensorFusion(
+            robot_state.particle_filter, max_delay=0
+        )
+        for _ in range(3):
+            state = update_state(robot_state, 0.5, 0.0)
+        self.assertEqual(
+            {ODOMETRY: 3, GPS: 1, HEADING: 3}, robot_state.sensor_fusion.num_fused
+        )
+        np.testing.assert_allclose(robot_state.particle_filter.mu, state)
+
+
+if __name__ == "__main__":
+    unittest.main()
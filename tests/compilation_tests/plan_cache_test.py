@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.plan_cache import load_or_plan, load_plan, plan_key
+from engine.shape_mask import circle_mask
+
+"""
+Unit tests for plan_cache.py
+"""
+
+BOUNDS = (42.444250, 42.444599, -76.483682, -76.483276)
+
+
+class TestPlanCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_round_trip(self):
+        for mode in (ControlMode.LAWNMOWER, ControlMode.SPIRAL):
+            grid, waypoints = load_or_plan(*BOUNDS, mode, cache_dir=self.cache_dir)
+            key = plan_key(*BOUNDS, mode)
+            self.assertTrue(os.path.isdir(os.path.join(self.cache_dir, key)))
+
+            cached_grid, cached_waypoints = load_or_plan(
+                *BOUNDS, mode, cache_dir=self.cache_dir
+            )
+            self.assertIsInstance(cached_grid.store.x, np.memmap)
+            self.assertEqual(waypoints, cached_waypoints)
+            self.assertEqual(cached_grid.get_shape(), grid.get_shape())
+            self.assertTrue((grid.store.state == cached_grid.store.state).all())
+            self.assertTrue((grid.node_xs == cached_grid.node_xs).all())
+            self.assertEqual(
+                grid.get_active_waypoints_list(),
+                cached_grid.get_active_waypoints_list(),
+            )
+            self.assertEqual(
+                grid.get_inactive_waypoints_list(),
+                cached_grid.get_inactive_waypoints_list(),
+            )
+
+    def test_changes_stay_in_memory(self):
+        grid, _ = load_or_plan(*BOUNDS, ControlMode.LAWNMOWER, cache_dir=self.cache_dir)
+        cached_grid, _ = load_or_plan(
+            *BOUNDS, ControlMode.LAWNMOWER, cache_dir=self.cache_dir
+        )
+        cached_grid.nodes[3, 3].set_status(2)
+        reloaded = load_plan(
+            self.cache_dir, plan_key(*BOUNDS, ControlMode.LAWNMOWER), *BOUNDS
+        )
+        self.assertEqual(reloaded[0].nodes[3, 3].get_status(), 0)
+
+    def test_key(self):
+        shape = Grid(*BOUNDS).get_shape()
+        mask = circle_mask(shape, (10, 10), 5)
+        keys = {
+            plan_key(*BOUNDS, ControlMode.LAWNMOWER),
+            plan_key(*BOUNDS, ControlMode.SPIRAL),
+            plan_key(*BOUNDS, ControlMode.LAWNMOWER, mask),
+            plan_key(*BOUNDS, ControlMode.LAWNMOWER, circle_mask(shape, (10, 10), 6)),
+            plan_key(BOUNDS[0], BOUNDS[1] + 1e-5, *BOUNDS[2:], ControlMode.LAWNMOWER),
+        }
+        self.assertEqual(len(keys), 5)
+        self.assertEqual(
+            plan_key(*BOUNDS, ControlMode.LAWNMOWER),
+            plan_key(*BOUNDS, ControlMode.LAWNMOWER, np.zeros(shape, dtype=bool)),
+        )
+        # plans made by another version of the planning modules are not loaded
+        with mock.patch("engine.plan_cache.planner_digest", return_value=b"old"):
+            old_key = plan_key(*BOUNDS, ControlMode.LAWNMOWER)
+        self.assertNotEqual(old_key, plan_key(*BOUNDS, ControlMode.LAWNMOWER))
+
+    def test_active_mask(self):
+        shape = Grid(*BOUNDS).get_shape()
+        mask = circle_mask(shape, (15, 15), 8)
+        grid, waypoints = load_or_plan(
+            *BOUNDS, ControlMode.SPIRAL, mask, cache_dir=self.cache_dir
+        )
+        cached_grid, cached_waypoints = load_or_plan(
+            *BOUNDS, ControlMode.SPIRAL, mask, cache_dir=self.cache_dir
+        )
+        self.assertTrue((cached_grid.get_active_mask() == mask).all())
+        self.assertEqual(len(cached_grid.get_active_waypoints_list()), int(mask.sum()))
+        self.assertEqual(waypoints, cached_waypoints)
+
+    def test_mission_state(self):
+        mission = Mission_State(None, BOUNDS[::2], ControlMode.LAWNMOWER)
+        self.assertNotIsInstance(mission.grid.store.x, np.memmap)
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+        for _ in range(2):
+            mission = Mission_State(
+                None, BOUNDS[::2], ControlMode.LAWNMOWER, plan_cache_dir=self.cache_dir
+            )
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+        self.assertIsInstance(mission.grid.store.x, np.memmap)
+
+
+if __name__ == "__main__":
+    unittest.main()
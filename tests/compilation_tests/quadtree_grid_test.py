@@ -0,0 +1,154 @@
+import unittest
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.quadtree_grid import QuadTreeGrid, hilbert_index
+from csv_files.csv_util import read_gps_polygon_from_csv
+
+"""
+Unit tests for quadtree_grid.py
+"""
+
+
+class TestQuadTreeGrid(unittest.TestCase):
+    def setUp(self):
+        self.vertices = read_gps_polygon_from_csv()
+
+    def coverage(self, q, shape):
+        """
+        Returns the number of cells of [q] covering every fine node.
+        """
+        covered = np.zeros(shape, dtype=int)
+        for row, col, size in zip(q.cell_rows, q.cell_cols, q.cell_sizes):
+            covered[row : row + size, col : col + size] += 1
+        return covered
+
+    def test_covers_fine_grid_field(self):
+        for step_size in (1, 2):
+            q = QuadTreeGrid(self.vertices, step_size=step_size)
+            g = Grid.from_gps_polygon(self.vertices, step_size=step_size)
+            shape = (g.get_num_rows() + 16, g.get_num_cols() + 16)
+            active = np.zeros(shape, dtype=int)
+            active[: g.get_num_rows(), : g.get_num_cols()] = g.get_active_mask()
+
+            self.assertTrue((self.coverage(q, shape) == active).all())
+            # coarse cells cover most of the field with far fewer nodes
+            self.assertLess(q.get_num_nodes(), active.sum() / 4)
+            self.assertEqual(q.cell_sizes.max(), q.max_cell_size)
+
+    def test_node_centers(self):
+        q = QuadTreeGrid(self.vertices, max_cell_size=8)
+        index = int(np.argmax(q.cell_sizes))
+        node = q.nodes[index]
+        row, col = q.gps_to_index(node.lat, node.long)
+        self.assertAlmostEqual(row, q.cell_rows[index] + 3.5)
+        self.assertAlmostEqual(col, q.cell_cols[index] + 3.5)
+
+    def test_obstacles(self):
+        # the center of a coarse cell, which is split down around the obstacle
+        q = QuadTreeGrid(self.vertices)
+        obstacle = q.nodes[int(np.argmax(q.cell_sizes))].get_gps_coords()
+        q = QuadTreeGrid(self.vertices, obstacles=[obstacle])
+        is_obstacle = q.store.get_status() == 2
+        self.assertEqual(is_obstacle.sum(), 1)
+        self.assertEqual(q.cell_sizes[is_obstacle][0], 1)
+        row, col = q.gps_to_index(*obstacle)
+        index = int(np.nonzero(is_obstacle)[0][0])
+        self.assertEqual(
+            (q.cell_rows[index], q.cell_cols[index]), (round(row), round(col))
+        )
+
+        waypoints = q.get_waypoints()
+        sizes = np.delete(q.cell_sizes, index)
+        self.assertEqual(len(waypoints), np.where(sizes == 1, 1, 2 * sizes).sum())
+        self.assertEqual(q.get_inactive_waypoints_list(), [q.nodes[index]])
+        positions = [q.gps_to_index(*node.get_gps_coords()) for node in waypoints]
+        self.assertNotIn((row, col), np.round(positions).tolist())
+
+        # a coarse cell is given up whole
+        coarse = int(np.argmax(q.cell_sizes))
+        position = (q.cell_rows[coarse] + 1, q.cell_cols[coarse] + 2)
+        self.assertEqual([coarse], q.mark_obstacles([position]).tolist())
+        self.assertEqual(
+            len(waypoints) - 2 * q.cell_sizes[coarse], len(q.get_waypoints())
+        )
+
+    def test_sweeps_cover_cells(self):
+        q = QuadTreeGrid(self.vertices, max_cell_size=8)
+        waypoints = q.get_waypoints()
+        rows, cols = np.round(
+            [q.gps_to_index(*node.get_gps_coords()) for node in waypoints]
+        ).T.astype(int)
+        # the sweeps of every cell are its fine rows, back and forth
+        covered = np.zeros((q.num_rows + 8, q.num_cols + 8), dtype=int)
+        start = 0
+        for row, col, size in zip(q.cell_rows, q.cell_cols, q.cell_sizes):
+            if size == 1:
+                self.assertEqual((row, col), (rows[start], cols[start]))
+                covered[row, col] += 1
+                start += 1
+                continue
+            for line in range(size):
+                ends = cols[start : start + 2].tolist()
+                self.assertEqual([row + line] * 2, rows[start : start + 2].tolist())
+                self.assertEqual(sorted(ends), [col, col + size - 1])
+                self.assertEqual(line % 2 == 1, ends[0] > ends[1])
+                covered[row + line, min(ends) : max(ends) + 1] += 1
+                start += 2
+        self.assertEqual(start, len(waypoints))
+        self.assertTrue((covered == self.coverage(q, covered.shape)).all())
+        self.assertTrue(all(node.is_active for node in waypoints))
+        self.assertLess(len(waypoints), covered.sum() / 2)
+
+    def test_mission_state(self):
+        mission = Mission_State(
+            None,
+            self.vertices[0],
+            ControlMode.LAWNMOWER,
+            multi_resolution_field=self.vertices,
+            step_size=2,
+        )
+        self.assertIsInstance(mission.grid, QuadTreeGrid)
+        self.assertEqual(2, mission.grid.step_size)
+        self.assertEqual(
+            mission.grid.get_active_waypoints_list(), list(mission.waypoints_to_visit)
+        )
+        self.assertGreater(len(mission.waypoints_to_visit), 0)
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(0, mission.add_obstacles([(0, 0)]))
+
+    def test_hilbert_order(self):
+        n = 16
+        x, y = np.meshgrid(np.arange(n), np.arange(n))
+        order = np.argsort(hilbert_index(n, x.ravel(), y.ravel()))
+        self.assertEqual(
+            sorted(hilbert_index(n, x.ravel(), y.ravel()).tolist()), list(range(n * n))
+        )
+        steps = np.abs(np.diff(x.ravel()[order])) + np.abs(np.diff(y.ravel()[order]))
+        self.assertTrue((steps == 1).all())
+        self.assertEqual((x.ravel()[order[-1]], y.ravel()[order[-1]]), (n - 1, 0))
+
+    def test_traversal_order(self):
+        # within every top level cell that is entirely inside the field, each
+        # cell shares an edge with the next one
+        q = QuadTreeGrid(self.vertices, max_cell_size=8)
+        rows, cols, sizes = q.cell_rows, q.cell_cols, q.cell_sizes
+        tiles = (rows // 8) * q.num_cols + cols // 8
+        area = np.bincount(tiles, weights=sizes**2)
+        num_full = 0
+        for tile in np.nonzero(area == 64)[0]:
+            cells = np.nonzero(tiles == tile)[0]
+            if len(cells) == 1:
+                continue
+            num_full += 1
+            self.assertTrue((np.diff(cells) == 1).all())
+            r, c, s = rows[cells], cols[cells], sizes[cells]
+            row_gap = np.maximum(r[1:] - r[:-1] - s[:-1], r[:-1] - r[1:] - s[1:])
+            col_gap = np.maximum(c[1:] - c[:-1] - s[:-1], c[:-1] - c[1:] - s[1:])
+            self.assertTrue(((row_gap == 0) != (col_gap == 0)).all())
+        self.assertGreater(num_full, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
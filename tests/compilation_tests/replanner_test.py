@@ -0,0 +1,174 @@
+import unittest
+from collections import deque
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.node import NodeStore
+from engine.replanner import Replanner
+
+"""
+Unit tests for replanner.py
+"""
+
+
+def make_grid():
+    g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+    g.activate_mask(np.ones(g.get_shape(), dtype=bool))
+    return g
+
+
+def positions(waypoints, num_cols):
+    return [divmod(node.index, num_cols) for node in waypoints]
+
+
+def crosses(first, second, is_obstacle):
+    """
+    Whether the straight move between two (row, col) positions crosses an obstacle.
+    """
+    steps = max(abs(second[0] - first[0]), abs(second[1] - first[1]))
+    for k in range(steps + 1):
+        row = round(first[0] + k * (second[0] - first[0]) / steps)
+        col = round(first[1] + k * (second[1] - first[1]) / steps)
+        if is_obstacle[row, col]:
+            return True
+    return False
+
+
+class TestReplanner(unittest.TestCase):
+    def assert_avoids(self, grid, waypoints):
+        is_obstacle = grid.store.get_status() == NodeStore.OBSTACLE
+        path = positions(waypoints, grid.num_cols)
+        for first, second in zip(path, path[1:]):
+            self.assertFalse(crosses(first, second, is_obstacle), (first, second))
+
+    def test_lawnmower_block(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER))
+        length = len(waypoints)
+        replanner = Replanner(g, waypoints)
+        block = [(row, col) for row in range(10, 14) for col in range(5, 9)]
+        self.assertEqual(4, replanner.add_obstacles(block))
+        self.assert_avoids(g, waypoints)
+        remaining = set(positions(waypoints, g.num_cols))
+        self.assertTrue(remaining.isdisjoint(block))
+        # every other node is still visited
+        self.assertEqual(length - len(block), len(remaining))
+        self.assertEqual(4, replanner.num_repairs)
+
+    def test_border_lawnmower_sweep(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER_B))
+        length = len(waypoints)
+        replanner = Replanner(g, waypoints)
+        # in the middle of the sweep of col 6
+        self.assertEqual(1, replanner.add_obstacles([(15, 6)]))
+        self.assert_avoids(g, waypoints)
+        self.assertGreater(len(waypoints), length)
+        # the detour is a chain of neighboring nodes between the ends of the sweep
+        path = positions(waypoints, g.num_cols)
+        start, stop = sorted([path.index((0, 6)), path.index((g.num_rows - 1, 6))])
+        for first, second in zip(path[start:stop], path[start + 1 : stop + 1]):
+            self.assertEqual(
+                1, max(abs(first[0] - second[0]), abs(first[1] - second[1]))
+            )
+
+    def test_after_visits(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER))
+        replanner = Replanner(g, waypoints)
+        visited = [waypoints.popleft() for _ in range(30)]
+        # a wall with a gap at the top
+        replanner.add_obstacles([(row, 3) for row in range(g.num_rows - 1)])
+        self.assert_avoids(g, waypoints)
+        remaining = positions(waypoints, g.num_cols)
+        self.assertEqual([(g.num_rows - 1, 3)], [p for p in remaining if p[1] == 3])
+        # the visited waypoints stay visited
+        self.assertTrue(set(remaining).isdisjoint(positions(visited, g.num_cols)))
+
+    def test_front_obstacle(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER))
+        replanner = Replanner(g, waypoints)
+        waypoints.popleft()
+        replanner.add_obstacles([(1, 0), (2, 0)])
+        self.assertEqual((3, 0), divmod(waypoints[0].index, g.num_cols))
+
+    def test_repeated_obstacles(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER_B))
+        replanner = Replanner(g, waypoints)
+        replanner.add_obstacles([(15, 6)])
+        for _ in range(5):
+            waypoints.popleft()
+        # over the detour of the first repair, and over the same node again
+        replanner.add_obstacles([(row, col) for row in (14, 15, 16) for col in (5, 7)])
+        replanner.add_obstacles([(15, 6), (20, 9)])
+        self.assert_avoids(g, waypoints)
+        for _ in range(len(waypoints) // 2):
+            waypoints.popleft()
+        replanner.add_obstacles([(row, 30) for row in range(5, 25)])
+        self.assert_avoids(g, waypoints)
+
+    def test_matches_full_replan(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER))
+        replanner = Replanner(g, waypoints)
+        for _ in range(100):
+            waypoints.popleft()
+        obstacles = [(row, col) for row in range(20, 25) for col in range(20, 22)]
+        replanner.add_obstacles(obstacles)
+        # the rest of a full replan is followed in order, with detours in between
+        full = iter(
+            node.index
+            for node in g.get_waypoints(ControlMode.LAWNMOWER)[100:]
+            if divmod(node.index, g.num_cols) not in obstacles
+        )
+        expected = next(full)
+        for node in waypoints:
+            if node.index == expected:
+                expected = next(full, None)
+        self.assertIsNone(expected)
+        self.assert_avoids(g, waypoints)
+
+    def test_random_repairs(self):
+        g = make_grid()
+        waypoints = deque(g.get_waypoints(ControlMode.LAWNMOWER_B))
+        replanner = Replanner(g, waypoints)
+        rng = np.random.default_rng(3)
+        for _ in range(15):
+            for _ in range(rng.integers(0, 4)):
+                if waypoints:
+                    waypoints.popleft()
+            rows = rng.integers(1, g.num_rows - 1, 3)
+            cols = rng.integers(0, g.num_cols, 3)
+            replanner.add_obstacles(list(zip(rows, cols)))
+            self.assert_avoids(g, waypoints)
+            # the replanner still knows where every numbered waypoint is
+            num_visited = replanner._num_visited()
+            for number in range(len(replanner._plan)):
+                if replanner._is_present(number, num_visited):
+                    position = replanner._position(number, num_visited)
+                    self.assertEqual(replanner._plan[number], waypoints[position].index)
+
+    def test_not_grid_nodes(self):
+        g = make_grid()
+        other = make_grid()
+        with self.assertRaises(ValueError):
+            Replanner(g, deque(other.get_waypoints(ControlMode.LAWNMOWER)))
+
+    def test_mission_state(self):
+        g = make_grid()
+        mission = Mission_State(
+            None, (42.444250, -76.483682), ControlMode.LAWNMOWER_B, grid=g
+        )
+        self.assertEqual(1, mission.add_obstacles([(15, 6)]))
+        self.assert_avoids(g, mission.waypoints_to_visit)
+        # a new plan gets a new replanner
+        mission.waypoints_to_visit = deque(g.get_waypoints(ControlMode.LAWNMOWER_B))
+        self.assertEqual(1, mission.add_obstacles([(15, 8)]))
+        self.assertIs(mission.waypoints_to_visit, mission.replanner.waypoints)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -80,6 +80,28 @@ class TestTraverseStandardFunctions(unittest.TestCase):
             )
         self.assertEqual(deque([]), waypoints_to_visit)
 
+    def test_stream(self):
+        r2d2_state = Robot_State(
+            xpos=0,
+            ypos=0,
+            heading=math.pi / 2,
+            epsilon=0.2,
+            max_velocity=0.5,
+            radius=0.2,
+            phase=2,
+        )
+        r2d2 = Robot(robot_state=r2d2_state)
+        database = DataBase(r2d2)
+
+        allowed_dist_error = 0.5
+        grid = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        waypoints_to_visit = grid.get_waypoint_stream(ControlMode.LAWNMOWER_B)
+        while waypoints_to_visit:
+            r2d2_state, waypoints_to_visit = traverse_standard(
+                r2d2_state, waypoints_to_visit, allowed_dist_error, database
+            )
+        self.assertEqual(0, len(waypoints_to_visit))
+
     def test_different_init_robot_pos(self):
         r2d2_state = Robot_State(
             xpos=42,
@@ -0,0 +1,159 @@
+import math
+import unittest
+import numpy as np
+from engine.ekf import LocalizationEKF, MeasurementModel
+from engine.geodesy import get_projection
+from engine.robot_logic.traversal import update_state
+from engine.robot_state import Robot_State
+from engine.sensor_fusion import GPS, HEADING, ODOMETRY, SensorFusion
+
+"""
+Unit tests for sensor_fusion.py
+"""
+
+
+def make_ekf():
+    return LocalizationEKF(np.array([[0.0], [0.0], [0.1]]), 2 * np.eye(3), 0.5)
+
+
+def make_events(num_steps, seed=0):
+    """
+    Returns (timestamp, stream, data) events of odometry and headings at 100 Hz
+    and GPS fixes at 5 Hz, in timestamp order.
+    """
+    rng = np.random.default_rng(seed)
+    events = []
+    for step in range(num_steps):
+        t = step * 0.01
+        events.append((t, ODOMETRY, (rng.uniform(0, 0.02), rng.uniform(-0.01, 0.01))))
+        events.append((t + 0.001, HEADING, rng.uniform(-math.pi, math.pi)))
+        if step % 20 == 0:
+            events.append((t + 0.002, GPS, rng.normal(0, 1, (2, 1))))
+    return events
+
+
+def add_event(fusion, event):
+    timestamp, stream, data = event
+    if stream == ODOMETRY:
+        return fusion.add_odometry(timestamp, *data)
+    return fusion.add_measurement(stream, timestamp, data)
+
+
+class FakeGPS:
+    def __init__(self, fixes):
+        self.fixes = fixes
+
+    def get_gps(self):
+        return self.fixes.pop(0)
+
+
+class FakeIMU:
+    def get_gps(self):
+        return {"mag": {"x": 1.0, "y": 1.0}}
+
+
+class TestSensorFusion(unittest.TestCase):
+    def test_out_of_order_within_delay(self):
+        events = make_events(100)
+        in_order = SensorFusion(make_ekf())
+        for event in events:
+            add_event(in_order, event)
+        in_order.flush()
+
+        # every event arrives up to 30 ms late, which is within max_delay
+        rng = np.random.default_rng(1)
+        arrivals = sorted(
+            zip([e[0] + rng.uniform(0, 0.03) for e in events], range(len(events)))
+        )
+        shuffled = SensorFusion(make_ekf(), max_delay=0.05)
+        for now, index in arrivals:
+            self.assertTrue(add_event(shuffled, events[index]))
+            shuffled.process(now)
+        shuffled.flush()
+
+        self.assertEqual(0, shuffled.num_dropped)
+        self.assertEqual(in_order.num_fused, shuffled.num_fused)
+        np.testing.assert_allclose(in_order.ekf.mu, shuffled.ekf.mu, atol=1e-12)
+        np.testing.assert_allclose(in_order.ekf.sigma, shuffled.ekf.sigma, atol=1e-12)
+
+    def test_late_event_dropped(self):
+        fusion = SensorFusion(make_ekf())
+        fusion.add_odometry(1.0, 0.1, 0.0)
+        fusion.add_measurement(HEADING, 1.02, 0.2)
+        self.assertEqual(1, fusion.process(1.06))
+        self.assertEqual(1.0, fusion.time)
+        self.assertFalse(fusion.add_measurement(GPS, 0.9, np.zeros((2, 1))))
+        self.assertEqual(1, fusion.num_dropped)
+        self.assertEqual(1, len(fusion))
+        self.assertEqual(1, fusion.flush())
+        self.assertEqual({ODOMETRY: 1, GPS: 0, HEADING: 1}, fusion.num_fused)
+        with self.assertRaises(ValueError):
+            fusion.add_measurement("lidar", 2.0, 0.0)
+
+    def test_capacity(self):
+        fusion = SensorFusion(make_ekf(), capacity=8)
+        for event in make_events(20):
+            add_event(fusion, event)
+            self.assertLessEqual(len(fusion), 8)
+        self.assertEqual(8, len(fusion))
+        self.assertEqual(sum(fusion.num_fused.values()) + 8, len(make_events(20)))
+
+    def test_heading_wraps(self):
+        ekf = LocalizationEKF(np.array([[0.0], [0.0], [3.1]]), np.eye(3), 0.5)
+        model = MeasurementModel.heading([[1.0]])
+        # -3.1 is 0.083 radians counterclockwise of 3.1, not 6.2 clockwise
+        ekf.update_model(model, -3.1)
+        self.assertAlmostEqual(3.1 + (2 * math.pi - 6.2) / 2, ekf.mu[2, 0])
+
+    def test_partial_updates_match_full_update(self):
+        # with a diagonal R, updating x, y then the heading is the full update
+        full = make_ekf()
+        partial = make_ekf()
+        rng = np.random.default_rng(2)
+        gps = MeasurementModel.position(full.R[:2, :2])
+        heading = MeasurementModel.heading(full.R[2:, 2:])
+        for _ in range(20):
+            measurement = rng.normal(0, 0.5, (3, 1))
+            d, phi = rng.uniform(0, 0.1, 2)
+            full._predict(d, phi)
+            full.update_step(full._mu_bar, full._sigma_bar, measurement)
+            partial.predict_odometry(d, phi)
+            partial.update_model(gps, measurement[:2])
+            partial.update_model(heading, measurement.item(2))
+            np.testing.assert_allclose(full.mu, partial.mu, atol=1e-12)
+            np.testing.assert_allclose(full.sigma, partial.sigma, atol=1e-12)
+
+    def test_update_state(self):
+        init_gps = (-76.483682, 42.444250)
+        fix = {"long": -76.48360, "lat": 42.44430}
+        robot_state = Robot_State(
+            gps=FakeGPS([fix, fix, dict(fix)]),
+            imu=FakeIMU(),
+            init_gps=init_gps,
+            time_step=0.1,
+        )
+        robot_state.using_ekf = True
+        robot_state.ekf = make_ekf()
+        robot_state.sensor_fusion = SensorFusion(robot_state.ekf, max_delay=0)
+        for _ in range(3):
+            state = update_state(robot_state, 0.5, 0.0)
+        # the same fix was read three times, and is a measurement only once
+        self.assertEqual(
+            {ODOMETRY: 3, GPS: 1, HEADING: 3}, robot_state.sensor_fusion.num_fused
+        )
+        self.assertEqual((fix["long"], fix["lat"]), robot_state.gps_data)
+        np.testing.assert_allclose(robot_state.ekf.mu, state)
+        self.assertIsNot(robot_state.ekf.mu, state)
+
+        robot_state.using_ekf = False
+        robot_state.gps = FakeGPS([fix])
+        x, y = get_projection((init_gps[1], init_gps[0])).gps_to_meters(
+            fix["lat"], fix["long"]
+        )
+        np.testing.assert_allclose(
+            [[x], [y], [math.pi / 4]], update_state(robot_state, 0.5, 0.0)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
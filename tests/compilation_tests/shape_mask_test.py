@@ -0,0 +1,115 @@
+import unittest
+import numpy as np
+from engine.grid import Grid
+from engine.shape_mask import (
+    rectangle_mask,
+    circle_mask,
+    triangle_mask,
+    polygon_mask,
+    nodes_in_polygon,
+)
+
+"""
+Unit tests for shape_mask.py
+"""
+
+
+def ray_cast_inside(vertices, point):
+    """
+    Reference even-odd point-in-polygon test for a single point, using the same
+    half-open edge rule as polygon_mask.
+    """
+    inside = False
+    n = len(vertices)
+    for i in range(n):
+        (r0, c0), (r1, c1) = vertices[i], vertices[(i + 1) % n]
+        if min(r0, r1) <= point[0] < max(r0, r1):
+            crossing = c0 + (point[0] - r0) / (r1 - r0) * (c1 - c0)
+            if crossing <= point[1]:
+                inside = not inside
+    return inside
+
+
+class TestShapeMask(unittest.TestCase):
+    shape = (40, 35)
+
+    def test_triangle_matches_is_inside_triangle(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        p1, p2, p3 = (2, 3), (30, 7.5), (11, 29)
+        mask = triangle_mask(g.get_shape(), p1, p2, p3)
+        for row in range(g.get_num_rows()):
+            for col in range(g.get_num_cols()):
+                self.assertEqual(
+                    g.is_inside_triangle(p1, p2, p3, (row, col)), mask[row, col]
+                )
+
+    def test_concave_polygon(self):
+        # a "U" shape with a notch cut from the top
+        vertices = [
+            (2, 2),
+            (2, 30),
+            (35, 30),
+            (35, 22),
+            (10, 22),
+            (10, 10),
+            (35, 10),
+            (35, 2),
+        ]
+        mask = polygon_mask(self.shape, vertices)
+        for row in range(self.shape[0]):
+            for col in range(self.shape[1]):
+                self.assertEqual(ray_cast_inside(vertices, (row, col)), mask[row, col])
+        self.assertTrue(mask[5, 15])
+        self.assertFalse(mask[20, 15])
+
+    def test_random_polygon(self):
+        rng = np.random.default_rng(0)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 60))
+        radii = rng.uniform(5, 18, 60)
+        vertices = list(zip(20 + radii * np.sin(angles), 17 + radii * np.cos(angles)))
+        mask = polygon_mask(self.shape, vertices)
+        for row in range(self.shape[0]):
+            for col in range(self.shape[1]):
+                self.assertEqual(ray_cast_inside(vertices, (row, col)), mask[row, col])
+
+    def test_nodes_in_polygon(self):
+        rng = np.random.default_rng(1)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 60))
+        radii = rng.uniform(5, 18, 60)
+        vertices = list(zip(20 + radii * np.sin(angles), 17 + radii * np.cos(angles)))
+        # scattered nodes, some of them outside of the polygon's bounding box
+        rows, cols = rng.integers(-5, 45, (2, 300))
+        inside = nodes_in_polygon(vertices, rows, cols)
+        for row, col, is_inside in zip(rows, cols, inside):
+            self.assertEqual(ray_cast_inside(vertices, (row, col)), is_inside)
+        self.assertEqual(0, len(nodes_in_polygon(vertices, [], [])))
+
+    def test_polygon_outside_grid(self):
+        mask = polygon_mask(self.shape, [(-10, -10), (-10, 50), (50, 50), (50, -10)])
+        self.assertTrue(mask.all())
+        mask = polygon_mask(self.shape, [(100, 100), (100, 120), (120, 120)])
+        self.assertFalse(mask.any())
+
+    def test_union_and_difference(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        shape = g.get_shape()
+        field = rectangle_mask(shape, 0, 0, 20, 20) & ~circle_mask(shape, (10, 10), 5)
+        g.activate_mask(field | circle_mask(shape, (30, 25), 4))
+        self.assertFalse(g.nodes[10, 10].is_active)
+        self.assertTrue(g.nodes[0, 0].is_active)
+        self.assertTrue(g.nodes[30, 25].is_active)
+
+        g.deactivate_mask(rectangle_mask(shape, 0, 0, 1, 1))
+        self.assertFalse(g.nodes[0, 0].is_active)
+        self.assertEqual(
+            int((field | circle_mask(shape, (30, 25), 4)).sum()) - 1,
+            int(g.get_active_mask().sum()),
+        )
+
+        g.set_active_mask(circle_mask(shape, (10, 10), 5))
+        self.assertTrue(g.nodes[10, 10].is_active)
+        self.assertFalse(g.nodes[30, 25].is_active)
+
+
+if __name__ == "__main__":
+    unittest.main()
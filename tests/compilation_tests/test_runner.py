@@ -12,6 +12,23 @@ import tests.compilation_tests.grid_test as grid_test
 import tests.compilation_tests.node_test as node_test
 import tests.compilation_tests.database_test as database_test
 import tests.compilation_tests.transmission_test as transmission_test
+import tests.compilation_tests.shape_mask_test as shape_mask_test
+import tests.compilation_tests.plan_cache_test as plan_cache_test
+import tests.compilation_tests.quadtree_grid_test as quadtree_grid_test
+import tests.compilation_tests.tiled_grid_test as tiled_grid_test
+import tests.compilation_tests.boustrophedon_test as boustrophedon_test
+import tests.compilation_tests.tour_optimizer_test as tour_optimizer_test
+import tests.compilation_tests.waypoint_stream_test as waypoint_stream_test
+import tests.compilation_tests.replanner_test as replanner_test
+import tests.compilation_tests.dstar_lite_test as dstar_lite_test
+import tests.compilation_tests.distance_field_test as distance_field_test
+import tests.compilation_tests.turn_planner_test as turn_planner_test
+import tests.compilation_tests.geodesy_test as geodesy_test
+import tests.compilation_tests.ekf_test as ekf_test
+import tests.compilation_tests.sensor_fusion_test as sensor_fusion_test
+import tests.compilation_tests.ekf_replay_test as ekf_replay_test
+import tests.compilation_tests.ekf_tuning_test as ekf_tuning_test
+import tests.compilation_tests.particle_filter_test as particle_filter_test
 
 """
 Runs all compilation test files as individual modules
@@ -39,7 +56,24 @@ compilation_tests = [
     grid_test,
     node_test,
     database_test,
-    transmission_test
+    transmission_test,
+    shape_mask_test,
+    plan_cache_test,
+    quadtree_grid_test,
+    tiled_grid_test,
+    boustrophedon_test,
+    tour_optimizer_test,
+    waypoint_stream_test,
+    replanner_test,
+    dstar_lite_test,
+    distance_field_test,
+    turn_planner_test,
+    geodesy_test,
+    ekf_test,
+    sensor_fusion_test,
+    ekf_replay_test,
+    ekf_tuning_test,
+    particle_filter_test,
 ]
 for test_case in compilation_tests:
     suite.addTests(loader.loadTestsFromModule(test_case))
@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.node import NodeStore
+from engine.tiled_grid import TiledGrid
+
+"""
+Unit tests for tiled_grid.py
+"""
+
+ENG_QUAD = (42.444250, 42.444599, -76.483682, -76.483276)
+
+
+class TestTiledGrid(unittest.TestCase):
+    def test_nodes_match_grid(self):
+        g = Grid(*ENG_QUAD)
+        t = TiledGrid(*ENG_QUAD, tile_size=8)
+        self.assertEqual(g.get_shape(), t.nodes.shape)
+        for row, col in [(0, 0), (7, 8), (17, 30), (-1, -1)]:
+            self.assertEqual(g.nodes[row, col], t.nodes[row, col])
+            self.assertEqual(g.nodes[row][col], t.nodes[row][col])
+        self.assertTrue(t.nodes[0, 5].is_border)
+        self.assertFalse(t.nodes[5, 5].is_border)
+        with self.assertRaises(IndexError):
+            t.get_node(g.get_num_rows(), 0)
+
+    def test_waypoints_match_grid(self):
+        for mode in [
+            ControlMode.LAWNMOWER,
+            ControlMode.LAWNMOWER_B,
+            ControlMode.STRAIGHT,
+        ]:
+            expected = Grid(*ENG_QUAD).get_waypoints(mode)
+            queue = TiledGrid(*ENG_QUAD, tile_size=8).get_waypoints(mode)
+            self.assertEqual(len(expected), len(queue))
+            self.assertEqual(expected[0], queue[0])
+            visited = []
+            while queue:
+                visited.append(queue.popleft())
+            self.assertEqual(expected, visited)
+
+    def test_tiles_are_evicted(self):
+        t = TiledGrid(*ENG_QUAD, tile_size=8)
+        queue = t.get_waypoints(ControlMode.LAWNMOWER)
+        max_tiles = 0
+        while queue:
+            queue.popleft()
+            max_tiles = max(max_tiles, len(t.tiles))
+        # one column of tiles plus the lookahead into the next one
+        self.assertLessEqual(max_tiles, 2 * (t.get_num_rows() // 8 + 1))
+        self.assertEqual({}, t.tiles)
+
+    def test_tiles_are_generated_once(self):
+        for mode, num_tiles in [
+            (ControlMode.LAWNMOWER, 10 * 9),
+            (ControlMode.LAWNMOWER_B, 2 * 9),
+            (ControlMode.STRAIGHT, 9),
+        ]:
+            # columns of nodes much longer than a tile
+            t = TiledGrid(*ENG_QUAD, tile_size=4)
+            queue = t.get_waypoints(mode)
+            with mock.patch.object(
+                NodeStore, "from_arrays", wraps=NodeStore.from_arrays
+            ) as from_arrays:
+                while queue:
+                    queue.popleft()
+            self.assertEqual(num_tiles, from_arrays.call_count)
+
+    def test_obstacles_outlive_tiles(self):
+        t = TiledGrid(*ENG_QUAD, tile_size=8)
+        t.nodes[3, 3]
+        np.testing.assert_array_equal(
+            [3 * t.num_cols + 3, 20 * t.num_cols + 30],
+            t.mark_obstacles([(3, 3), (20, 30)]),
+        )
+        self.assertEqual(NodeStore.OBSTACLE, t.nodes[3, 3].get_status())
+        t.evict_tile(0, 0)
+        self.assertEqual(NodeStore.OBSTACLE, t.nodes[3, 3].get_status())
+        self.assertEqual(NodeStore.OBSTACLE, t.nodes[20, 30].get_status())
+        self.assertEqual(0, t.nodes[20, 31].get_status())
+
+    def test_mission_state(self):
+        t = TiledGrid(*ENG_QUAD, tile_size=8)
+        with self.assertLogs(level="WARNING"):
+            mission = Mission_State(
+                None,
+                (ENG_QUAD[0], ENG_QUAD[2]),
+                ControlMode.LAWNMOWER,
+                grid=t,
+                tour_time_budget=0.1,
+            )
+        self.assertIsNone(mission.tour_lengths)
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(mission.get_distance_field())
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(0, mission.add_obstacles([(5, 5)]))
+        self.assertEqual(NodeStore.OBSTACLE, t.nodes[5, 5].get_status())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import itertools
+import time
+import unittest
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.node import Node
+from engine.shape_mask import rectangle_mask
+from engine.tour_optimizer import (
+    nearest_distances,
+    nearest_neighbor_order,
+    optimize_tour,
+    path_lower_bound,
+    or_opt,
+    tour_length,
+    two_opt,
+)
+
+"""
+Unit tests for tour_optimizer.py
+"""
+
+
+class TestTourOptimizer(unittest.TestCase):
+    def test_tour_length(self):
+        points = np.array([[0, 0], [3, 4], [3, 0]])
+        self.assertAlmostEqual(9.0, tour_length(points))
+        self.assertAlmostEqual(7.0, tour_length(points, [0, 2, 1]))
+
+    def test_nearest_neighbor_order(self):
+        points = np.array([[0, 0], [5, 0], [1, 0], [2, 0]])
+        self.assertEqual([0, 2, 3, 1], nearest_neighbor_order(points).tolist())
+
+    def test_nearest_neighbor_order_deadline(self):
+        points = np.random.default_rng(2).uniform(0, 100, (1000, 2))
+        self.assertIsNone(nearest_neighbor_order(points, deadline=time.monotonic()))
+
+    def test_nearest_distances(self):
+        rng = np.random.default_rng(3)
+        # a random walk, whose points step to nearby points
+        points = np.cumsum(rng.normal(0, 1, (300, 2)), axis=0)
+        delta = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+        dist = np.hypot(delta[..., 0], delta[..., 1])
+        np.fill_diagonal(dist, np.inf)
+        np.testing.assert_allclose(
+            dist.min(axis=1), nearest_distances(points, max_per_cell=300)
+        )
+        # scattered points fall in a few large cells
+        self.assertIsNone(nearest_distances(rng.uniform(0, 100, (300, 2))))
+
+    def test_time_budget(self):
+        points = np.random.default_rng(4).uniform(0, 1000, (20000, 2))
+        waypoints = [Node(0, 0, x, y) for x, y in points]
+        begin = time.monotonic()
+        tour, before, after = optimize_tour(waypoints, time_budget=0.2)
+        # the nearest neighbor order is not complete in time
+        self.assertLess(time.monotonic() - begin, 1.0)
+        self.assertEqual(waypoints, tour)
+        self.assertEqual(before, after)
+
+    def test_two_opt_uncrosses(self):
+        points = np.array([[0, 0], [1, 1], [1, 0], [2, 1]], dtype=float)
+        order = np.arange(4)
+        two_opt(points, order)
+        self.assertEqual([0, 2, 1, 3], order.tolist())
+
+    def test_or_opt_moves_a_point(self):
+        points = np.array([[0, 0], [5, 0], [1, 0], [2, 0], [3, 0], [4, 0]], dtype=float)
+        order = np.arange(6)
+        or_opt(points, order)
+        self.assertEqual([0, 2, 3, 4, 5, 1], order.tolist())
+
+    def test_small_paths_are_optimal(self):
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            points = rng.uniform(0, 10, (7, 2))
+            waypoints = [Node(0, 0, x, y) for x, y in points]
+            tour, _, after = optimize_tour(waypoints)
+            optimal = min(
+                tour_length(points, [0, *rest])
+                for rest in itertools.permutations(range(1, 7))
+            )
+            self.assertIs(waypoints[0], tour[0])
+            self.assertEqual(7, len(set(map(id, tour))))
+            # 2-opt and Or-opt are not exact, but find the optimum of these small
+            # random paths
+            self.assertAlmostEqual(optimal, after)
+
+    def test_optimize_disjoint_shapes(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        shape = g.get_shape()
+        g.activate_mask(
+            rectangle_mask(shape, 0, 0, 6, 6) | rectangle_mask(shape, 30, 25, 36, 31)
+        )
+        g.get_waypoints(ControlMode.LAWNMOWER)
+        waypoints = g.get_active_waypoints_list()
+        # the generated order, scattered
+        rng = np.random.default_rng(1)
+        scattered = [waypoints[0]] + [
+            waypoints[i] for i in 1 + rng.permutation(len(waypoints) - 1)
+        ]
+        tour, before, after = optimize_tour(scattered, time_budget=2.0)
+        self.assertIs(scattered[0], tour[0])
+        self.assertEqual(
+            sorted(n.index for n in scattered), sorted(n.index for n in tour)
+        )
+        self.assertAlmostEqual(after, tour_length([n.get_m_coords() for n in tour]))
+        # 72 nodes one meter apart, and one trip between the squares
+        self.assertLess(after, 71 * 1.5 + 45)
+        self.assertLess(after, before)
+
+    def test_optimal_path_is_kept(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        waypoints = g.get_waypoints(ControlMode.LAWNMOWER)
+        points = [n.get_m_coords() for n in waypoints]
+        # rows and cols are not exactly the same distance apart
+        self.assertAlmostEqual(
+            tour_length(points), path_lower_bound(points), delta=1e-3 * len(points)
+        )
+        tour, before, after = optimize_tour(waypoints)
+        self.assertEqual(waypoints, tour)
+        self.assertEqual(before, after)
+
+    def test_never_longer(self):
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        waypoints = g.get_waypoints(ControlMode.LAWNMOWER_B)
+        tour, before, after = optimize_tour(waypoints, time_budget=0.5)
+        self.assertLessEqual(after, before + 1e-6)
+        self.assertIs(waypoints[0], tour[0])
+
+    def test_mission_state(self):
+        corner = (42.444250, -76.483682)
+        mission = Mission_State(
+            None, corner, ControlMode.LAWNMOWER, tour_time_budget=0.5
+        )
+        # a traversal of every node is kept as generated
+        self.assertIsNone(mission.tour_lengths)
+        g = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+        shape = g.get_shape()
+        g.activate_mask(
+            rectangle_mask(shape, 0, 0, 6, 6) | rectangle_mask(shape, 30, 25, 36, 31)
+        )
+        mission = Mission_State(
+            None, corner, ControlMode.BOUSTROPHEDON, grid=g, tour_time_budget=0.5
+        )
+        before, after = mission.tour_lengths
+        self.assertLessEqual(after, before + 1e-6)
+        self.assertEqual(72, len(mission.waypoints_to_visit))
+
+
+if __name__ == "__main__":
+    unittest.main()
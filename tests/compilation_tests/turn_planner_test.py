@@ -0,0 +1,144 @@
+import math
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.mission_state import Mission_State
+from engine.robot_state import Robot_State
+from engine.turn_planner import WORDS, TurnPlanner, dubins_path, sample_path
+
+"""
+Unit tests for turn_planner.py
+"""
+
+
+def make_grid():
+    return Grid(42.444250, 42.444599, -76.483682, -76.483276)
+
+
+def guided_waypoints(radius):
+    """
+    Returns the guided lawnmower waypoints over a rectangle, turning with a
+    TurnPlanner of [radius] times the step size, or with plot_circle if None.
+    """
+    g = make_grid()
+    g.activate_rectangle(5, 5, 25, 20)
+    g.find_border_nodes()
+    if radius is not None:
+        g.turn_planner = TurnPlanner(radius * g.step_size)
+    waypoints = g.get_all_guided_lawnmower_waypoints_adjustable(True)
+    if radius is not None:
+        # one template per turn orientation
+        assert g.turn_planner.num_planned == 2
+    return waypoints
+
+
+class TestTurnPlanner(unittest.TestCase):
+    def test_reaches_end_pose(self):
+        rng = np.random.default_rng(0)
+        words = set()
+        for _ in range(300):
+            start = tuple(rng.uniform(-3, 3, 2)) + (rng.uniform(-math.pi, math.pi),)
+            end = tuple(rng.uniform(-3, 3, 2)) + (rng.uniform(-math.pi, math.pi),)
+            radius = rng.uniform(0.2, 2)
+            word, lengths = dubins_path(start, end, radius)
+            words.add(word)
+            self.assertTrue(all(length >= 0 for length in lengths))
+            points = sample_path(start, word, lengths, radius, sum(lengths) / 2000)
+            self.assertAlmostEqual(start[0], points[0, 0])
+            self.assertAlmostEqual(start[1], points[0, 1])
+            # the last sample is one spacing before the end
+            self.assertLess(math.dist(end[:2], points[-1]), sum(lengths) / 1000)
+        self.assertEqual(set(WORDS), words)
+
+    def test_semicircle(self):
+        # a row turn as wide as the turning circle is half of it
+        word, lengths = dubins_path((0, 0, 0), (0, 1, math.pi), 0.5)
+        self.assertAlmostEqual(math.pi / 2, sum(lengths))
+        self.assertEqual("L", word[0])
+
+        planner = TurnPlanner(0.5)
+        points = np.array(planner.get_turn((0, 0, 0), (0, 1, math.pi)))
+        np.testing.assert_allclose(
+            0.5, np.hypot(points[:, 0], points[:, 1] - 0.5), atol=1e-6
+        )
+        self.assertEqual(12, len(points))
+
+    def test_wide_radius(self):
+        # rows closer than the turning circle need a loop around
+        word, lengths = dubins_path((0, 0, 0), (0, 1, math.pi), 1.0)
+        self.assertIn(word, ("RLR", "LRL"))
+        self.assertGreater(sum(lengths), math.pi)
+
+    def test_radius_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            dubins_path((0, 0, 0), (1, 0, 0), 0)
+
+    def test_cache(self):
+        planner = TurnPlanner(0.5)
+        rng = np.random.default_rng(1)
+        headings = [0.3, 0.3 + math.pi]
+        for _ in range(20):
+            x, y = rng.uniform(-10, 10, 2)
+            heading = headings[rng.integers(0, 2)]
+            start = (x, y, heading)
+            end = (x - math.sin(heading), y + math.cos(heading), heading + math.pi)
+            points = planner.get_turn(start, end)
+            fresh = TurnPlanner(0.5).get_turn(start, end)
+            np.testing.assert_allclose(fresh, points, atol=1e-6)
+        # one template per orientation of the turn
+        self.assertEqual(2, planner.num_planned)
+        planner.get_turn((0, 0, 0.3), (0, 1, 0.3 + math.pi))
+        self.assertEqual(3, planner.num_planned)
+        planner.get_turn((0, 0, 0.3), (0, 1, 0.3 + math.pi), scale=2)
+        self.assertEqual(4, planner.num_planned)
+
+    def test_for_robot(self):
+        planner = TurnPlanner.for_robot(Robot_State(epsilon=0.3, radius=0.2))
+        self.assertEqual(0.3, planner.radius)
+        planner = TurnPlanner.for_robot(Robot_State(epsilon=0.1, radius=0.2))
+        self.assertEqual(0.2, planner.radius)
+
+    def test_grid_guided_waypoints(self):
+        circles = guided_waypoints(None)
+        turns = guided_waypoints(0.5)
+        # turns as wide as the turning circle are the same semicircles, which
+        # plot_circle sometimes closes with their end point
+        circle_points = np.array(circles, dtype=float)
+        for turn in turns:
+            distances = np.hypot(*(circle_points - turn).T)
+            self.assertLess(distances.min(), 1e-5)
+        self.assertGreaterEqual(len(circles), len(turns))
+        # a wider turning circle loops around between the rows
+        self.assertGreater(len(guided_waypoints(1.0)), len(circles))
+
+    def test_mission_state(self):
+        robot = SimpleNamespace(robot_state=Robot_State(epsilon=0.3, radius=0.2))
+        g = make_grid()
+        g.activate_rectangle(5, 5, 25, 20)
+        g.find_border_nodes()
+        mission = Mission_State(
+            robot,
+            (g.lat_min, g.long_min),
+            ControlMode.LAWNMOWER_GUIDED,
+            grid=g,
+            smooth_turns=True,
+        )
+        self.assertEqual(0.3, g.turn_planner.radius)
+        self.assertEqual(2, g.turn_planner.num_planned)
+        self.assertGreater(len(mission.all_waypoints), 0)
+        # the default grid gets a TurnPlanner too
+        mission = Mission_State(
+            robot, (g.lat_min, g.long_min), ControlMode.LAWNMOWER, smooth_turns=True
+        )
+        self.assertEqual(0.3, mission.grid.turn_planner.radius)
+        self.assertIsNone(
+            Mission_State(
+                None, (g.lat_min, g.long_min), ControlMode.LAWNMOWER
+            ).grid.turn_planner
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
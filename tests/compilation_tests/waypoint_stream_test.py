@@ -0,0 +1,77 @@
+import unittest
+from engine.control_mode import ControlMode
+from engine.grid import Grid
+from engine.shape_mask import circle_mask
+from engine.waypoint_stream import WaypointStream
+
+"""
+Unit tests for waypoint_stream.py and the generator forms of the Grid traversals
+"""
+
+ENG_QUAD = (42.444250, 42.444599, -76.483682, -76.483276)
+
+
+class TestWaypointStream(unittest.TestCase):
+    def test_deque_interface(self):
+        stream = WaypointStream(range(5), 5)
+        self.assertEqual(5, len(stream))
+        self.assertEqual(0, stream[0])
+        self.assertEqual(2, stream[2])
+        self.assertEqual(0, stream.popleft())
+        self.assertEqual([1, 2, 3, 4], list(stream))
+        self.assertEqual(4, len(stream))
+        while stream:
+            stream.popleft()
+        self.assertEqual(0, len(stream))
+        with self.assertRaises(IndexError):
+            stream.popleft()
+
+    def test_unknown_length(self):
+        pulled = []
+
+        def generate():
+            for i in range(3):
+                pulled.append(i)
+                yield i
+
+        stream = WaypointStream(generate())
+        self.assertTrue(stream)
+        self.assertEqual([0], pulled)
+        self.assertEqual(0, stream.popleft())
+        self.assertEqual(2, len(stream))
+        self.assertEqual([0, 1, 2], pulled)
+
+    def test_streams_match_lists(self):
+        for mode in [
+            ControlMode.LAWNMOWER,
+            ControlMode.LAWNMOWER_B,
+            ControlMode.SPIRAL,
+            ControlMode.STRAIGHT,
+            ControlMode.BOUSTROPHEDON,
+        ]:
+            g = Grid(*ENG_QUAD)
+            g.activate_mask(circle_mask(g.get_shape(), (15, 15), 10))
+            expected = g.get_waypoints(mode)
+            active = g.get_active_waypoints_list()
+
+            g = Grid(*ENG_QUAD)
+            g.activate_mask(circle_mask(g.get_shape(), (15, 15), 10))
+            stream = g.get_waypoint_stream(mode)
+            self.assertEqual(len(expected), len(stream))
+            visited = []
+            while stream:
+                visited.append(stream.popleft())
+            self.assertEqual(expected, visited)
+            self.assertCountEqual(active, g.get_active_waypoints_list())
+
+    def test_lawnmower_is_generated_lazily(self):
+        g = Grid(*ENG_QUAD)
+        stream = g.get_waypoint_stream(ControlMode.LAWNMOWER)
+        self.assertEqual([], g.get_inactive_waypoints_list())
+        self.assertEqual(g.nodes[0, 0], stream.popleft())
+        # only the first column was generated
+        self.assertEqual(g.get_num_rows(), len(g.get_inactive_waypoints_list()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+
+from engine.dstar_lite import DStarLite
+from engine.grid import Grid
+
+"""
+Benchmark for incremental re-routing with D* Lite (engine.dstar_lite).
+
+A robot crosses a 100x100 node grid scattered with walls it only sees once they
+are within SENSOR_RANGE nodes, and re-routes every time it sees new obstacle
+nodes. The same re-routes are timed with the D* Lite search kept up to date as
+the robot moves, and with a fresh search from the robot's node every time.
+
+To run the file: python -m tests.functionality_tests.dstar_lite_benchmark
+"""
+
+SENSOR_RANGE = 3
+NUM_WALLS = 40
+
+
+def make_walls(shape, rng):
+    """
+    Returns a boolean mask of [shape] with NUM_WALLS random horizontal and
+    vertical walls.
+    """
+    walls = np.zeros(shape, dtype=bool)
+    for _ in range(NUM_WALLS):
+        row, col = rng.integers(0, shape[0]), rng.integers(0, shape[1])
+        length = rng.integers(5, 30)
+        if rng.random() < 0.5:
+            walls[row, col : col + length] = True
+        else:
+            walls[row : row + length, col] = True
+    return walls
+
+
+def main():
+    grid = Grid(42.0, 42.0009, -76.5, -76.4988)
+    num_rows, num_cols = grid.get_shape()
+    start, goal = (0, 0), (num_rows - 1, num_cols - 1)
+    hidden = make_walls(grid.get_shape(), np.random.default_rng(1))
+    hidden[start] = hidden[goal] = False
+    known = np.zeros_like(hidden)
+
+    search = DStarLite(grid, start, goal)
+    incremental_time = fresh_time = 0.0
+    fresh_expanded = num_reroutes = 0
+    begin = time.perf_counter()
+    search.compute_shortest_path()
+    incremental_time += time.perf_counter() - begin
+
+    position = start
+    while position != goal:
+        row, col = position
+        window = (
+            slice(max(row - SENSOR_RANGE, 0), row + SENSOR_RANGE + 1),
+            slice(max(col - SENSOR_RANGE, 0), col + SENSOR_RANGE + 1),
+        )
+        rows, cols = np.nonzero(hidden[window] & ~known[window])
+        if len(rows):
+            rows, cols = rows + window[0].start, cols + window[1].start
+            known[rows, cols] = True
+            num_reroutes += 1
+            begin = time.perf_counter()
+            search.add_obstacles(list(zip(rows, cols)))
+            search.compute_shortest_path()
+            incremental_time += time.perf_counter() - begin
+
+            begin = time.perf_counter()
+            fresh = DStarLite(grid, position, goal)
+            fresh.compute_shortest_path()
+            fresh_time += time.perf_counter() - begin
+            fresh_expanded += fresh.num_expanded
+
+        # one step along the shortest path, as the robot would
+        index = min(
+            search._neighbors(search.start),
+            key=lambda item: item[1] + search.g[item[0]],
+        )[0]
+        position = divmod(index, num_cols)
+        begin = time.perf_counter()
+        search.move_start(position)
+        search.compute_shortest_path()
+        incremental_time += time.perf_counter() - begin
+
+    print("Grid of", num_rows, "x", num_cols, "nodes,", num_reroutes, "re-routes")
+    print(
+        "D* Lite:       ",
+        search.num_expanded,
+        "expansions,",
+        round(incremental_time * 1000, 1),
+        "ms",
+    )
+    print(
+        "Fresh searches:",
+        fresh_expanded,
+        "expansions,",
+        round(fresh_time * 1000, 1),
+        "ms",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import time
+import tracemalloc
+
+import numpy as np
+from numpy.linalg import inv
+
+from engine.ekf import LocalizationEKF
+
+"""
+Micro-benchmark of one EKF step (predict_step and update_step of
+engine.ekf.LocalizationEKF).
+
+The same steps are run with the filter, which works in preallocated buffers,
+solves for the Kalman gain and updates the covariance in the Joseph form, and
+with the previous implementation, which allocates its Jacobians, transposes,
+identity and inverse on every step (with its elementwise products fixed into
+matrix products, see allocating_step).
+
+Prints the time per step, and the memory allocated by a step as traced by
+tracemalloc, to which Numpy reports its array buffers: the bytes a step
+allocates above what it started with, at its peak. What is left for the
+buffered filter is the gain returned by np.linalg.solve, and the Python floats
+and index tuples of its scalar code.
+
+To run the file: python -m tests.functionality_tests.ekf_benchmark
+"""
+
+NUM_STEPS = 20000
+NUM_TRACED_STEPS = 1000
+
+
+def allocating_step(ekf, arc_lengths, measurement):
+    """
+    One step of the previous implementation of LocalizationEKF.
+    """
+    controls = ekf.get_controls(arc_lengths)
+    jac_G = ekf.get_g_jac(ekf.mu, controls)
+    mu_bar = ekf.get_predicted_state(ekf.mu, controls)
+    sigma_bar = jac_G @ ekf.sigma @ np.transpose(jac_G) + ekf.Q
+
+    jac_H = ekf.get_h_jac(mu_bar)
+    kalman_gain = (
+        sigma_bar
+        @ np.transpose(jac_H)
+        @ inv(jac_H @ sigma_bar @ np.transpose(jac_H) + ekf.R)
+    )
+    expected_measurement = ekf.get_expected_measurement(mu_bar)
+    ekf.mu = mu_bar + (kalman_gain @ (measurement - expected_measurement))
+    kh = kalman_gain @ jac_H
+    ekf.sigma = (np.eye(np.size(kh, 0)) - kh) @ sigma_bar
+
+
+def buffered_step(ekf, arc_lengths, measurement):
+    mu_bar, sigma_bar = ekf.predict_step(arc_lengths)
+    ekf.update_step(mu_bar, sigma_bar, measurement)
+
+
+def make_inputs(num_steps):
+    rng = np.random.default_rng(0)
+    arc_lengths = [tuple(arcs) for arcs in rng.uniform(0.0, 0.1, (num_steps, 2))]
+    measurements = list(rng.normal(0, 1, (num_steps, 3, 1)))
+    return arc_lengths, measurements
+
+
+def make_ekf():
+    return LocalizationEKF(np.array([[0.0], [0.0], [0.1]]), np.eye(3), 0.5)
+
+
+def time_steps(step, arc_lengths, measurements):
+    ekf = make_ekf()
+    begin = time.perf_counter()
+    for arcs, measurement in zip(arc_lengths, measurements):
+        step(ekf, arcs, measurement)
+    return (time.perf_counter() - begin) / len(arc_lengths)
+
+
+def trace_steps(step, arc_lengths, measurements):
+    """
+    Returns the largest number of bytes one step allocates above what it started
+    with, at its peak, after a first step has allocated what the filter keeps.
+    """
+    ekf = make_ekf()
+    step(ekf, arc_lengths[0], measurements[0])
+    most_bytes = 0
+    tracemalloc.start()
+    for arcs, measurement in zip(arc_lengths[1:], measurements[1:]):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        step(ekf, arcs, measurement)
+        most_bytes = max(most_bytes, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return most_bytes
+
+
+def main():
+    arc_lengths, measurements = make_inputs(NUM_STEPS)
+    for name, step in [
+        ("Allocating, inv:          ", allocating_step),
+        ("Buffers, solve, Joseph:   ", buffered_step),
+    ]:
+        step_time = time_steps(step, arc_lengths, measurements)
+        traced = trace_steps(
+            step, arc_lengths[:NUM_TRACED_STEPS], measurements[:NUM_TRACED_STEPS]
+        )
+        print(
+            name,
+            round(step_time * 1e6, 1),
+            "us per step,",
+            traced,
+            "bytes allocated at the peak of a step",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import time
+
+import numpy as np
+
+from engine.ekf import LocalizationEKF
+from engine.ekf_replay import EKFReplay, load_log, log_measurements
+
+"""
+Headless replay of a recorded GPS log and IMU log through the EKF and the RTS
+smoother (engine.ekf_replay), the offline counterpart of localization_visualizer.
+
+Writes the measured, filtered and smoothed track with its error statistics to
+the output csv file and prints the statistics, then times the replay of an hour
+of synthetic frames at 100 Hz (odometry and headings every frame, a GPS fix every
+GPS_EVERY frames).
+
+Command-line arguments, all optional:
+gps log file, imu log file, output file
+
+To run the file: python -m tests.functionality_tests.ekf_replay
+    ./csv_files/GPS_22-11-2021.txt ./csv_files/imu_360_sample1.csv ekf_replay.csv
+"""
+
+GPS_FILE = "./csv_files/GPS_22-11-2021.txt"
+IMU_FILE = "./csv_files/imu_360_sample1.csv"
+OUTPUT_FILE = "ekf_replay.csv"
+HOUR_FRAMES = 100 * 3600
+GPS_EVERY = 20
+
+
+def make_ekf():
+    # mu is meters from the first GPS reading; not confident of it initially
+    ekf = LocalizationEKF(np.zeros((3, 1)), 10 * np.eye(3), 0.4)
+    ekf.Q = np.diag([0.05, 0.05, 0.01])
+    return ekf
+
+
+def replay(measurements, controls=None):
+    """
+    Returns the EKFReplay of [measurements] and the seconds spent filtering and
+    smoothing.
+    """
+    replay = EKFReplay(make_ekf())
+    begin = time.perf_counter()
+    replay.run(measurements, controls)
+    filtered = time.perf_counter()
+    replay.smooth()
+    return replay, filtered - begin, time.perf_counter() - filtered
+
+
+def main():
+    gps_file, imu_file, output_file = (sys.argv[1:] + [None] * 3)[:3]
+    gps_readings = load_log(gps_file or GPS_FILE)
+    imu_readings = load_log(imu_file or IMU_FILE)
+    measurements, origin = log_measurements(gps_readings, imu_readings)
+
+    log_replay, filter_time, smooth_time = replay(measurements)
+    log_replay.write(output_file or OUTPUT_FILE)
+    print("Replayed", len(measurements), "frames from", origin)
+    for name, value in log_replay.statistics().items():
+        print("  " + name + ":", value)
+    print("  filter:", round(filter_time * 1000, 2), "ms")
+    print("  smoother:", round(smooth_time * 1000, 2), "ms")
+    print("Wrote", output_file or OUTPUT_FILE)
+
+    rng = np.random.default_rng(0)
+    measurements = rng.normal(0, 1, (HOUR_FRAMES, 3))
+    measurements[np.arange(HOUR_FRAMES) % GPS_EVERY != 0, :2] = np.nan
+    controls = np.column_stack(
+        [rng.uniform(0, 0.02, HOUR_FRAMES), rng.uniform(-0.01, 0.01, HOUR_FRAMES)]
+    )
+    _, filter_time, smooth_time = replay(measurements, controls)
+    print("One hour of frames at 100 Hz:")
+    print("  filter:", round(filter_time, 2), "s")
+    print("  smoother:", round(smooth_time, 2), "s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import sys
+import time
+
+import numpy as np
+
+from engine.ekf_replay import load_log, log_measurements
+from engine.ekf_tuning import (
+    PARAMETERS,
+    evaluate,
+    make_log,
+    random_configurations,
+    sweep,
+)
+
+"""
+Sweep of the noise of the EKF (engine.ekf_tuning) over a recorded GPS log and
+IMU log.
+
+Replays the logs through a filter with each of NUM_CONFIGURATIONS random noise
+configurations within BOUNDS on a process pool, and prints the best ones and
+the noise hard-coded in LocalizationEKF for comparison, with the time the
+sweep took on the pool and on one process. The configurations are ranked by
+innovation consistency, or, given a reference GPS log of the same frames
+(e.g. from a better receiver), by the RMSE of the filtered track against it.
+
+Command-line arguments, all optional:
+gps log file, imu log file, reference gps log file
+
+To run the file: python -m tests.functionality_tests.ekf_tuning
+    ./csv_files/GPS_22-11-2021.txt ./csv_files/imu_360_sample1.csv
+"""
+
+GPS_FILE = "./csv_files/GPS_22-11-2021.txt"
+IMU_FILE = "./csv_files/imu_360_sample1.csv"
+NUM_CONFIGURATIONS = 400
+BOUNDS = {
+    "q_xy": (1e-3, 10),
+    "q_heading": (1e-4, 10),
+    "r_gps": (1e-2, 10),
+    "r_heading": (1e-3, 5),
+}
+HARD_CODED = {"q_xy": 10, "q_heading": 10, "r_gps": 5, "r_heading": 5}
+NUM_SHOWN = 5
+
+
+def show(result):
+    parameters = ", ".join(
+        name + "=" + format(result[name], ".3g") for name in PARAMETERS
+    )
+    print(
+        "  score",
+        format(result["score"], ".4f"),
+        "|",
+        parameters,
+        "| gps nis",
+        format(result["mean_gps_nis"], ".3g"),
+        "| heading nis",
+        format(result["mean_heading_nis"], ".3g"),
+    )
+
+
+def main():
+    gps_file, imu_file, reference_file = (sys.argv[1:] + [None] * 3)[:3]
+    measurements, origin = log_measurements(
+        load_log(gps_file or GPS_FILE), load_log(imu_file or IMU_FILE)
+    )
+    reference = None
+    rank_by = "nis"
+    if reference_file:
+        reference_measurements, _ = log_measurements(
+            load_log(reference_file), [], origin
+        )
+        reference = np.full((len(measurements), 2), np.nan)
+        num_frames = min(len(reference), len(reference_measurements))
+        reference[:num_frames] = reference_measurements[:num_frames, :2]
+        rank_by = "rmse"
+    log = make_log(measurements, reference=reference)
+    configurations = random_configurations(NUM_CONFIGURATIONS, BOUNDS, seed=0)
+
+    begin = time.perf_counter()
+    results = sweep(configurations, log, rank_by)
+    pool_time = time.perf_counter() - begin
+    begin = time.perf_counter()
+    sweep(configurations, log, rank_by, max_workers=1)
+    serial_time = time.perf_counter() - begin
+
+    print(
+        "Swept",
+        NUM_CONFIGURATIONS,
+        "configurations over",
+        len(measurements),
+        "frames, ranked by",
+        rank_by,
+    )
+    print("  process pool:", round(pool_time, 2), "s")
+    print("  one process: ", round(serial_time, 2), "s")
+    print("Best configurations:")
+    for result in results[:NUM_SHOWN]:
+        show(result)
+    print("Hard-coded noise of LocalizationEKF:")
+    show(evaluate(HARD_CODED, log, rank_by))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+from engine.geodesy import LocalProjection
+from engine.kinematics import get_vincenty_x, get_vincenty_y
+
+"""
+Benchmark and accuracy check for the local projection (engine.geodesy).
+
+NUM_POINTS random GPS points over a FIELD_DEGREES field north east of the origin
+(about 5 km x 5 km) are converted to meters with get_vincenty_x/get_vincenty_y,
+one point at a time with LocalProjection.gps_to_meters, and all at once with
+the array form of LocalProjection.gps_to_meters. Prints the time per point of
+each, the time to convert NUM_BATCH_POINTS points back with
+LocalProjection.meters_to_gps, and the largest difference to Vincenty at
+increasing distances from the origin.
+
+To run the file: python -m tests.functionality_tests.geodesy_benchmark
+"""
+
+ORIGIN = (42.444250, -76.483682)
+FIELD_DEGREES = (0.045, 0.061)
+NUM_POINTS = 20000
+NUM_BATCH_POINTS = 10**6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    lats = ORIGIN[0] + rng.uniform(0, FIELD_DEGREES[0], NUM_POINTS)
+    longs = ORIGIN[1] + rng.uniform(0, FIELD_DEGREES[1], NUM_POINTS)
+    points = list(zip(lats.tolist(), longs.tolist()))
+    projection = LocalProjection(ORIGIN)
+
+    begin = time.perf_counter()
+    vincenty = np.array(
+        [(get_vincenty_x(ORIGIN, p), get_vincenty_y(ORIGIN, p)) for p in points]
+    )
+    vincenty_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    single = np.array([projection.gps_to_meters(lat, long) for lat, long in points])
+    single_time = time.perf_counter() - begin
+
+    batch_lats = ORIGIN[0] + rng.uniform(0, FIELD_DEGREES[0], NUM_BATCH_POINTS)
+    batch_longs = ORIGIN[1] + rng.uniform(0, FIELD_DEGREES[1], NUM_BATCH_POINTS)
+    begin = time.perf_counter()
+    batch_xs, batch_ys = projection.gps_to_meters(batch_lats, batch_longs)
+    batch_time = time.perf_counter() - begin
+    begin = time.perf_counter()
+    round_trip = projection.meters_to_gps(batch_xs, batch_ys)
+    inverse_time = time.perf_counter() - begin
+
+    print("Time per point:")
+    print("  Vincenty:            ", round(vincenty_time / NUM_POINTS * 1e6, 2), "us")
+    print("  LocalProjection:     ", round(single_time / NUM_POINTS * 1e6, 2), "us")
+    print(
+        "  LocalProjection, 1e6:",
+        round(batch_time / NUM_BATCH_POINTS * 1e6, 3),
+        "us",
+    )
+
+    print(
+        "Inverse of", NUM_BATCH_POINTS, "points:", round(inverse_time * 1000, 1), "ms"
+    )
+    print(
+        "  largest round trip error:",
+        np.abs(round_trip[0] - batch_lats).max(),
+        "degrees of latitude,",
+        np.abs(round_trip[1] - batch_longs).max(),
+        "degrees of longitude",
+    )
+
+    error = np.abs(single - vincenty).max(axis=1)
+    distance = np.hypot(*vincenty.T)
+    print("Largest difference to Vincenty:")
+    for limit in [500, 1000, 2000, 4000, 7100]:
+        within = distance <= limit
+        print(
+            "  within",
+            limit,
+            "m of the origin:",
+            round(error[within].max() * 1000, 3),
+            "mm",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+
+from engine.ekf import LocalizationEKF
+from engine.particle_filter import ParticleFilter
+from engine.sensor_fusion import GPS, HEADING, SensorFusion
+
+"""
+Benchmark of one 100 Hz cycle of localization with the particle filter
+(engine.particle_filter) for increasing numbers of particles, and with the EKF.
+
+A cycle is what update_state does every control step: the odometry and the IMU
+heading of the step, a GPS fix every GPS_EVERY steps, fused by a SensorFusion,
+then the estimate mu is read. Prints the time per cycle, and the fraction of the
+10 ms of a 100 Hz control step it takes.
+
+To run the file: python -m tests.functionality_tests.particle_filter_benchmark
+"""
+
+NUM_CYCLES = 2000
+GPS_EVERY = 20
+NUM_PARTICLES = [500, 1000, 2000, 5000]
+
+
+def make_localizer(num_particles):
+    if num_particles is None:
+        localizer = LocalizationEKF(np.zeros((3, 1)), np.eye(3), 0.4)
+    else:
+        localizer = ParticleFilter(np.zeros(3), np.eye(3), 0.4, num_particles, seed=0)
+    localizer.Q = np.diag([1e-4, 1e-4, 1e-5])
+    localizer.R = np.diag([1.0, 1.0, 0.01])
+    return localizer
+
+
+def time_cycles(num_particles):
+    fusion = SensorFusion(make_localizer(num_particles), max_delay=0)
+    rng = np.random.default_rng(0)
+    fixes = rng.normal(0, 1, (NUM_CYCLES, 2, 1))
+    headings = rng.normal(0, 0.1, NUM_CYCLES).tolist()
+    begin = time.perf_counter()
+    for step in range(NUM_CYCLES):
+        now = step * 0.01
+        fusion.add_odometry(now, 0.01, 0.001)
+        if step % GPS_EVERY == 0:
+            fusion.add_measurement(GPS, now, fixes[step])
+        fusion.add_measurement(HEADING, now, headings[step])
+        fusion.process(now)
+        # update_state reads the estimate every step
+        fusion.ekf.mu
+    return (time.perf_counter() - begin) / NUM_CYCLES
+
+
+def main():
+    print("Time per 100 Hz cycle:")
+    for num_particles in [None] + NUM_PARTICLES:
+        cycle_time = time_cycles(num_particles)
+        name = "EKF" if num_particles is None else str(num_particles) + " particles"
+        print(
+            "  " + name + ":",
+            round(cycle_time * 1e6, 1),
+            "us,",
+            round(cycle_time / 0.01 * 100, 1),
+            "% of the step",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+
+from engine.grid import Grid
+from engine.kinematics import get_ellipsoid_x, get_ellipsoid_y
+
+"""
+Benchmark for spiral waypoint generation (Grid.get_spiral_waypoints).
+
+Times the spiral on square grids from 10x10 to 1000x1000 nodes, both for the
+flat index order alone (get_spiral_indices) and for the full list of Node
+waypoints. For the smaller grids it also times the previous implementation,
+which checked every step against the list of visited waypoints and was
+quadratic in the number of nodes.
+
+To run the file: python -m tests.functionality_tests.spiral_benchmark
+"""
+
+LAT_MIN = 42.444250
+LONG_MIN = -76.483682
+SIZES = [10, 30, 100, 300, 1000]
+LEGACY_MAX_SIZE = 30
+
+
+def make_grid(n):
+    """
+    Returns a Grid of roughly [n] x [n] nodes with the bottom left corner at
+    (LAT_MIN, LONG_MIN).
+    """
+    # degrees per meter at the grid origin, from a 1 degree sample
+    origin = (LAT_MIN, LONG_MIN)
+    lat_per_m = 1 / get_ellipsoid_y(origin, (LAT_MIN + 1, LONG_MIN))
+    long_per_m = 1 / get_ellipsoid_x(origin, (LAT_MIN, LONG_MIN + 1))
+    span = n - 0.5
+    return Grid(
+        LAT_MIN, LAT_MIN + span * lat_per_m, LONG_MIN, LONG_MIN + span * long_per_m
+    )
+
+
+def legacy_spiral(grid):
+    """
+    The spiral traversal as implemented before it was rebuilt on index
+    arithmetic, kept here for comparison.
+    """
+    waypoints = []
+    node_list = grid.nodes
+    col = 0
+    row = 0
+    step_col = (1, 0, -1, 0)
+    step_row = (0, 1, 0, -1)
+    turn_state = 0
+    for _ in range(grid.num_rows * grid.num_cols):
+        node = node_list[row, col]
+        waypoints.append(node)
+        next_col = col + step_col[turn_state]
+        next_row = row + step_row[turn_state]
+        if (
+            0 <= next_col < grid.num_cols
+            and 0 <= next_row < grid.num_rows
+            and not node_list[next_row, next_col] in waypoints
+        ):
+            col = next_col
+            row = next_row
+        else:
+            turn_state = (turn_state + 1) % 4
+            col = col + step_col[turn_state]
+            row = row + step_row[turn_state]
+    waypoints.reverse()
+    return waypoints
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(
+        "{:>11} {:>9} {:>12} {:>14} {:>12}".format(
+            "grid", "nodes", "indices (s)", "waypoints (s)", "legacy (s)"
+        )
+    )
+    for n in SIZES:
+        grid = make_grid(n)
+        nodes = grid.get_num_rows() * grid.get_num_cols()
+        index_time = timed(grid.get_spiral_indices)
+        waypoint_time = timed(grid.get_spiral_waypoints)
+        if n <= LEGACY_MAX_SIZE:
+            legacy_time = "{:12.4f}".format(timed(lambda: legacy_spiral(grid)))
+        else:
+            legacy_time = "{:>12}".format("-")
+        print(
+            "{:>11} {:>9} {:12.4f} {:14.4f} {}".format(
+                "{}x{}".format(grid.get_num_rows(), grid.get_num_cols()),
+                nodes,
+                index_time,
+                waypoint_time,
+                legacy_time,
+            )
+        )
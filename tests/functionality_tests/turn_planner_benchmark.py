@@ -0,0 +1,72 @@
+import math
+import time
+
+from engine.grid import Grid
+from engine.turn_planner import TurnPlanner
+
+"""
+Benchmark for the row turns of a lawnmower traversal with cached turn templates
+(engine.turn_planner).
+
+The turns between NUM_ROWS rows are planned with Grid.plot_circle, and with a
+TurnPlanner whose radius is half a step, which plans the same semicircles, with
+and without its cache of turn templates. With the cache, the planner only plans
+one template per turn orientation, and reuses it for the other rows.
+
+To run the file: python -m tests.functionality_tests.turn_planner_benchmark
+"""
+
+NUM_ROWS = 10000
+
+
+def main():
+    grid = Grid(42.444250, 42.444599, -76.483682, -76.483276)
+    grid.turn_planner = TurnPlanner(grid.step_size / 2)
+    turns = [
+        (((row, 20), (row + 1, 20)), (row + 0.5, 20), orientation)
+        for row in range(NUM_ROWS)
+        for orientation in [grid.Orientation.CCW if row % 2 else grid.Orientation.CW]
+    ]
+
+    begin = time.perf_counter()
+    num_circle_points = sum(
+        len(grid.plot_circle(ends, center, orientation, theta_step=math.pi / 12))
+        for ends, center, orientation in turns
+    )
+    circle_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    num_turn_points = sum(
+        len(grid.plot_turn(ends, orientation)) for ends, _, orientation in turns
+    )
+    turn_time = time.perf_counter() - begin
+    num_planned = grid.turn_planner.num_planned
+
+    begin = time.perf_counter()
+    for ends, _, orientation in turns:
+        grid.turn_planner.templates.clear()
+        grid.plot_turn(ends, orientation)
+    uncached_time = time.perf_counter() - begin
+
+    print(NUM_ROWS, "row turns")
+    print(
+        "plot_circle: ",
+        num_circle_points,
+        "points,",
+        round(circle_time * 1000, 1),
+        "ms",
+    )
+    print(
+        "TurnPlanner: ",
+        num_turn_points,
+        "points,",
+        round(turn_time * 1000, 1),
+        "ms,",
+        num_planned,
+        "turns planned",
+    )
+    print("Uncached:    ", round(uncached_time * 1000, 1), "ms")
+
+
+if __name__ == "__main__":
+    main()